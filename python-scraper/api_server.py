@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Lightweight read-only JSON API over weather_forecasts.db for the mobile app.
+
+Endpoints:
+  GET /forecasts/latest                      latest detailed_forecasts row
+  GET /forecasts?from=YYYY-MM-DD&to=...      forecast history by insertionDate
+  GET /alerts?level=YELLOW&type=FLOOD        alerts, newest first
+  GET /forecasts/revisions?since=<ISO time>  forecast amendments after since
+  GET /rollups/daily?from=YYYY-MM-DD&to=...  per-day station figures as arrays
+
+Responses are cached in memory and dropped as soon as a scraper commits
+(detected with PRAGMA data_version). Compressed text columns are decoded
+before they are served (see textcodec.py). gzip and ETag / If-None-Match are
+supported. Run: python api_server.py [port]
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import storage
+from rollups import STATIONS, rollup_arrays, rollup_query
+from textcodec import codec
+
+# --- Configuration ---
+DB_FILE = storage.DB_FILE
+API_HOST = os.environ.get("TTMS_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("TTMS_API_PORT", "8765"))
+MAX_HISTORY_ROWS = 1000
+DEFAULT_ALERT_LIMIT = 100
+MAX_ALERT_ROWS = 1000
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+
+class ResponseCache:
+    """
+    In-memory cache of encoded responses keyed by request path + query.
+
+    One shared read connection is kept open; its PRAGMA data_version changes
+    whenever another connection commits, which clears the cache. Each query
+    reads data_version in its own read transaction, so a response built
+    from data older than the cache is not stored (see put()).
+    """
+
+    def __init__(self, db_file: str) -> None:
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._codec = codec(db_file)
+        self._data_version = None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # data_version the calling thread's last query read its rows at
+        self._read_version = threading.local()
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # Fixed for the whole read transaction, so it dates the rows
+                self._read_version.value = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                return [self._codec.decode_dict(dict(row)) for row in self._conn.execute(sql, params)]
+            finally:
+                self._conn.commit()
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._entries.clear()
+                self._data_version = version
+            self._read_version.value = None
+            return self._entries.get(key)
+
+    def put(self, key: str, payload: Any) -> Dict[str, Any]:
+        """
+        Encode payload and cache it under key, unless the calling thread's
+        last query read data older than the cache (a commit landed between
+        get() and that query): then the entry is only returned.
+        """
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = {
+            "body": body,
+            "gzip": gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None,
+            "etag": '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        }
+        with self._lock:
+            if getattr(self._read_version, "value", None) == self._data_version:
+                self._entries[key] = entry
+        return entry
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _limit(params: Dict[str, str], default: int, maximum: int) -> int:
+    """The limit query parameter, at most maximum (a negative LIMIT means none to SQLite)."""
+    return max(min(int(params.get("limit", default)), maximum), 0)
+
+
+def latest_forecast(cache: ResponseCache, params: Dict[str, str]) -> Any:
+    rows = cache.query("SELECT * FROM detailed_forecasts ORDER BY forecastid DESC LIMIT 1")
+    return rows[0] if rows else None
+
+
+def forecast_history(cache: ResponseCache, params: Dict[str, str]) -> Any:
+    sql = "SELECT * FROM detailed_forecasts WHERE 1 = 1"
+    args: List[Any] = []
+    if params.get("from"):
+        sql += " AND insertionDate >= ?"
+        args.append(params["from"])
+    if params.get("to"):
+        sql += " AND insertionDate <= ?"
+        args.append(params["to"])
+    sql += " ORDER BY forecastid DESC LIMIT ?"
+    args.append(_limit(params, MAX_HISTORY_ROWS, MAX_HISTORY_ROWS))
+    return cache.query(sql, tuple(args))
+
+
+def forecast_revisions(cache: ResponseCache, params: Dict[str, str]) -> Any:
+    if not params.get("since"):
+        raise ValueError("since is required")
+    rows = cache.query(
+        "SELECT forecastid, content_hash, previous_hash, seen_at, changes FROM forecast_revisions "
+        "WHERE seen_at > ? ORDER BY seen_at, forecastid LIMIT ?",
+        (params["since"], _limit(params, MAX_HISTORY_ROWS, MAX_HISTORY_ROWS)),
+    )
+    for row in rows:
+        row["changes"] = json.loads(row["changes"])
+    return rows
+
+
+def daily_rollups(cache: ResponseCache, params: Dict[str, str]) -> Any:
+    if not params.get("from"):
+        raise ValueError("from is required")
+    station = params.get("station")
+    if station is not None and station not in STATIONS:
+        raise ValueError(f"unknown station {station}")
+    sql, args = rollup_query(params["from"], params.get("to"), station)
+    rows = cache.query(sql, args)
+    return rollup_arrays(
+        (tuple(row.values()) for row in rows),
+        (station,) if station else STATIONS,
+    )
+
+
+def alerts(cache: ResponseCache, params: Dict[str, str]) -> Any:
+    sql = "SELECT * FROM weather_alerts WHERE 1 = 1"
+    args: List[Any] = []
+    if params.get("level"):
+        sql += " AND alert_level = ?"
+        args.append(params["level"].upper())
+    if params.get("type"):
+        sql += " AND alert_type = ?"
+        args.append(params["type"].upper())
+    sql += " ORDER BY insertion_date DESC LIMIT ?"
+    args.append(_limit(params, DEFAULT_ALERT_LIMIT, MAX_ALERT_ROWS))
+    return cache.query(sql, tuple(args))
+
+
+ROUTES = {
+    "/forecasts/latest": latest_forecast,
+    "/forecasts/revisions": forecast_revisions,
+    "/forecasts": forecast_history,
+    "/alerts": alerts,
+    "/rollups/daily": daily_rollups,
+}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # keep-alive response stalls on the client's delayed ACK.
+    disable_nagle_algorithm = True
+    cache: ResponseCache = None  # set by make_server()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: Dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            self._send(404, b'{"error":"not found"}', {"Content-Type": "application/json"})
+            return
+
+        key = f"{url.path}?{url.query}"
+        entry = self.cache.get(key)
+        if entry is None:
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                entry = self.cache.put(key, route(self.cache, params))
+            except ValueError:
+                self._send(400, b'{"error":"bad query parameter"}', {"Content-Type": "application/json"})
+                return
+            except sqlite3.Error as e:
+                print(f"Database error serving {url.path}: {e}")
+                self._send(503, b'{"error":"database unavailable"}', {"Content-Type": "application/json"})
+                return
+
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if self.headers.get("If-None-Match") == entry["etag"]:
+            self._send(304, headers=headers)
+            return
+
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        if entry["gzip"] is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            self._send(200, entry["gzip"], headers)
+        else:
+            self._send(200, entry["body"], headers)
+
+    do_HEAD = do_GET
+
+
+def make_server(db_file: str = DB_FILE, host: str = API_HOST, port: int = API_PORT) -> ThreadingHTTPServer:
+    """Build (but do not start) the API server for db_file."""
+    handler = type("BoundApiHandler", (ApiHandler,), {"cache": ResponseCache(db_file)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else API_PORT
+    server = make_server(port=port)
+    print(f"Serving {DB_FILE} on http://{API_HOST}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping API server...")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Content-addressed archive of raw API payloads.
+
+Each distinct response body (forecast page or RSS document) is stored once,
+gzip-compressed, under archive/objects/<hash[:2]>/<hash>.gz next to the
+database. archive/index.ndjson records, in arrival order, every time a
+body was seen, so a forecast amended A -> B -> A replays to A again; that
+is enough to replay the archive into a fresh database without any network
+access.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Tuple
+
+# --- Configuration ---
+ARCHIVE_ENABLED = os.environ.get("TTMS_ARCHIVE", "1") not in ("0", "false", "no")
+INDEX_NAME = "index.ndjson"
+
+
+def archive_dir(db_file: str) -> str:
+    """Archive directory that belongs to db_file."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_file)), "archive")
+
+
+def _object_path(root: str, digest: str) -> str:
+    return os.path.join(root, "objects", digest[:2], f"{digest}.gz")
+
+
+def store_payload(
+    db_file: str,
+    kind: str,
+    url: str,
+    body: bytes,
+    page: int | None = None,
+) -> str | None:
+    """
+    Store body unless an identical payload is already archived, and record
+    this sighting in the index either way. Returns its SHA-256, or None when
+    archiving is disabled or fails.
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+    digest = hashlib.sha256(body).hexdigest()
+    root = archive_dir(db_file)
+    path = _object_path(root, digest)
+
+    try:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as fh:
+                fh.write(gzip.compress(body, compresslevel=9, mtime=0))
+            os.replace(tmp_path, path)
+
+        entry = {
+            "hash": digest,
+            "kind": kind,
+            "url": url,
+            "page": page,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "size": len(body),
+        }
+        with open(os.path.join(root, INDEX_NAME), "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry) + "\n")
+        return digest
+    except OSError as e:
+        print(f"Error archiving {kind} payload: {e}")
+        return None
+
+
+def load_payload(db_file: str, digest: str) -> bytes:
+    """Return the decompressed body stored under digest."""
+    with open(_object_path(archive_dir(db_file), digest), "rb") as fh:
+        return gzip.decompress(fh.read())
+
+
+def iter_payloads(db_file: str, kind: str | None = None) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+    """
+    Yield (index entry, body) for every archived payload of the given kind,
+    oldest first. Entries whose object file is missing are skipped.
+    """
+    index_path = os.path.join(archive_dir(db_file), INDEX_NAME)
+    if not os.path.exists(index_path):
+        return
+    with open(index_path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print("Skipping malformed archive index line")
+                continue
+            if kind is not None and entry.get("kind") != kind:
+                continue
+            try:
+                body = load_payload(db_file, entry["hash"])
+            except (OSError, EOFError, zlib.error) as e:
+                print(f"Skipping archived payload {entry.get('hash')}: {e}")
+                continue
+            yield entry, body
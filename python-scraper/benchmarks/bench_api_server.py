@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Load test for api_server.py: requests/second against a single server process.
+
+Starts the server in-process on a free port, then hammers it from client
+threads over keep-alive connections. Everything shares one interpreter, so
+the figure is what one core sustains for server and clients together.
+
+Usage: python benchmarks/bench_api_server.py [db_file] [clients] [requests_per_client]
+"""
+
+import http.client
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import api_server  # noqa: E402
+
+PATHS = ["/forecasts/latest", "/alerts", "/alerts?level=YELLOW", "/forecasts?limit=20"]
+
+
+def client(port: int, count: int, headers: dict, statuses: dict) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for i in range(count):
+        conn.request("GET", PATHS[i % len(PATHS)], headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        statuses[resp.status] = statuses.get(resp.status, 0) + 1
+    conn.close()
+
+
+def run(label: str, port: int, clients: int, per_client: int, headers: dict) -> None:
+    statuses: dict = {}
+    threads = [
+        threading.Thread(target=client, args=(port, per_client, headers, statuses))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = clients * per_client
+    print(f"{label:<32} {total:>7} req  {elapsed:6.2f} s  {total / elapsed:>9,.0f} req/s  {statuses}")
+
+
+def main() -> None:
+    db_file = sys.argv[1] if len(sys.argv) > 1 else api_server.DB_FILE
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    per_client = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    server = api_server.make_server(db_file, "127.0.0.1", 0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        run("hot cache, identity", port, clients, per_client, {})
+        run("hot cache, gzip", port, clients, per_client, {"Accept-Encoding": "gzip"})
+        # Conditional requests with a stale ETag still get full bodies
+        run("hot cache, stale If-None-Match", port, clients, per_client, {"If-None-Match": '"stale"'})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
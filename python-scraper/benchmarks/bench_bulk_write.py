@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Rows/second benchmark for forecast backfills.
+
+Compares the old one-execute-per-row writer against bulk_save_forecasts()
+on a throwaway database filled with synthetic forecasts cloned from
+forecast_page_1.json.
+
+Usage: python benchmarks/bench_bulk_write.py [rows] [batch_size]
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import ttms_scraper  # noqa: E402
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+
+
+def synthetic_forecasts(count: int):
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        template = json.load(fh)["items"][0]
+    for forecastid in range(1, count + 1):
+        item = copy.copy(template)
+        item["forecastid"] = forecastid
+        yield item
+
+
+def legacy_save(forecasts) -> int:
+    """The pre-bulk writer: one execute per row, default journal settings."""
+    conn = sqlite3.connect(ttms_scraper.DB_FILE)
+    cursor = conn.cursor()
+    columns = ttms_scraper.FORECAST_COLUMNS
+    inserted = 0
+    for f in forecasts:
+        cursor.execute(
+            f"INSERT OR IGNORE INTO detailed_forecasts ({', '.join(columns)}) "
+            f"VALUES ({','.join(['?'] * len(columns))})",
+            tuple(f.get(c) for c in columns),
+        )
+        inserted += cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+    return inserted
+
+
+def run(label: str, writer, forecasts) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        ttms_scraper.DB_FILE = os.path.join(tmp, "bench.db")
+        ttms_scraper.setup_database()
+        started = time.perf_counter()
+        result = writer(forecasts)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<28} {len(forecasts):>8} rows  {elapsed:8.2f} s  {len(forecasts) / elapsed:>10,.0f} rows/s  -> {result}")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else ttms_scraper.WRITE_BATCH_SIZE
+    forecasts = list(synthetic_forecasts(rows))
+
+    run("legacy per-row execute", legacy_save, forecasts)
+    run(f"bulk executemany ({batch_size}/txn)",
+        lambda f: ttms_scraper.bulk_save_forecasts(f, batch_size), forecasts)
+    # Second pass over a populated table: every row is already stored
+    with tempfile.TemporaryDirectory() as tmp:
+        ttms_scraper.DB_FILE = os.path.join(tmp, "bench.db")
+        ttms_scraper.setup_database()
+        ttms_scraper.bulk_save_forecasts(forecasts, batch_size)
+        started = time.perf_counter()
+        result = ttms_scraper.bulk_save_forecasts(forecasts, batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"{'bulk re-run (all stored)':<28} {rows:>8} rows  {elapsed:8.2f} s  {rows / elapsed:>10,.0f} rows/s  -> {result}")
+
+
+if __name__ == "__main__":
+    main()
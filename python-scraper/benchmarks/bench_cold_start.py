@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for a no-op `run_scrapers.py auto` invocation.
+
+Builds a throwaway database in which both scrapers ran successfully just
+now, so auto mode has nothing to do, then times:
+  process   the whole `python run_scrapers.py auto` subprocess (imports included)
+  imports   the same run under `python -X importtime`: total import time,
+            the heaviest top-level imports, and whether requests was loaded
+            (it should not be: nothing is due, so no scraper module is)
+  main()    run_scrapers.main() in-process, i.e. schema check, due checks and
+            status, with the number of SQLite connections it opened
+
+Usage: python benchmarks/bench_cold_start.py [runs]
+"""
+
+import contextlib
+import io
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+SCRAPER_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(SCRAPER_DIR)
+
+import storage  # noqa: E402
+
+
+def prepare(db_file: str) -> None:
+    """Schema plus one fresh successful run per scraper."""
+    now = datetime.now(timezone.utc)
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage.ensure_schema(db_file)
+        for run_type in ("rss_alerts", "forecasts"):
+            storage.log_scraper_run(db_file, run_type, now, now, 0, 0, True)
+
+
+def time_process(db_file: str, runs: int) -> list:
+    env = dict(os.environ, TTMS_DB_FILE=db_file)
+    script = os.path.join(SCRAPER_DIR, "run_scrapers.py")
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, script, "auto"], env=env, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def import_profile(db_file: str, runs: int) -> tuple:
+    """
+    Median total import time over runs, the heaviest top-level imports of
+    the last run as [(module, ms)], and whether requests was imported.
+    """
+    env = dict(os.environ, TTMS_DB_FILE=db_file)
+    script = os.path.join(SCRAPER_DIR, "run_scrapers.py")
+    line = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+    totals = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", script, "auto"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        entries = [m.groups() for m in map(line.match, proc.stderr.splitlines()) if m]
+        totals.append(sum(int(self_us) for self_us, _, _, _ in entries) / 1000)
+    top_level = sorted(((name, int(cum_us) / 1000) for _, cum_us, indent, name in entries if not indent),
+                       key=lambda item: -item[1])
+    return statistics.median(totals), top_level[:5], any(name == "requests" for *_, name in entries)
+
+
+def time_main(db_file: str, runs: int) -> tuple:
+    # Point everything at the throwaway database before run_scrapers (or a
+    # scraper module it might import) copies storage.DB_FILE
+    storage.DB_FILE = db_file
+    import run_scrapers
+
+    run_scrapers.DB_FILE = db_file
+
+    opened = [0]
+    connect = storage.connect
+
+    def counting_connect(*args, **kwargs):
+        opened[0] += 1
+        return connect(*args, **kwargs)
+
+    storage.connect = counting_connect
+    sys.argv = ["run_scrapers.py", "auto"]
+    timings = []
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_scrapers.main()
+            timings.append(time.perf_counter() - started)
+    finally:
+        storage.connect = connect
+    return timings, opened[0] / runs
+
+
+def report(label: str, timings: list, extra: str = "") -> None:
+    print(f"{label:<10} median {statistics.median(timings) * 1000:8.2f} ms  "
+          f"min {min(timings) * 1000:8.2f} ms  ({len(timings)} runs){extra}")
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        prepare(db_file)
+        report("process", time_process(db_file, runs))
+        total, heaviest, loaded_requests = import_profile(db_file, max(runs // 4, 3))
+        print(f"{'imports':<10} median {total:8.2f} ms  requests imported: {'yes' if loaded_requests else 'no'}")
+        print(f"{'':<10} heaviest: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in heaviest))
+        timings, connections = time_main(db_file, runs)
+        report("main()", timings, f"  {connections:.0f} connection(s) per run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Marine / rain-chance parsing: per-forecast cost with and without the
+per-text cache, and backfill-conditions with one worker vs all cores.
+
+Fills a throwaway database with synthetic forecasts (four a day, cloned
+from forecast_page_1.json) whose seas, waves1/2, probrainfall and textArea1
+are drawn from pools of the wording the site uses, so strings repeat the
+way they do in the real history, and with the text columns compressed.
+(tests/test_conditions.py checks the parses and the rows.)
+
+Usage: python benchmarks/bench_conditions.py [years]
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import conditions  # noqa: E402
+import storage  # noqa: E402
+import ttms_scraper  # noqa: E402
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+SEAS = [" Slight to Moderate ", " Moderate ", " Moderate to Rough ", " Slight ", " Rough "]
+WAVES1 = [
+    " 1.2m to 1.5m, Near 2.0m (Leewards)   ", " 1.0m to 1.5m ", " Near 2.0m in open waters ",
+    " 1.5m to 2.0m, occasionally 2.5m along eastern coasts ", " Above 2.5m ", " 1.0m to 1.2m ",
+    " 1.0m to 1.5m in open waters and below 1.0m in sheltered areas ", " 1.5 to 2.0 metres ",
+]
+WAVES2 = [" Below 1.0m, occasionally choppy near showers ", " Below 0.5m ", " Up to 1.0m ", " Near 1.0m ",
+          " Below 1 metre in sheltered areas "]
+CHANCES = [
+    "There is also the medium (40% - 60%) chance of isolated thunderstorm activity, favoring western areas.",
+    "There is a low (10% - 30%) chance of showers.",
+    "There is a high (60% - 80%) chance of heavy showers and thunderstorms.",
+    "",
+]
+OPENINGS = [
+    "Generally fair but slightly hazy conditions despite brief, isolated showers.",
+    "Partly cloudy with periods of light to moderate showers.",
+    "Hot and sunny with a low chance of afternoon showers over western areas.",
+    "Variably cloudy with few showers and isolated thunderstorm activity.",
+]
+
+
+def synthetic_history(years: int, seed: int = 5) -> list:
+    rng = random.Random(seed)
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        template = json.load(fh)["items"][0]
+    start = date.today() - timedelta(days=365 * years)
+    forecasts = []
+    for day in range(365 * years):
+        for _ in range(4):
+            item = copy.copy(template)
+            item["forecastid"] = len(forecasts) + 1
+            item["insertionDate"] = (start + timedelta(days=day)).isoformat()
+            item["seas"], item["waves1"], item["waves2"] = rng.choice(SEAS), rng.choice(WAVES1), rng.choice(WAVES2)
+            item["probrainfall"] = str(rng.choice([10, 20, 30, 40, 60, 70]))
+            item["textArea1"] = " ".join(rng.sample(OPENINGS, 2) + [rng.choice(CHANCES)])
+            forecasts.append(item)
+    return forecasts
+
+
+def clear_caches() -> None:
+    for parse in (conditions.parse_seas, conditions.parse_waves, conditions.parse_probability,
+                  conditions.parse_chance):
+        parse.cache_clear()
+
+
+def main() -> None:
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    forecasts = synthetic_history(years)
+
+    # Parsing alone: the undecorated parsers vs extract_conditions() from a cold cache
+    clear_caches()
+    started = time.perf_counter()
+    for forecast in forecasts:
+        conditions.parse_seas.__wrapped__(forecast.get("seas"))
+        conditions.parse_waves.__wrapped__(forecast.get("waves1"))
+        conditions.parse_waves.__wrapped__(forecast.get("waves2"))
+        conditions.parse_probability.__wrapped__(forecast.get("probrainfall"))
+        conditions.parse_chance.__wrapped__(forecast.get("textArea1"))
+    uncached = time.perf_counter() - started
+    clear_caches()
+    started = time.perf_counter()
+    for forecast in forecasts:
+        conditions.extract_conditions(forecast)
+    cached = time.perf_counter() - started
+    hits = conditions.parse_chance.cache_info().hits + conditions.parse_waves.cache_info().hits
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "conditions.db")
+        ttms_scraper.DB_FILE = db_file
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(db_file)
+            ttms_scraper.bulk_save_forecasts(forecasts)
+
+        timings = {}
+        for workers in sorted({1, os.cpu_count() or 1}):
+            conn = sqlite3.connect(db_file)
+            with conn:
+                conn.execute("DELETE FROM forecast_conditions")
+            conn.close()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                conditions.backfill_conditions(db_file, workers=workers)
+            timings[workers] = time.perf_counter() - started
+
+    print(f"{len(forecasts)} forecasts over {years} years")
+    print(f"parse, no cache    {uncached * 1e6 / len(forecasts):>7.1f} us/forecast")
+    print(f"parse, text cache  {cached * 1e6 / len(forecasts):>7.1f} us/forecast ({hits} cache hits)")
+    for workers, elapsed in timings.items():
+        print(f"backfill, {workers} worker(s) {elapsed:>7.2f} s ({len(forecasts) / elapsed:,.0f} forecasts/s)")
+    if len(timings) == 1:
+        print("one CPU here: the all-cores backfill is the same run")
+
+
+if __name__ == "__main__":
+    main()
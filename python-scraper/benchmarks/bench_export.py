@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Export throughput and peak memory per format.
+
+Fills a throwaway database with synthetic forecasts cloned from
+forecast_page_1.json, then exports detailed_forecasts in each available
+format (Parquet only when pyarrow is installed), full and projected to a
+few columns over one year. rows/s comes from an untraced run; peak traced
+memory from a second run under tracemalloc (which slows it down).
+
+Usage: python benchmarks/bench_export.py [rows]
+"""
+
+import copy
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import export  # noqa: E402
+import storage  # noqa: E402
+import ttms_scraper  # noqa: E402
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+PROJECTION = ["forecastid", "insertionDate", "PiarcoMnTemp", "PiarcoActMxTemp", "PiarcoRainfall"]
+
+
+def fill(db_file: str, count: int) -> None:
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        template = json.load(fh)["items"][0]
+    start = date.today() - timedelta(days=count // 2)
+    forecasts = []
+    for i in range(count):
+        item = copy.copy(template)
+        item["forecastid"] = i + 1
+        item["insertionDate"] = (start + timedelta(days=i // 2)).isoformat()
+        forecasts.append(item)
+    ttms_scraper.DB_FILE = db_file
+    storage.ensure_schema(db_file)
+    ttms_scraper.bulk_save_forecasts(forecasts)
+
+
+def formats() -> list:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("pyarrow not installed; skipping parquet")
+        return ["csv", "ndjson"]
+    return list(export.FORMATS)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        fill(db_file, count)
+        print(f"Database: {count} forecasts, {os.path.getsize(db_file) / 2**20:.1f} MiB")
+        since = (date.today() - timedelta(days=365)).isoformat()
+        for fmt in formats():
+            for label, kwargs in (("all columns", {}), ("5 columns, 1 year", {"columns": PROJECTION, "start": since})):
+                path = os.path.join(tmp, f"out.{fmt}")
+                result = export.export_table(db_file, "detailed_forecasts", path, fmt, **kwargs)
+                tracemalloc.start()
+                export.export_table(db_file, "detailed_forecasts", path, fmt, **kwargs)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{fmt:<8} {label:<18} {result['rows']:>7} rows  {result['seconds']:6.2f} s  "
+                      f"{result['rows_per_second']:>9,.0f} rows/s  {os.path.getsize(path) / 2**20:7.1f} MiB  "
+                      f"peak {peak / 2**20:5.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Fault injection against the local stand-in server.
+
+Runs the forecast sync and the RSS fetch in-process against
+benchmarks/standin_server.py with faults injected, each scenario on a
+throwaway database, and times it:
+  latency    slow, jittery responses
+  5xx        a share of requests answered 502, retried
+  truncated  a share of bodies cut short or dropped mid-transfer; the same
+  rss        ten RSS fetches with 5xx and truncated bodies
+  resume     page 7 always fails and the run stops there; once it recovers
+             (and new forecasts have pushed the pages down) the next run
+             resumes from the checkpoint
+  breaker    server down: BREAKER_THRESHOLD failed runs open the breaker,
+             the next run is skipped, and after the cooldown a trial run
+             closes it
+Backoff and cooldown are shortened so the set runs in seconds. Each line
+shows the time, the requests the scenario made, the faults served and the
+forecasts stored.
+
+Usage: python benchmarks/bench_faults.py [--forecasts=N] [--per-page=N]
+       [--rss-items=N] [--seed=N]
+"""
+
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, ".."))
+
+from standin_server import Faults, StandinData, make_server, start_in_thread  # noqa: E402
+
+
+def count_forecasts(db_file: str) -> int:
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM detailed_forecasts").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    forecasts = int(options.get("forecasts", 400))
+    per_page = int(options.get("per-page", 20))
+    rss_items = int(options.get("rss-items", 200))
+    seed = int(options.get("seed", 1))
+
+    server = make_server(StandinData(forecasts, per_page, rss_items))
+    handler = server.RequestHandlerClass
+    os.environ.update(start_in_thread(server))
+
+    # Imported once the environment points them at the stand-in
+    import resilience
+    import storage
+    import ttms_rss_scraper
+    import ttms_scraper
+
+    resilience.RETRY_BASE_DELAY = 0.005
+    resilience.BREAKER_COOLDOWN = 1.0
+
+    def sync() -> dict:
+        return ttms_scraper.sync_forecasts()
+
+    def latency(data: StandinData, faults: Faults) -> None:
+        handler.latency = 0.03
+        faults.jitter_ms = 100
+        sync()
+
+    def server_errors(data: StandinData, faults: Faults) -> None:
+        faults.error_rate = 0.2
+        sync()
+
+    def truncated(data: StandinData, faults: Faults) -> None:
+        faults.truncate_rate = 0.2
+        sync()
+
+    def rss(data: StandinData, faults: Faults) -> None:
+        faults.error_rate = faults.truncate_rate = 0.15
+        for _ in range(10):
+            data.rss_feed.cache_clear()  # a new body each time, so nothing comes back 304
+            ttms_rss_scraper.fetch_rss_alerts({})
+
+    def resume(data: StandinData, faults: Faults) -> None:
+        faults.down_pages = {7}
+        sync()
+        faults.down_pages = set()
+        data.publish(2 * data.per_page + 5)
+        sync()
+
+    def breaker(data: StandinData, faults: Faults) -> None:
+        faults.down = True
+        for _ in range(resilience.BREAKER_THRESHOLD + 1):
+            sync()
+        time.sleep(resilience.BREAKER_COOLDOWN + 0.1)
+        faults.down = False
+        sync()
+
+    scenarios = {
+        "latency": latency,
+        "5xx": server_errors,
+        "truncated": truncated,
+        "rss": rss,
+        "resume": resume,
+        "breaker": breaker,
+    }
+    try:
+        for name, scenario in scenarios.items():
+            data = StandinData(forecasts, per_page, rss_items)
+            faults = Faults(seed=seed)
+            handler.data, handler.faults, handler.latency = data, faults, 0.0
+            handler.requests.clear()
+            with tempfile.TemporaryDirectory() as tmp:
+                db_file = os.path.join(tmp, "faults.db")
+                ttms_scraper.DB_FILE = ttms_rss_scraper.DB_FILE = db_file
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    storage.ensure_schema(db_file)
+                    scenario(data, faults)
+                elapsed = time.perf_counter() - started
+                stored = count_forecasts(db_file)
+            injected = ", ".join(f"{k} {v}" for k, v in sorted(faults.injected.items())) or "none"
+            print(f"{name:<10} {elapsed:6.2f} s {len(handler.requests):>5} requests {stored:>5} stored"
+                  f"   faults: {injected}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Overlapping run_scrapers.py invocations against one database.
+
+Starts the local stand-in server (with enough latency that a forecast run
+takes a while), then launches N `run_scrapers.py` processes at once on a
+throwaway database and times how long the run leases take to sort them out:
+  overlap    N x `forecast`: one run scrapes, the others skip at once
+  auto-wait  N x `auto --wait=60` on a fresh database: one run per scraper;
+             the others either wait for it and then find the work done, or
+             start after it and find nothing due
+  queued     N x `both --wait=60`: the runs take turns
+  expiry     a forecast run killed mid-run leaves its lease behind; the next
+             run skips until it lapses (TTMS_LEASE_TTL=2), then takes over
+Each line also shows the successful runs logged per scraper, and how many
+processes exited non-zero or printed "database is locked".
+
+Usage: python benchmarks/bench_leases.py [--processes=N] [--forecasts=N]
+       [--latency-ms=N]
+"""
+
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(HERE, "..", "run_scrapers.py")
+
+from standin_server import StandinData, make_server, start_in_thread  # noqa: E402
+
+
+def launch(args: list, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, SCRIPT] + args, env=env, text=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+def run_all(procs: list) -> list:
+    """(returncode, output) per process, once all have exited."""
+    outputs = [p.communicate()[0] for p in procs]
+    return [(p.returncode, out) for p, out in zip(procs, outputs)]
+
+
+def runs_logged(db_file: str) -> dict:
+    conn = sqlite3.connect(db_file)
+    try:
+        return dict(conn.execute(
+            "SELECT run_type, SUM(success) FROM scraper_analytics GROUP BY run_type"
+        ).fetchall())
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    n = int(options.get("processes", 6))
+    data = StandinData(int(options.get("forecasts", 1000)), 20, 200)
+    server = make_server(data, float(options.get("latency-ms", 100)))
+    base_env = dict(os.environ, **start_in_thread(server))
+
+    def overlap(env: dict) -> list:
+        subprocess.run([sys.executable, "-c", "import storage; storage.ensure_schema()"],
+                       cwd=os.path.join(HERE, ".."), env=env, check=True, stdout=subprocess.DEVNULL)
+        return run_all([launch(["forecast"], env) for _ in range(n)])
+
+    def auto_wait(env: dict) -> list:
+        return run_all([launch(["auto", "--wait=60"], env) for _ in range(n)])
+
+    def queued(env: dict) -> list:
+        return run_all([launch(["both", "--wait=60"], env) for _ in range(n)])
+
+    def expiry(env: dict) -> list:
+        env = dict(env, TTMS_LEASE_TTL="2")
+        victim = launch(["forecast"], env)
+        time.sleep(1.0)
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.communicate()
+        blocked = run_all([launch(["forecast"], env)])
+        time.sleep(2.5)
+        return blocked + run_all([launch(["forecast"], env)])
+
+    scenarios = {"overlap": overlap, "auto-wait": auto_wait, "queued": queued, "expiry": expiry}
+    try:
+        for name, scenario in scenarios.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                db_file = os.path.join(tmp, "leases.db")
+                started = time.perf_counter()
+                results = scenario(dict(base_env, TTMS_DB_FILE=db_file))
+                elapsed = time.perf_counter() - started
+                logged = runs_logged(db_file)
+            failed = sum(code != 0 for code, _ in results)
+            locked = sum("database is locked" in out for _, out in results)
+            print(f"{name:<10} {elapsed:6.2f} s  ({n} processes)  runs: forecasts {logged.get('forecasts', 0)}, "
+                  f"rss {logged.get('rss_alerts', 0)}  exited non-zero: {failed}  locked: {locked}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Analytics retention: database size and query time before and after compact.
+
+Fills a throwaway database with the given number of days of synthetic run
+rows at the real cadence (an RSS run every 10 minutes, a forecast run every
+hour, each with phase rows), then runs retention.compact() with the
+default retention (converting to incremental auto_vacuum, as the compact
+command does) and reports rows, file size and the time of a per-day
+success-rate query over the whole history, before (raw rows) and after
+(daily rollups plus the raw rows still kept).
+
+Usage: python benchmarks/bench_retention.py [days]
+"""
+
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import retention  # noqa: E402
+import storage  # noqa: E402
+
+RUNS = 5
+
+RAW_SQL = '''
+    SELECT substr(run_timestamp, 1, 10), run_type, COUNT(*), AVG(success)
+    FROM scraper_analytics GROUP BY 1, 2
+'''
+ROLLUP_SQL = '''
+    SELECT substr(period_start, 1, 10), run_type, runs, success_rate
+    FROM analytics_rollups WHERE granularity = 'day'
+    UNION ALL
+''' + RAW_SQL
+
+
+def fill(db_file: str, days: int, now: datetime) -> None:
+    """Insert the synthetic runs."""
+    random.seed(1)
+    rows, phases = [], []
+    t = now - timedelta(days=days)
+    while t < now:
+        kinds = [("rss_alerts", random.lognormvariate(0, 0.5))]
+        if t.minute < 10:
+            kinds.append(("forecasts", random.lognormvariate(2, 0.6)))
+        for run_type, duration in kinds:
+            stamp = t.isoformat()
+            rows.append((stamp, run_type, stamp, stamp, duration, 50, random.randint(0, 3),
+                         random.random() > 0.03, None, duration / 2, None, None, None, None))
+            for phase in ("connect", "transfer", "parse", "db_write"):
+                phases.append((len(rows), phase, duration / 4))
+        t += timedelta(minutes=10)
+    conn = storage.connect(db_file)
+    try:
+        with conn:
+            conn.executemany(storage._RUN_INSERT_SQL, rows)
+            conn.executemany("INSERT INTO scraper_run_phases VALUES (?, ?, ?)", phases)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def time_query(db_file: str, sql: str) -> float:
+    timings = []
+    for _ in range(RUNS):
+        conn = sqlite3.connect(db_file)
+        try:
+            started = time.perf_counter()
+            conn.execute(sql).fetchall()
+            timings.append(time.perf_counter() - started)
+        finally:
+            conn.close()
+    return statistics.median(timings)
+
+
+def counts(db_file: str) -> tuple:
+    conn = sqlite3.connect(db_file)
+    try:
+        return (conn.execute("SELECT COUNT(*) FROM scraper_analytics").fetchone()[0],
+                conn.execute("SELECT COUNT(*) FROM scraper_run_phases").fetchone()[0],
+                conn.execute("SELECT COUNT(*) FROM analytics_rollups").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 730
+    now = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "retention.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(db_file)
+        fill(db_file, days, now)
+        before = counts(db_file)
+        size_before = os.path.getsize(db_file)
+        query_before = time_query(db_file, RAW_SQL)
+
+        started = time.perf_counter()
+        result = retention.compact(db_file, convert=True, now=now)
+        elapsed = time.perf_counter() - started
+        after = counts(db_file)
+        size_after = os.path.getsize(db_file)
+        query_after = time_query(db_file, ROLLUP_SQL)
+
+    print(f"{days} days of runs, retention {retention.ANALYTICS_RETENTION_DAYS:g} days; compact took {elapsed:.2f} s")
+    print(f"{'':<8} {'runs':>8} {'phases':>8} {'rollups':>8} {'file':>12} {'history query':>14}")
+    print(f"{'before':<8} {before[0]:>8} {before[1]:>8} {before[2]:>8} {size_before:>12,} {query_before * 1000:>11.2f} ms")
+    print(f"{'after':<8} {after[0]:>8} {after[1]:>8} {after[2]:>8} {size_after:>12,} {query_after * 1000:>11.2f} ms")
+    print(f"reclaimed {result['reclaimed_bytes']:,} bytes ({result['mode']} vacuum), {result['free_pages']} free page(s) left")
+
+
+if __name__ == "__main__":
+    main()
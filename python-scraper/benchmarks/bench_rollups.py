@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Daily chart query: TEXT-casting scan of detailed_forecasts vs daily_rollups.
+
+Fills a throwaway database with synthetic forecasts (two a day, cloned from
+forecast_page_1.json) over the given number of years, then times a
+one-year chart query both ways, plus a full rebuild-rollups.
+
+Usage: python benchmarks/bench_rollups.py [years]
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import rollups  # noqa: E402
+import storage  # noqa: E402
+import ttms_scraper  # noqa: E402
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+RUNS = 15
+
+# The per-request query charts needed before daily_rollups existed
+SCAN_SQL = '''
+    SELECT insertionDate,
+           MIN(CAST(PiarcoMnTemp AS REAL)), MAX(CAST(PiarcoActMxTemp AS REAL)),
+           MAX(CASE WHEN PiarcoRainfall = 'TR' THEN 0.0 ELSE CAST(PiarcoRainfall AS REAL) END),
+           MAX(CAST(cumlativeRain AS REAL)),
+           MIN(CAST(CrownMnTemp AS REAL)), MAX(CAST(CrownActMxTemp AS REAL)),
+           MAX(CASE WHEN CrownPointRinfall = 'TR' THEN 0.0 ELSE CAST(CrownPointRinfall AS REAL) END),
+           MAX(CAST(cumlativeCpRain AS REAL))
+    FROM detailed_forecasts
+    WHERE insertionDate >= ? AND insertionDate <= ?
+    GROUP BY insertionDate ORDER BY insertionDate
+'''
+
+
+def synthetic_forecasts(years: int, seed: int = 3):
+    rng = random.Random(seed)
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        template = json.load(fh)["items"][0]
+    start = date.today() - timedelta(days=365 * years)
+    forecasts = []
+    for day in range(365 * years):
+        for issued in ("5:00 AM", "5:00 PM"):
+            f = copy.copy(template)
+            f["forecastid"] = len(forecasts) + 1
+            f["insertionDate"] = (start + timedelta(days=day)).isoformat()
+            f["IssuedAt"] = issued
+            f["PiarcoMnTemp"] = f"{rng.uniform(21, 25):.1f}"
+            f["PiarcoActMxTemp"] = f"{rng.uniform(29, 34):.1f}"
+            f["PiarcoRainfall"] = rng.choice(["TR", "0.0", f"{rng.uniform(0, 40):.1f}"])
+            forecasts.append(f)
+    return forecasts
+
+
+def median_ms(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    forecasts = synthetic_forecasts(years)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        ttms_scraper.DB_FILE = db_file
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(db_file)
+        started = time.perf_counter()
+        ttms_scraper.bulk_save_forecasts(forecasts)
+        elapsed = time.perf_counter() - started
+        print(f"History: {years} years, {len(forecasts)} forecasts "
+              f"(saved with incremental rollups in {elapsed:.1f} s, {len(forecasts) / elapsed:,.0f} rows/s)")
+
+        end = date.today().isoformat()
+        start = (date.today() - timedelta(days=365)).isoformat()
+        storage.open_shared(db_file)
+        try:
+            conn = storage.acquire(db_file)
+            scan = median_ms(lambda: conn.execute(SCAN_SQL, (start, end)).fetchall())
+            rollup = median_ms(lambda: rollups.get_daily_rollups(db_file, start, end))
+            print(f"one-year chart  scan+cast {scan:8.2f} ms   daily_rollups {rollup:8.2f} ms")
+            started = time.perf_counter()
+            rows = rollups.rebuild_daily_rollups(db_file)
+            print(f"rebuild-rollups {rows} rows in {(time.perf_counter() - started) * 1000:.0f} ms")
+        finally:
+            storage.close_shared(db_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+RSS parse / classify benchmark on a synthetic feed.
+
+Compares the old ElementTree + find()/`in`-chain parser with the iterparse
+parser and compiled classifier (time and peak traced memory), then times
+`reclassify` over the same alerts stored in a throwaway database.
+
+Usage: python benchmarks/bench_rss_parse.py [items]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import storage  # noqa: E402
+import ttms_rss_scraper  # noqa: E402
+
+TITLES = [
+    "Adverse Weather Alert #{n} - Yellow Level",
+    "ADVERSE WEATHER ALERT DISCONTINUATION - GREEN LEVEL",
+    "Hazardous Seas Alert #{n} - YELLOW LEVEL",
+    "Riverine Flood Alert #{n} - Orange Level",
+    "High Winds Alert #{n} - Yellow Level",
+    "Hurricane Warning #{n}  for Tobago - RED LEVEL",
+    "Tropical Storm Warning #{n} for Trinidad - ORANGE LEVEL",
+    "Adverse  Weather Alert #{n}- Yellow Level",
+    "Hot Spell Alert Discontinuation– GREEN LEVEL",
+]
+
+
+def synthetic_feed(count: int) -> bytes:
+    """
+    RSS document with count items. Alert numbers run #1-#5 as in the real
+    feed; each item gets its own hour so alert_ids stay unique.
+    """
+    items = []
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        title = TITLES[i % len(TITLES)].format(n=i % 5 + 1)
+        pub_date = (start + timedelta(hours=i)).strftime("%a, %d %b %Y %H:%M:%S +0000")
+        items.append(
+            f"<item><title>{escape(title)}</title>"
+            f"<description>{escape('Residents are advised to monitor conditions. ' * 8)}</description>"
+            f"<link>https://metproducts.gov.tt/ttms/alerts/{i}</link>"
+            f"<pubDate>{pub_date}</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>TTMS</title>'
+        + "".join(items) + "</channel></rss>"
+    ).encode("utf-8")
+
+
+def legacy_parse(content: bytes):
+    """The pre-iterparse parser: full tree, two find() calls per field, `in` chains."""
+    alerts = []
+    insertion_date = datetime.now(timezone.utc).isoformat()
+    root = ET.fromstring(content)
+    if root.tag.endswith("rss"):
+        for item in root.findall(".//item"):
+            alert = {}
+            alert["title"] = item.find("title").text if item.find("title") is not None else ""
+            alert["description"] = item.find("description").text if item.find("description") is not None else ""
+            alert["link"] = item.find("link").text if item.find("link") is not None else ""
+            alert["pub_date"] = item.find("pubDate").text if item.find("pubDate") is not None else ""
+            title = alert["title"].lower()
+            if "yellow" in title:
+                alert["alert_level"] = "YELLOW"
+            elif "orange" in title:
+                alert["alert_level"] = "ORANGE"
+            elif "red" in title:
+                alert["alert_level"] = "RED"
+            elif "green" in title:
+                alert["alert_level"] = "GREEN"
+            else:
+                alert["alert_level"] = "UNKNOWN"
+            if "adverse weather" in title:
+                alert["alert_type"] = "ADVERSE_WEATHER"
+            elif "high wind" in title:
+                alert["alert_type"] = "HIGH_WIND"
+            elif "flood" in title:
+                alert["alert_type"] = "FLOOD"
+            elif "hazardous seas" in title:
+                alert["alert_type"] = "HAZARDOUS_SEAS"
+            elif "discontinuation" in title or "cancellation" in title:
+                alert["alert_type"] = "DISCONTINUATION"
+            else:
+                alert["alert_type"] = "OTHER"
+            alert["issued_by"] = "Trinidad and Tobago Meteorological Service"
+            alert["insertion_date"] = insertion_date
+            alert["alert_id"] = f"{alert['title'][:50]}_{alert['pub_date'][:20]}".replace(" ", "_").replace(":", "_")
+            alerts.append(alert)
+    return alerts
+
+
+def measure(label: str, parse, content: bytes):
+    tracemalloc.start()
+    started = time.perf_counter()
+    alerts = parse(content)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<24} {len(alerts):>7} items  {elapsed * 1000:8.1f} ms  "
+          f"{len(alerts) / elapsed:>10,.0f} items/s  peak {peak / 2**20:6.1f} MiB")
+    return alerts
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    content = synthetic_feed(count)
+    print(f"Feed: {count} items, {len(content) / 2**20:.1f} MiB")
+
+    old = measure("legacy fromstring/find", legacy_parse, content)
+    ttms_rss_scraper.classify_alert.cache_clear()
+    new = measure("iterparse + compiled", ttms_rss_scraper.parse_rss_alerts, content)
+    changed = sum(
+        (a["alert_level"], a["alert_type"]) != (b["alert_level"], b["alert_type"]) for a, b in zip(old, new)
+    )
+    print(f"Classification differs for {changed} of {count} items (whole-word matching)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ttms_rss_scraper.DB_FILE = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(ttms_rss_scraper.DB_FILE)
+            ttms_rss_scraper.bulk_save_alerts(new)
+        conn = storage.connect(ttms_rss_scraper.DB_FILE)
+        with conn:
+            conn.execute("UPDATE weather_alerts SET alert_level = 'UNKNOWN', alert_type = 'OTHER'")
+        conn.close()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = ttms_rss_scraper.reclassify_alerts()
+        elapsed = time.perf_counter() - started
+        print(f"{'reclassify (all stale)':<24} {result['checked']:>7} rows   {elapsed * 1000:8.1f} ms  -> {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+End-to-end scraper benchmark against the local stand-in server.
+
+Starts benchmarks/standin_server.py in-process, then runs each scenario in
+a fresh child process (so peak RSS belongs to that run alone) against a
+throwaway database:
+  forecast_cold   run_forecast_scraper() into an empty database (every page)
+  forecast_warm   the same again, incremental; page 1 comes back 304
+  rss_cold        run_rss_scraper() into an empty database
+  rss_warm        the same again; the feed comes back 304
+Each scenario reports median wall time over the repeats, pages/s, DB rows
+written per second, peak RSS and the run's phase timings, and the whole
+set goes to a JSON file so two versions can be compared:
+
+  python benchmarks/bench_scrapers.py --out=before.json
+  (change things)
+  python benchmarks/bench_scrapers.py --out=after.json --compare=before.json
+
+Usage: python benchmarks/bench_scrapers.py [--forecasts=N] [--per-page=N]
+       [--rss-items=N] [--latency-ms=N] [--repeat=N] [--out=path] [--compare=path]
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, ".."))
+
+SCENARIOS = {
+    "forecast_cold": ("forecast", True),
+    "forecast_warm": ("forecast", False),
+    "rss_cold": ("rss", True),
+    "rss_warm": ("rss", False),
+}
+
+
+def child(kind: str) -> None:
+    """Run one scraper in this process and print its measurements as JSON."""
+    import run_scrapers
+    import storage
+    # run_scrapers imports these on first use; load them before the clock starts
+    import ttms_rss_scraper  # noqa: F401
+    import ttms_scraper  # noqa: F401
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage.ensure_schema(storage.DB_FILE)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if kind == "forecast":
+            run_scrapers.run_forecast_scraper()
+        else:
+            run_scrapers.run_rss_scraper()
+    wall = time.perf_counter() - started
+
+    conn = sqlite3.connect(storage.DB_FILE)
+    try:
+        run_id, success, written, pages = conn.execute(
+            "SELECT run_id, success, records_inserted, pages_fetched FROM scraper_analytics "
+            "ORDER BY run_id DESC LIMIT 1"
+        ).fetchone()
+        phases = dict(conn.execute("SELECT phase, seconds FROM scraper_run_phases WHERE run_id = ?", (run_id,)))
+    finally:
+        conn.close()
+    print(json.dumps({
+        "wall_seconds": wall,
+        "success": bool(success),
+        "rows": written or 0,
+        "pages": pages if pages is not None else 1,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "phases": phases,
+    }))
+
+
+def run_child(kind: str, env: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), f"--child={kind}"],
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(f"{kind} run failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs: list) -> dict:
+    wall = statistics.median(r["wall_seconds"] for r in runs)
+    last = runs[-1]
+    return {
+        "wall_seconds": wall,
+        "pages": last["pages"],
+        "pages_per_second": last["pages"] / wall if wall else 0.0,
+        "rows": last["rows"],
+        "rows_per_second": last["rows"] / wall if wall else 0.0,
+        "peak_rss_mib": max(r["peak_rss_mib"] for r in runs),
+        "success": all(r["success"] for r in runs),
+        "phases": {p: statistics.median(r["phases"].get(p, 0.0) for r in runs) for p in last["phases"]},
+    }
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def report(results: dict, baseline: dict | None) -> None:
+    print(f"{'scenario':<15} {'wall s':>8} {'pages/s':>9} {'rows/s':>10} {'peak MiB':>9}")
+    for name, r in results.items():
+        line = (f"{name:<15} {r['wall_seconds']:>8.3f} {r['pages_per_second']:>9.1f} "
+                f"{r['rows_per_second']:>10,.0f} {r['peak_rss_mib']:>9.1f}")
+        old = (baseline or {}).get(name)
+        if old and old["wall_seconds"]:
+            line += f"   wall {(r['wall_seconds'] / old['wall_seconds'] - 1) * 100:+.1f}% vs baseline"
+        print(line)
+
+
+def main() -> None:
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    if "child" in options:
+        child(options["child"])
+        return
+
+    from standin_server import StandinData, make_server, start_in_thread
+
+    config = {
+        "forecasts": int(options.get("forecasts", 2000)),
+        "per_page": int(options.get("per-page", 20)),
+        "rss_items": int(options.get("rss-items", 1000)),
+        "latency_ms": float(options.get("latency-ms", 20)),
+        "repeat": int(options.get("repeat", 3)),
+    }
+    data = StandinData(config["forecasts"], config["per_page"], config["rss_items"])
+    server = make_server(data, config["latency_ms"])
+    server_env = start_in_thread(server)
+
+    results: dict = {}
+    try:
+        for name, (kind, cold) in SCENARIOS.items():
+            runs = []
+            for _ in range(config["repeat"]):
+                with tempfile.TemporaryDirectory() as tmp:
+                    env = dict(os.environ, **server_env, TTMS_DB_FILE=os.path.join(tmp, "bench.db"))
+                    if not cold:
+                        run_child(kind, env)  # prime the database and validators
+                    runs.append(run_child(kind, env))
+            results[name] = summarize(runs)
+    finally:
+        server.shutdown()
+
+    baseline = None
+    if options.get("compare"):
+        with open(options["compare"], encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+    report(results, baseline)
+
+    out = options.get("out") or "bench_scrapers.json"
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({
+            "version": git_version(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "config": config,
+            "results": results,
+        }, fh, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
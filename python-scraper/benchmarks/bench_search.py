@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Full-text search latency on a synthetic multi-year history.
+
+Fills a throwaway database with forecasts (four a day) and alerts (one a
+day) over the given number of years, then times each query as:
+  fts     search_forecasts / search_alerts (FTS5 MATCH, BM25 ranking)
+  like    the LIKE '%term%' scan over the same columns it replaces
+with and without date / area filters. Times are medians over several runs.
+
+Usage: python benchmarks/bench_search.py [years]
+"""
+
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import search  # noqa: E402
+import storage  # noqa: E402
+import ttms_rss_scraper  # noqa: E402
+import ttms_scraper  # noqa: E402
+from textcodec import COMPRESSED_COLUMNS, SQL_FUNCTION  # noqa: E402
+
+RUNS = 15
+AREAS = [
+    ("TRINIDAD,TOBAGO & THE Southern WINDWARDS", "The Northern Windward & Leeward Islands", ""),
+    ("Trinidad", "Tobago", ""),
+    ("Trinidad and Tobago", "", "Grenada"),
+]
+# Everyday wording, plus event wording that only a few forecasts use
+PHRASES = [
+    "Generally fair but slightly hazy conditions despite brief, isolated showers.",
+    "Partly cloudy with periods of light to moderate showers.",
+    "Hot and sunny with a low chance of afternoon showers over western areas.",
+    "Fair and breezy conditions are expected to persist into the night.",
+    "Mostly sunny, becoming partly cloudy during the afternoon.",
+    "A few light showers may affect eastern coastal districts early.",
+    "Clear to partly cloudy skies overnight with light winds.",
+    "Seas moderate in open waters with waves near 1.5m, occasionally 2.0m.",
+    "Seas slight in sheltered areas with waves below 1.0m.",
+    "Warm and humid with a moderate chance of isolated showers.",
+]
+EVENT_PHRASES = [
+    "A tropical wave is expected to bring heavy showers and gusty winds.",
+    "Saharan dust haze will reduce visibility over the islands.",
+    "Localized street flooding and landslides are possible in heavy downpours.",
+    "The Intertropical Convergence Zone is producing scattered thunderstorms.",
+]
+EVENT_CHANCE = 0.05
+ALERT_TITLES = [
+    "Adverse Weather Alert #{n} - Yellow Level",
+    "Hazardous Seas Alert #{n} - YELLOW LEVEL",
+    "Riverine Flood Alert #{n} - Orange Level",
+    "Hot Spell Alert Discontinuation - GREEN LEVEL",
+]
+QUERIES = [
+    ("heavy showers", {}),
+    ("showers", {}),
+    ("flooding", {}),
+    ('"saharan dust"', {}),
+    ("thunderstorms", {"start": f"{date.today().year - 1}-01-01", "end": f"{date.today().year - 1}-06-30"}),
+    ("gusty winds", {"area": "tobago"}),
+]
+
+
+def synthetic_history(years: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * years)
+    forecasts, alerts = [], []
+    for day in range(365 * years):
+        d = start + timedelta(days=day)
+        for slot in range(4):
+            areas = rng.choice(AREAS)
+
+            def text(k):
+                phrases = rng.sample(PHRASES, k)
+                if rng.random() < EVENT_CHANCE:
+                    phrases.append(rng.choice(EVENT_PHRASES))
+                return " ".join(phrases)
+
+            forecasts.append({
+                "forecastid": len(forecasts) + 1,
+                "insertionDate": d.isoformat(),
+                "forecastPeriod": f"slot {slot}",
+                "forecastArea1": areas[0], "forecastArea2": areas[1], "forecastArea3": areas[2],
+                "textArea1": text(2), "textArea2": text(1), "textArea3": text(1),
+                "synopsis": text(3), "outlook1": text(1), "outlook2": text(1),
+            })
+        title = rng.choice(ALERT_TITLES).format(n=day % 5 + 1)
+        alerts.append({
+            "alert_id": f"bench_{day}",
+            "title": title,
+            "description": " ".join(rng.sample(PHRASES + EVENT_PHRASES, 3)),
+            "link": "",
+            "pub_date": d.strftime("%a, %d %b %Y 12:00:00 +0000"),
+            "alert_level": "UNKNOWN", "alert_type": "OTHER",
+            "issued_by": "Trinidad and Tobago Meteorological Service",
+            "insertion_date": d.isoformat(),
+        })
+    return forecasts, alerts
+
+
+def like_forecasts(db_file: str, text: str, start=None, end=None, area=None):
+    """
+    The pre-FTS way: every word LIKE-matched against every text column,
+    newest first (there is no relevance to sort by). Compressed columns are
+    decoded first, as a LIKE scan now has to.
+    """
+    words = text.strip('"').split()
+    columns = [f"{SQL_FUNCTION}({c})" if c in COMPRESSED_COLUMNS["detailed_forecasts"] else c
+               for c in search.FORECAST_TEXT_COLUMNS]
+    sql = "SELECT forecastid FROM detailed_forecasts WHERE 1"
+    params = []
+    for w in words:
+        sql += " AND (" + " OR ".join(f"{c} LIKE ?" for c in columns) + ")"
+        params += [f"%{w}%"] * len(columns)
+    if start:
+        sql += " AND insertionDate >= ?"
+        params.append(start)
+    if end:
+        sql += " AND insertionDate <= ?"
+        params.append(end)
+    if area:
+        sql += " AND (forecastArea1 LIKE ? OR forecastArea2 LIKE ? OR forecastArea3 LIKE ?)"
+        params += [f"%{area}%"] * 3
+    conn = storage.acquire(db_file)
+    try:
+        return conn.execute(sql + " ORDER BY insertionDate DESC LIMIT 20", params).fetchall()
+    finally:
+        storage.release(conn)
+
+
+def median_ms(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    forecasts, alerts = synthetic_history(years)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench.db")
+        ttms_scraper.DB_FILE = ttms_rss_scraper.DB_FILE = db_file
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(db_file)
+            ttms_scraper.bulk_save_forecasts(forecasts)
+            ttms_rss_scraper.bulk_save_alerts(alerts)
+        elapsed = time.perf_counter() - started
+        print(f"History: {years} years, {len(forecasts)} forecasts, {len(alerts)} alerts "
+              f"(loaded and indexed in {elapsed:.1f} s, {os.path.getsize(db_file) / 2**20:.1f} MiB)")
+
+        storage.open_shared(db_file)
+        try:
+            print(f"{'query':<56} {'hits':>5} {'fts ms':>9} {'like ms':>9}")
+            for text, filters in QUERIES:
+                hits = len(search.search_forecasts(db_file, text, **filters))
+                fts = median_ms(lambda: search.search_forecasts(db_file, text, **filters))
+                like = median_ms(lambda: like_forecasts(db_file, text, **filters))
+                label = text + "".join(f" {k}={v}" for k, v in filters.items())
+                print(f"{'forecasts: ' + label:<56} {hits:>5} {fts:>9.2f} {like:>9.2f}")
+            since = f"{date.today().year - 1}-01-01"
+            for text in ("flood", "hazardous seas"):
+                hits = len(search.search_alerts(db_file, text, start=since))
+                fts = median_ms(lambda: search.search_alerts(db_file, text, start=since))
+                print(f"{'alerts: ' + text + ' start=' + since:<56} {hits:>5} {fts:>9.2f} {'-':>9}")
+        finally:
+            storage.close_shared(db_file)
+
+
+if __name__ == "__main__":
+    main()
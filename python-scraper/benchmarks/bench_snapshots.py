@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+App snapshot publishing: full payload vs delta sizes, and publish time.
+
+Fills a throwaway database with synthetic forecasts (cloned from
+forecast_page_1.json) and alerts spread over the last few days, publishes
+the first snapshot, then applies one change per step (a new forecast, an
+amended one, new alerts, an all-clear, a step with no change at all) and
+publishes again. Prints sizes (brotli only when installed) and publish
+times.
+
+Usage: python benchmarks/bench_snapshots.py [--forecasts=N] [--alerts=N] [--keep=K]
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import snapshots  # noqa: E402
+import storage  # noqa: E402
+import ttms_rss_scraper  # noqa: E402
+import ttms_scraper  # noqa: E402
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+LEVELS = ["YELLOW", "YELLOW", "ORANGE", "RED"]
+TYPES = ["ADVERSE_WEATHER", "FLOOD", "HAZARDOUS_SEAS", "HIGH_WIND"]
+
+
+def forecast(template: dict, forecast_id: int) -> dict:
+    item = copy.copy(template)
+    item["forecastid"] = forecast_id
+    item["insertionDate"] = (date(2020, 1, 1) + timedelta(days=forecast_id // 2)).isoformat()
+    return item
+
+
+def alert(n: int, published: datetime, level: str, alert_type: str) -> dict:
+    return {
+        "alert_id": f"bench-{n}",
+        "title": f"{level.title()} Level {alert_type.replace('_', ' ').title()} Alert #{n}",
+        "description": f"Synthetic alert {n}. " + "Residents in low-lying areas should remain vigilant. " * 8,
+        "link": f"https://example.invalid/alerts/{n}",
+        "pub_date": format_datetime(published),
+        "alert_level": level,
+        "alert_type": alert_type,
+        "issued_by": "TTMS",
+        "insertion_date": published.isoformat(),
+    }
+
+
+def read_snapshot(root: str) -> dict:
+    """The payload the manifest names."""
+    name = snapshots.load_manifest(root)["snapshot"]["path"]
+    with open(os.path.join(root, name), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main() -> None:
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    forecasts = int(options.get("forecasts", 2000))
+    alerts = int(options.get("alerts", 400))
+    keep = int(options.get("keep", 3))
+
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        template = json.load(fh)["items"][0]
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "snapshots.db")
+        root = os.path.join(tmp, "snapshots")
+        ttms_scraper.DB_FILE = ttms_rss_scraper.DB_FILE = db_file
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(db_file)
+            ttms_scraper.bulk_save_forecasts([forecast(template, i + 1) for i in range(forecasts)])
+            # One alert every half hour, the latest 96 inside the default 48 h window
+            ttms_rss_scraper.bulk_save_alerts([
+                alert(i, now - timedelta(minutes=30 * (alerts - i)), LEVELS[i % 4], TYPES[i // 4 % 4])
+                for i in range(alerts)
+            ])
+
+        next_id, next_alert = forecasts + 1, alerts
+
+        def new_forecast() -> None:
+            nonlocal next_id
+            ttms_scraper.bulk_save_forecasts([forecast(template, next_id)])
+            next_id += 1
+
+        def amend_forecast() -> None:
+            item = forecast(template, next_id - 1)
+            item["textArea1"] = "Amended: " + (item.get("textArea1") or "")
+            ttms_scraper.bulk_save_forecasts([item])
+
+        def new_alerts(alert_type: str) -> None:
+            nonlocal next_alert
+            ttms_rss_scraper.bulk_save_alerts([alert(next_alert + i, now + timedelta(minutes=i), "ORANGE", alert_type)
+                                               for i in range(3)])
+            next_alert += 3
+
+        def all_clear() -> None:
+            nonlocal next_alert
+            # Worded as the real ones are: no number, so it ends every flood alert
+            ttms_rss_scraper.bulk_save_alerts([dict(alert(next_alert, now + timedelta(minutes=10), "GREEN", "FLOOD"),
+                                                    title="Flood Alert Discontinuation - Green Level")])
+            next_alert += 1
+
+        steps = [
+            ("initial", lambda: None),
+            ("new forecast", new_forecast),
+            ("amended forecast", amend_forecast),
+            ("3 new alerts", lambda: new_alerts("FLOOD")),
+            ("flood all-clear", all_clear),
+            ("no change", lambda: None),
+            ("new forecast", new_forecast),
+            ("3 new alerts", lambda: new_alerts("HIGH_WIND")),
+        ]
+        brotli = snapshots._load_brotli() is not None
+        print(f"{'step':<18} {'ver':>4} {'alerts':>6} {'full':>9} {'full.gz':>8}"
+              f"{' full.br' if brotli else ''} {'delta (prev)':>13} {'delta.gz':>9} {'publish':>9}")
+        for label, change in steps:
+            with contextlib.redirect_stdout(io.StringIO()):
+                change()
+            started = time.perf_counter()
+            result = snapshots.publish_snapshot(db_file, root, keep, now=now + timedelta(minutes=15))
+            elapsed = time.perf_counter() - started
+            payload = read_snapshot(root)
+            manifest = snapshots.load_manifest(root)
+            snap = manifest["snapshot"]
+            previous = manifest["deltas"].get(str(result["version"] - 1))
+            delta_cols = f"{previous['size']:>13} {previous['gzip_size']:>9}" if previous else f"{'-':>13} {'-':>9}"
+            br_col = f" {snap.get('br_size', 0):>8}" if brotli else ""
+            print(f"{label:<18} {result['version']:>4} {len(payload['alerts']):>6} {snap['size']:>9} "
+                  f"{snap['gzip_size']:>8}{br_col} {delta_cols} {elapsed * 1000:>7.1f} ms")
+        if not brotli:
+            print("brotli not installed; no .br files written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Text column compression: database size and scan times, plain vs compressed.
+
+Fills a throwaway database with synthetic forecasts (the sample forecast
+with varied prose, figures and dates, jsonObject the JSON of the whole item
+as the site sends it) and alerts whose descriptions are the real ones from
+the repository database, all stored plain. That file is vacuumed and
+copied; the copy then gets compress_existing() (dictionary training
+included) and a VACUUM. Both are timed on:
+  numeric   AVG() over a figure stored after the prose columns in each row
+  text      length() of every prose column, decoded
+  search    search_forecasts() / search_alerts()
+
+Usage: python benchmarks/bench_text_compression.py [years]
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import search  # noqa: E402
+import storage  # noqa: E402
+import textcodec  # noqa: E402
+import ttms_rss_scraper  # noqa: E402
+import ttms_scraper  # noqa: E402
+
+RUNS = 7
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+REPO_DB = os.path.join(os.path.dirname(__file__), "..", "database", "weather_forecasts.db")
+PHRASES = [
+    "Generally fair but slightly hazy conditions despite brief, isolated showers.",
+    "Partly cloudy with periods of light to moderate showers.",
+    "Hot and sunny with a low chance of afternoon showers over western areas.",
+    "Fair and breezy conditions are expected to persist into the night.",
+    "Mostly sunny, becoming partly cloudy during the afternoon.",
+    "A few light showers may affect eastern coastal districts early.",
+    "Clear to partly cloudy skies overnight with light winds.",
+    "Variably cloudy with few showers and isolated thunderstorm activity.",
+    "A tropical wave is expected to bring heavy showers and gusty winds.",
+    "Saharan dust haze will reduce visibility over the islands.",
+    "Localized street flooding and landslides are possible in heavy downpours.",
+    "The Intertropical Convergence Zone is producing scattered thunderstorms.",
+]
+QUERIES = ["heavy showers", "saharan dust", "flooding", "thunderstorms"]
+NUMERIC_SQL = "SELECT AVG(CAST(PiarcoActMxTemp AS REAL)), COUNT(*) FROM detailed_forecasts"
+TEXT_SQL = "SELECT SUM({}) FROM detailed_forecasts".format(
+    " + ".join(f"COALESCE(length({textcodec.SQL_FUNCTION}({c})), 0)"
+               for c in textcodec.COMPRESSED_COLUMNS["detailed_forecasts"]))
+
+
+def real_descriptions() -> list:
+    """Alert descriptions from the repository database (opened read-only)."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(REPO_DB)}?mode=ro", uri=True)
+    storage.register_text_functions(conn, REPO_DB)
+    try:
+        return [row[0] for row in conn.execute(
+            f"SELECT {textcodec.SQL_FUNCTION}(description) FROM weather_alerts WHERE description != ''")]
+    finally:
+        conn.close()
+
+
+def synthetic_history(years: int, descriptions: list, seed: int = 3) -> tuple:
+    rng = random.Random(seed)
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        template = json.load(fh)["items"][0]
+    start = date.today() - timedelta(days=365 * years)
+    forecasts, alerts = [], []
+    for day in range(365 * years):
+        d = start + timedelta(days=day)
+        for slot in range(4):
+            item = copy.copy(template)
+            item["forecastid"] = len(forecasts) + 1
+            item["insertionDate"] = d.isoformat()
+            item["timePeriod"] = d.strftime("%A %d of %B %Y ")
+            for column, k in (("textArea1", 3), ("textArea2", 2), ("textArea3", 1), ("synopsis", 4)):
+                item[column] = " ".join(rng.sample(PHRASES, k))
+            for column in ("PiarcoActMxTemp", "CrownActMxTemp", "PiarcoMnTemp", "CrownMnTemp"):
+                item[column] = f"{rng.uniform(22, 34):.1f}"
+            item["PiarcoRainfall"] = rng.choice(["TR", "0.0", f"{rng.uniform(0, 40):.1f}"])
+            item["jsonObject"] = ""
+            item["jsonObject"] = json.dumps(item)
+            forecasts.append(item)
+        alerts.append({
+            "alert_id": f"bench_{day}",
+            "title": f"Adverse Weather Alert #{day % 5 + 1} - Yellow Level",
+            "description": descriptions[day % len(descriptions)],
+            "link": "",
+            "pub_date": d.strftime("%a, %d %b %Y 12:00:00 +0000"),
+            "alert_level": "YELLOW", "alert_type": "ADVERSE_WEATHER",
+            "issued_by": "Trinidad and Tobago Meteorological Service",
+            "insertion_date": d.isoformat(),
+        })
+    return forecasts, alerts
+
+
+def vacuum(db_file: str) -> int:
+    conn = storage.connect(db_file)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return os.path.getsize(db_file)
+
+
+def median_ms(fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def scan(db_file: str, sql: str):
+    conn = storage.connect(db_file)
+    try:
+        return conn.execute(sql).fetchone()
+    finally:
+        conn.close()
+
+
+def searches(db_file: str) -> list:
+    return [[hit["forecastid"] for hit in search.search_forecasts(db_file, q)] for q in QUERIES] + \
+        [[hit["alert_id"] for hit in search.search_alerts(db_file, q)] for q in QUERIES]
+
+
+def main() -> None:
+    years = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    descriptions = real_descriptions()
+    forecasts, alerts = synthetic_history(years, descriptions)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, "plain.db")
+        packed = os.path.join(tmp, "compressed.db")
+        ttms_scraper.DB_FILE = ttms_rss_scraper.DB_FILE = plain
+        textcodec.TEXT_COMPRESSION = False
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.ensure_schema(plain)
+            ttms_scraper.bulk_save_forecasts(forecasts)
+            ttms_rss_scraper.bulk_save_alerts(alerts)
+        size_plain = vacuum(plain)
+        shutil.copyfile(plain, packed)
+
+        textcodec.TEXT_COMPRESSION = True
+        started = time.perf_counter()
+        result = textcodec.compress_existing(packed)
+        elapsed = time.perf_counter() - started
+        size_packed = vacuum(packed)
+
+        print(f"History: {years} years, {len(forecasts)} forecasts, {len(alerts)} alerts "
+              f"({len(descriptions)} real descriptions)")
+        print(f"compress_existing: dictionary {result['dictionary_bytes']:,} bytes, "
+              f"{result['updated']} of {result['rows']} rows re-encoded in {elapsed:.2f} s")
+        timings = {}
+        for label, db_file in (("plain", plain), ("compressed", packed)):
+            timings[label] = (
+                median_ms(lambda: scan(db_file, NUMERIC_SQL)),
+                median_ms(lambda: scan(db_file, TEXT_SQL)),
+                median_ms(lambda: searches(db_file)),
+            )
+        print(f"{'':<11} {'file':>12} {'numeric scan':>13} {'text scan':>11} {'searches':>10}")
+        for label, size in (("plain", size_plain), ("compressed", size_packed)):
+            numeric, text, found = timings[label]
+            print(f"{label:<11} {size:>12,} {numeric:>10.2f} ms {text:>8.2f} ms {found:>7.2f} ms")
+        print(f"size {size_packed / size_plain:.0%} of plain")
+
+
+if __name__ == "__main__":
+    main()
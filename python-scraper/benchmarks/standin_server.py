@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for metproducts.gov.tt, for offline benchmarks.
+
+Serves synthetic data in the shape the scrapers expect:
+  GET /api/forecasts?page=N        paginated forecasts, newest first, built
+                                   from forecast_page_1.json's item
+  GET /ttms/public/api/feed        RSS feed of weather alerts
+Every response carries an ETag and honours If-None-Match, as the real
+server does, so conditional (unchanged) runs can be measured too. Each
+request waits latency_ms before answering.
+
+Faults can be injected for resilience testing (see Faults): a share of
+requests answered 502/503, a share with truncated bodies (either cut short
+with a matching Content-Length, or the connection dropped mid-body), extra
+random latency, forecast pages that always fail, or the whole server down.
+
+Point the scrapers at it with
+  TTMS_API_BASE_URL=http://127.0.0.1:<port>/api/forecasts
+  TTMS_RSS_FEED_URL=http://127.0.0.1:<port>/ttms/public/api/feed
+
+Usage: python benchmarks/standin_server.py [--port=N] [--forecasts=N]
+       [--per-page=N] [--rss-items=N] [--latency-ms=N] [--error-rate=F]
+       [--truncate-rate=F] [--jitter-ms=N] [--down-pages=N,N]
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+SAMPLE_PAGE = os.path.join(os.path.dirname(__file__), "..", "forecast_page_1.json")
+FORECAST_PATH = "/api/forecasts"
+RSS_PATH = "/ttms/public/api/feed"
+# Forecast n is issued on day (n - 1) // 2 after this, so publishing more never changes an old one
+BASE_DATE = date(2024, 1, 1)
+
+ALERT_TITLES = [
+    "Adverse Weather Alert #{n} - Yellow Level",
+    "Hazardous Seas Alert #{n} - YELLOW LEVEL",
+    "Riverine Flood Alert #{n} - Orange Level",
+    "High Winds Alert #{n} - Yellow Level",
+    "Adverse Weather Alert Discontinuation - GREEN LEVEL",
+]
+
+
+class StandinData:
+    """Deterministic synthetic forecasts and alerts; pages are built on demand and cached."""
+
+    def __init__(self, forecasts: int = 500, per_page: int = 20, rss_items: int = 200) -> None:
+        with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+            self.template = json.load(fh)["items"][0]
+        self.forecasts = forecasts
+        self.per_page = per_page
+        self.rss_items = rss_items
+        self.page_count = max(1, -(-forecasts // per_page))
+
+    def publish(self, count: int) -> None:
+        """Add count newer forecasts, shifting the existing ones (unchanged) down the pages."""
+        self.forecasts += count
+        self.page_count = max(1, -(-self.forecasts // self.per_page))
+        self.forecast_page.cache_clear()
+
+    def forecast(self, forecastid: int) -> Dict[str, Any]:
+        item = copy.copy(self.template)
+        day = BASE_DATE + timedelta(days=(forecastid - 1) // 2)
+        item["forecastid"] = forecastid
+        item["insertionDate"] = day.isoformat()
+        item["IssuedAt"] = "5:00 AM" if forecastid % 2 else "5:00 PM"
+        item["PiarcoMnTemp"] = f"{21 + forecastid % 5}.{forecastid % 10}"
+        item["PiarcoRainfall"] = "TR" if forecastid % 7 == 0 else f"{forecastid % 13}.0"
+        return item
+
+    @functools.lru_cache(maxsize=None)
+    def forecast_page(self, page: int) -> bytes:
+        # Newest first: page 1 holds the highest forecastids
+        top = self.forecasts - (page - 1) * self.per_page
+        ids = range(top, max(top - self.per_page, 0), -1) if page <= self.page_count else range(0)
+        return json.dumps({
+            "items": [self.forecast(i) for i in ids],
+            "_links": {"self": {"href": f"{FORECAST_PATH}?page={page}"}},
+            "_meta": {
+                "totalCount": self.forecasts,
+                "pageCount": self.page_count,
+                "currentPage": page,
+                "perPage": self.per_page,
+            },
+        }).encode("utf-8")
+
+    @functools.lru_cache(maxsize=None)
+    def rss_feed(self) -> bytes:
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        items = []
+        for i in range(self.rss_items):
+            title = ALERT_TITLES[i % len(ALERT_TITLES)].format(n=i % 5 + 1)
+            pub_date = (start - timedelta(hours=i)).strftime("%a, %d %b %Y %H:%M:%S +0000")
+            items.append(
+                f"<item><title>{escape(title)}</title>"
+                f"<description>{escape('Residents are advised to monitor conditions. ' * 6)}</description>"
+                f"<link>https://metproducts.gov.tt/ttms/alerts/{i}</link>"
+                f"<pubDate>{pub_date}</pubDate></item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>TTMS</title>'
+            + "".join(items) + "</channel></rss>"
+        ).encode("utf-8")
+
+
+class Faults:
+    """
+    Failures to inject, drawn per request from a seeded RNG so a run is
+    repeatable. Attributes may be changed while the server runs; injected
+    counts how many of each fault were served.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        truncate_rate: float = 0.0,
+        jitter_ms: float = 0.0,
+        down_pages: Tuple[int, ...] = (),
+        down: bool = False,
+        seed: int = 1,
+    ) -> None:
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.jitter_ms = jitter_ms
+        self.down_pages = set(down_pages)
+        self.down = down
+        self.injected: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def pick(self, page: int | None) -> Tuple[str | None, float]:
+        """(fault or None, extra latency in seconds) for one request."""
+        with self._lock:
+            roll = self._rng.random()
+            delay = self._rng.uniform(0, self.jitter_ms) / 1000.0
+            if self.down or page in self.down_pages:
+                fault = "down"
+            elif roll < self.error_rate:
+                fault = "error"
+            elif roll < self.error_rate + self.truncate_rate:
+                fault = self._rng.choice(("cut", "reset"))
+            else:
+                fault = None
+            if fault:
+                self.injected[fault] = self.injected.get(fault, 0) + 1
+            return fault, delay
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    data: StandinData = None  # set by make_server()
+    faults: Faults = None
+    latency = 0.0
+    requests: List[Tuple[str, int]] = None
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def handle(self) -> None:
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away (e.g. a benchmark killed it mid-run)
+            pass
+
+    def _send(self, status: int, body: bytes, content_type: str, fault: str | None = None) -> None:
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        if fault == "cut":
+            # A proxy that lost the tail: short body, consistent headers
+            body = body[:len(body) // 2]
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if fault == "reset":
+            # Promise the whole body, send half, drop the connection
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+        elif body:
+            self.wfile.write(body)
+        self.requests.append((self.path, status))
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        page = None
+        if url.path == FORECAST_PATH:
+            try:
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+            except ValueError:
+                self._send(400, b'{"error":"bad page"}', "application/json")
+                return
+        fault, jitter = self.faults.pick(page) if self.faults else (None, 0.0)
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+        if fault in ("down", "error"):
+            status = 503 if fault == "down" else 502
+            self._send(status, b'{"error":"upstream unavailable"}', "application/json")
+        elif url.path == FORECAST_PATH:
+            self._send(200, self.data.forecast_page(page), "application/json; charset=UTF-8", fault)
+        elif url.path == RSS_PATH:
+            self._send(200, self.data.rss_feed(), "application/rss+xml; charset=UTF-8", fault)
+        else:
+            self._send(404, b'{"error":"not found"}', "application/json")
+
+
+def make_server(
+    data: StandinData,
+    latency_ms: float = 0.0,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    faults: Faults | None = None,
+) -> ThreadingHTTPServer:
+    """Build (but do not start) a stand-in server; port 0 picks a free one."""
+    handler = type("BoundStandinHandler", (StandinHandler,), {
+        "data": data, "faults": faults, "latency": latency_ms / 1000.0, "requests": [],
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(server: ThreadingHTTPServer) -> Dict[str, str]:
+    """Serve in a daemon thread; returns the env vars that point the scrapers at it."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    return {"TTMS_API_BASE_URL": base + FORECAST_PATH, "TTMS_RSS_FEED_URL": base + RSS_PATH}
+
+
+def main() -> None:
+    options = dict(a[2:].partition("=")[::2] for a in sys.argv[1:] if a.startswith("--"))
+    data = StandinData(
+        forecasts=int(options.get("forecasts", 500)),
+        per_page=int(options.get("per-page", 20)),
+        rss_items=int(options.get("rss-items", 200)),
+    )
+    faults = Faults(
+        error_rate=float(options.get("error-rate", 0)),
+        truncate_rate=float(options.get("truncate-rate", 0)),
+        jitter_ms=float(options.get("jitter-ms", 0)),
+        down_pages=tuple(int(p) for p in options.get("down-pages", "").split(",") if p),
+    )
+    server = make_server(data, float(options.get("latency-ms", 0)), port=int(options.get("port", 8780)), faults=faults)
+    env = start_in_thread(server)
+    for name, value in env.items():
+        print(f"{name}={value}")
+    print(f"{data.forecasts} forecasts over {data.page_count} pages, {data.rss_items} alerts. Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Typed marine and rain-chance fields parsed out of the forecast free text.
+
+detailed_forecasts keeps the sea state (" Slight to Moderate "), the wave
+heights (" 1.2m to 1.5m, Near 2.0m (Leewards) "), probrainfall and the
+"medium (40% - 60%) chance of ..." wording in textArea1 as the site sends
+them. forecast_conditions holds one row per forecast with those parsed
+into numbers, qualifiers and places, written in the same transaction as
+the forecast, so nothing downstream has to parse them again:
+
+  seas_min, seas_max          WMO sea state codes (see SEA_STATES)
+  waves1_*, waves2_*          metres: min / max of the main range (NULL on an
+                              open side: "Below 1.0m" has no min), its
+                              qualifier ("below", "near", ...) and area, then
+                              the same for a second range if the text gives
+                              one (waves*_second_*): "Near 2.0m (Leewards)"
+                              after the main range, or "below 1.0m in
+                              sheltered areas" after "... in open waters"
+  rain_probability            probrainfall as a percentage
+  chance_level, chance_min,   the textArea1 chance with the highest upper
+  chance_max, chance_of       bound: level word, percentages and what of
+
+The same strings come back forecast after forecast, so each parser is a
+handful of precompiled regexes with its results cached per text.
+"""
+
+import functools
+import os
+import re
+import sqlite3
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+import storage
+from textcodec import codec
+
+# --- Configuration ---
+# Distinct texts remembered per parser
+PARSE_CACHE_SIZE = 4096
+
+# WMO code 3700 sea states; "calm" covers both calm codes
+SEA_STATES: Dict[str, int] = {
+    'calm': 0, 'smooth': 2, 'slight': 3, 'moderate': 4, 'rough': 5,
+    'very rough': 6, 'high': 7, 'very high': 8, 'phenomenal': 9,
+}
+
+# Wave qualifier -> which side of the range it leaves open (None: a single height)
+_WAVE_QUALIFIERS: Dict[str, str | None] = {
+    'below': 'min', 'under': 'min', 'less than': 'min', 'up to': 'min',
+    'above': 'max', 'over': 'max', 'in excess of': 'max',
+    'near': None, 'around': None, 'about': None,
+    'occasionally': None, 'at times': None, 'locally': None,
+}
+
+# (min, max, qualifier, area) of one wave height range
+WaveRange = Tuple[float | None, float | None, str | None, str | None]
+_NO_WAVES: WaveRange = (None, None, None, None)
+
+_NUMBER = r'(\d+(?:\.\d+)?)'
+# "1.5m", "1.5 metres", "1.5 meters"
+_METRES = r'(?:metres?|meters?|m)'
+# Longest names first so 'very rough' is not read as 'rough'
+_SEA_RE = re.compile(r'\b(%s)\b' % '|'.join(sorted(SEA_STATES, key=len, reverse=True)))
+_WAVE_RE = re.compile(
+    r'(?:\b(?P<qualifier>%s)\s+)?' % '|'.join(sorted(_WAVE_QUALIFIERS, key=len, reverse=True))
+    + _NUMBER + r'\s*' + _METRES + r'?(?:\s*(?:to|-|–)\s*' + _NUMBER + r')?\s*' + _METRES + r'\b'
+    + r'(?:\s*\((?P<paren>[^)]+)\)|\s+(?:in|near|along|over|off|across)\s+'
+    # An area runs up to punctuation or a joining word, where the next range starts
+    + r'(?P<area>[a-z][a-z &\'-]*?)(?=\s*(?:[,;.]|\band\b|\bbut\b|\bwhile\b|$)))?'
+)
+_PERCENT_RE = re.compile(_NUMBER + r'\s*%?')
+_CHANCE_RE = re.compile(
+    r'(?:\b(?P<level>low|medium|moderate|high)\s+)?'
+    r'\(\s*' + _NUMBER + r'\s*%?\s*(?:(?:-|–|to)\s*' + _NUMBER + r'\s*%?\s*)?\)'
+    r'\s*chance\b(?:\s+of)?\s*(?P<what>[^.,;\r\n]*)'
+)
+
+CONDITION_COLUMNS = [
+    'forecastid', 'seas_min', 'seas_max',
+    'waves1_min', 'waves1_max', 'waves1_qualifier', 'waves1_area',
+    'waves1_second_min', 'waves1_second_max', 'waves1_second_qualifier', 'waves1_second_area',
+    'waves2_min', 'waves2_max', 'waves2_qualifier', 'waves2_area',
+    'waves2_second_min', 'waves2_second_max', 'waves2_second_qualifier', 'waves2_second_area',
+    'rain_probability', 'chance_level', 'chance_min', 'chance_max', 'chance_of',
+]
+
+_INSERT_SQL = f'''
+    INSERT OR REPLACE INTO forecast_conditions ({', '.join(CONDITION_COLUMNS)})
+    VALUES ({', '.join(['?'] * len(CONDITION_COLUMNS))})
+'''
+
+# Columns read from detailed_forecasts to build conditions
+SOURCE_COLUMNS = ['forecastid', 'seas', 'waves1', 'waves2', 'probrainfall', 'textArea1']
+
+
+def _clean(text: Any) -> str:
+    return ' '.join(text.split()).lower() if isinstance(text, str) else ''
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_seas(text: str | None) -> Tuple[int | None, int | None]:
+    """(min, max) WMO sea state codes named in text ("Slight to Moderate" -> (3, 4))."""
+    codes = [SEA_STATES[name] for name in _SEA_RE.findall(_clean(text))]
+    return (min(codes), max(codes)) if codes else (None, None)
+
+
+def _wave_range(match: re.Match) -> WaveRange:
+    """(min, max, qualifier, area) of one _WAVE_RE match."""
+    qualifier, low, high = match.group('qualifier'), float(match.group(2)), match.group(3)
+    high = float(high) if high else low
+    open_side = _WAVE_QUALIFIERS.get(qualifier) if qualifier else None
+    area = match.group('paren') or match.group('area')
+    return (
+        None if open_side == 'min' else low,
+        None if open_side == 'max' else high,
+        qualifier,
+        area.strip() if area else None,
+    )
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_waves(text: str | None) -> Tuple[WaveRange, WaveRange]:
+    """
+    ((min, max, qualifier, area), (the same for a second range)) in metres
+    for a wave height text, all None where there is no such range. The
+    second range is kept as written, whether higher or lower than the first:
+    " 1.2m to 1.5m, Near 2.0m (Leewards) "
+        -> ((1.2, 1.5, None, None), (2.0, 2.0, 'near', 'leewards')),
+    " 1.0m to 1.5m in open waters and below 1.0m in sheltered areas "
+        -> ((1.0, 1.5, None, 'open waters'), (None, 1.0, 'below', 'sheltered areas')).
+    """
+    matches = list(islice(_WAVE_RE.finditer(_clean(text)), 2))
+    ranges = [_wave_range(match) for match in matches]
+    ranges += [_NO_WAVES] * (2 - len(ranges))
+    return ranges[0], ranges[1]
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_probability(text: str | None) -> float | None:
+    """A percentage such as "40" or "40%"; the upper bound of "40 - 60"."""
+    if isinstance(text, (int, float)):
+        return float(text)
+    values = [float(v) for v in _PERCENT_RE.findall(_clean(text))]
+    return max(values) if values else None
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_chance(text: str | None) -> Tuple[str | None, float | None, float | None, str | None]:
+    """
+    (level, min, max, what) for the "medium (40% - 60%) chance of isolated
+    thunderstorm activity" phrasing in text, taking the phrase with the
+    highest upper bound when there are several.
+    """
+    best = None
+    for match in _CHANCE_RE.finditer(_clean(text)):
+        low = float(match.group(2))
+        high = float(match.group(3)) if match.group(3) else low
+        if best is None or high > best[2]:
+            best = (match.group('level'), low, high, match.group('what').strip() or None)
+    return best or (None, None, None, None)
+
+
+def extract_conditions(forecast: Dict[str, Any]) -> Tuple | None:
+    """The forecast_conditions row (CONDITION_COLUMNS) for forecast, None without a forecastid."""
+    forecastid = forecast.get('forecastid')
+    if not isinstance(forecastid, int):
+        return None
+    waves1 = parse_waves(forecast.get('waves1'))
+    waves2 = parse_waves(forecast.get('waves2'))
+    return (
+        (forecastid,)
+        + parse_seas(forecast.get('seas'))
+        + waves1[0] + waves1[1]
+        + waves2[0] + waves2[1]
+        + (parse_probability(forecast.get('probrainfall')),)
+        + parse_chance(forecast.get('textArea1'))
+    )
+
+
+def save_conditions(conn: sqlite3.Connection, forecasts: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write (or replace) the conditions of forecasts on conn, inside the
+    caller's transaction. Returns the number of rows written.
+    """
+    rows = [row for row in map(extract_conditions, forecasts) if row is not None]
+    if rows:
+        conn.executemany(_INSERT_SQL, rows)
+    return len(rows)
+
+
+def _extract_chunk(db_file: str, rows: List[Tuple]) -> List[Tuple]:
+    """Worker: turn raw detailed_forecasts rows (textArea1 maybe compressed) into condition rows."""
+    text_codec = codec(db_file)
+    out = []
+    for row in rows:
+        forecast = dict(zip(SOURCE_COLUMNS, row))
+        forecast['textArea1'] = text_codec.decode(forecast['textArea1'])
+        condition = extract_conditions(forecast)
+        if condition is not None:
+            out.append(condition)
+    return out
+
+
+def backfill_conditions(
+    db_file: str,
+    workers: int | None = None,
+    chunk_size: int = 2000,
+    reparse: bool = False,
+) -> Dict[str, int]:
+    """
+    Fill forecast_conditions for every forecast that has none yet, or for
+    every forecast with reparse (after a parser change).
+
+    As in observations.backfill_observations, rows are read in forecastid
+    order in chunks, parsed across worker processes and written back by
+    this process, one transaction per chunk, with at most 2 * workers
+    chunks in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    totals = {"forecasts": 0, "conditions": 0}
+
+    storage.ensure_schema(db_file)
+    read_conn = sqlite3.connect(db_file)
+    write_conn = storage.connect(db_file)
+    try:
+        where = "" if reparse else "WHERE forecastid NOT IN (SELECT forecastid FROM forecast_conditions)"
+        cursor = read_conn.execute(f'''
+            SELECT {', '.join(SOURCE_COLUMNS)} FROM detailed_forecasts
+            {where}
+            ORDER BY forecastid
+        ''')
+
+        def write(rows: List[Tuple]) -> None:
+            with write_conn:
+                write_conn.executemany(_INSERT_SQL, rows)
+            totals["conditions"] += len(rows)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight: Deque = deque()
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                totals["forecasts"] += len(chunk)
+                in_flight.append(executor.submit(_extract_chunk, db_file, chunk))
+                if len(in_flight) >= 2 * workers:
+                    write(in_flight.popleft().result())
+            while in_flight:
+                write(in_flight.popleft().result())
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+    print(
+        f"Backfilled {totals['conditions']} condition row(s) "
+        f"from {totals['forecasts']} forecast(s) using {workers} worker(s)."
+    )
+    return totals
@@ -0,0 +1,212 @@
+"""
+Streaming export of the history tables to CSV, NDJSON or Parquet.
+
+Rows are read with fetchmany() and written chunk by chunk, so memory stays
+at one chunk however large the database is. Column projection and the date
+range become part of the SELECT; only the requested rows and columns ever
+leave SQLite. Values are typed on the way out: declared INTEGER / REAL /
+BOOLEAN columns keep their type, and the temperature and rainfall figures
+that detailed_forecasts stores as TEXT are converted to floats (see
+observations.OBSERVATION_FIELDS; 'TR' becomes 0.0). Compressed text
+columns are decoded in the SELECT (see textcodec.py).
+
+Parquet needs pyarrow, which is optional: without it the other formats
+still work and asking for Parquet raises ValueError.
+"""
+
+import csv
+import json
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+import storage
+from observations import OBSERVATION_FIELDS, to_number
+from textcodec import COMPRESSED_COLUMNS, SQL_FUNCTION
+
+# Exportable table -> ISO date/timestamp column the --from/--to range applies to
+EXPORT_TABLES = {
+    "detailed_forecasts": "insertionDate",
+    "weather_alerts": "insertion_date",
+    "scraper_analytics": "run_timestamp",
+}
+FORMATS = ("csv", "ndjson", "parquet")
+DEFAULT_CHUNK_SIZE = 1000
+
+_DECLARED_TYPES: Dict[str, type] = {"INTEGER": int, "REAL": float, "BOOLEAN": bool}
+
+
+def _to_bool(value: Any) -> bool | None:
+    return None if value is None else bool(value)
+
+
+def _to_int(value: Any) -> int | None:
+    if value is None or isinstance(value, int):
+        return value
+    number = to_number(value)
+    return None if number is None else int(number)
+
+
+# Text columns are passed through as SQLite returns them
+_CONVERTERS: Dict[type, Callable[[Any], Any]] = {int: _to_int, float: to_number, bool: _to_bool}
+
+
+def column_types(conn: sqlite3.Connection, table: str) -> Dict[str, type]:
+    """Python type per column of table: declared type, with numeric TEXT figures as float."""
+    types = {
+        row[1]: _DECLARED_TYPES.get(row[2].upper(), str)
+        for row in conn.execute(f"PRAGMA table_info({table})")
+    }
+    if table == "detailed_forecasts":
+        types.update({column: float for column in OBSERVATION_FIELDS if column in types})
+    return types
+
+
+def build_query(
+    table: str,
+    columns: Sequence[str],
+    start: str | None = None,
+    end: str | None = None,
+) -> Tuple[str, List[str]]:
+    """SELECT for the projected columns and date range, in storage order."""
+    date_column = EXPORT_TABLES[table]
+    compressed = COMPRESSED_COLUMNS.get(table, ())
+    selected = [f"{SQL_FUNCTION}({c}) AS {c}" if c in compressed else c for c in columns]
+    sql = f"SELECT {', '.join(selected)} FROM {table} WHERE 1 = 1"
+    params: List[str] = []
+    if start:
+        sql += f" AND {date_column} >= ?"
+        params.append(start)
+    if end:
+        # A bare end date covers the whole of that day
+        sql += f" AND {date_column} <= ?"
+        params.append(end if 'T' in end else f"{end}T99")
+    return sql + " ORDER BY rowid", params
+
+
+def iter_chunks(
+    conn: sqlite3.Connection,
+    sql: str,
+    params: Sequence[Any],
+    types: Sequence[type],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[List[Sequence]]:
+    """Yield lists of up to chunk_size rows, typed per types (see column_types)."""
+    conversions = [(i, _CONVERTERS[t]) for i, t in enumerate(types) if t in _CONVERTERS]
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        if conversions:
+            typed = []
+            for row in rows:
+                row = list(row)
+                for i, convert in conversions:
+                    row[i] = convert(row[i])
+                typed.append(row)
+            rows = typed
+        yield rows
+
+
+def _write_csv(path: str, columns: Sequence[str], chunks: Iterator[List[Sequence]], types: Sequence[type]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _write_ndjson(path: str, columns: Sequence[str], chunks: Iterator[List[Sequence]], types: Sequence[type]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        for rows in chunks:
+            fh.write("".join(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False, separators=(",", ":")) + "\n"
+                for row in rows
+            ))
+            count += len(rows)
+    return count
+
+
+def _load_pyarrow() -> Any:
+    """
+    Import pyarrow on first Parquet export only; it is optional and slow to
+    import, and the CSV / NDJSON paths never need it.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _write_parquet(path: str, columns: Sequence[str], chunks: Iterator[List[Sequence]], types: Sequence[type]) -> int:
+    pyarrow = _load_pyarrow()
+    arrow_types = {int: pyarrow.int64(), float: pyarrow.float64(), bool: pyarrow.bool_(), str: pyarrow.string()}
+    schema = pyarrow.schema([(c, arrow_types[t]) for c, t in zip(columns, types)])
+    count = 0
+    # One row group per chunk keeps the writer's buffer to a single chunk
+    with pyarrow.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+
+_WRITERS = {"csv": _write_csv, "ndjson": _write_ndjson, "parquet": _write_parquet}
+
+
+def export_table(
+    db_file: str,
+    table: str,
+    path: str,
+    fmt: str = "csv",
+    columns: Sequence[str] | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Stream table (one of EXPORT_TABLES) to path in fmt (one of FORMATS).
+
+    columns limits the export to those columns, in that order (default: all).
+    start / end (ISO date or timestamp, inclusive) bound the table's
+    EXPORT_TABLES date column. Returns {"rows", "seconds", "rows_per_second",
+    "path"}. Raises ValueError for an unknown table, column or format, or
+    Parquet without pyarrow; sqlite3.Error and OSError pass through.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table {table!r}; choose from {', '.join(EXPORT_TABLES)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; choose from {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        _load_pyarrow()
+
+    started = time.perf_counter()
+    conn = storage.acquire(db_file)
+    try:
+        types = column_types(conn, table)
+        columns = list(columns or types)
+        unknown = [c for c in columns if c not in types]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+        selected_types = [types[c] for c in columns]
+        sql, params = build_query(table, columns, start, end)
+        chunks = iter_chunks(conn, sql, params, selected_types, chunk_size)
+        rows = _WRITERS[fmt](path, columns, chunks, selected_types)
+    finally:
+        storage.release(conn)
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+        "path": path,
+    }
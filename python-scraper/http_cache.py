@@ -0,0 +1,103 @@
+"""
+HTTP validator cache shared by the TTMS scrapers.
+
+Stores the ETag / Last-Modified headers and a content hash of the last body
+we successfully processed for each endpoint, so the next run can send a
+conditional GET and skip parsing and DB writes when nothing has changed.
+"""
+
+import hashlib
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Any
+
+import requests
+
+import storage
+
+
+def content_hash(body: bytes) -> str:
+    """Return the hex SHA-256 of a response body."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def load_validators(db_file: str, endpoint: str) -> Dict[str, Any]:
+    """Return the stored validators for endpoint, or an empty dict."""
+    conn = None
+    try:
+        conn = storage.acquire(db_file)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT etag, last_modified, content_hash FROM http_validators WHERE endpoint = ?",
+            (endpoint,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            return {}
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2]}
+    except sqlite3.Error as e:
+        print(f"Error reading HTTP validators for {endpoint}: {e}")
+        return {}
+    finally:
+        if conn:
+            storage.release(conn)
+
+
+def save_validators(db_file: str, endpoint: str, validators: Dict[str, Any]) -> None:
+    """
+    Persist validators for endpoint. Call this only once the body they
+    describe has been written to the database.
+    """
+    if not validators:
+        return
+    conn = None
+    try:
+        conn = storage.acquire(db_file)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO http_validators (
+                endpoint, etag, last_modified, content_hash, updated_at
+            ) VALUES (?, ?, ?, ?, ?)
+        ''', (
+            endpoint,
+            validators.get("etag"),
+            validators.get("last_modified"),
+            validators.get("content_hash"),
+            datetime.now(timezone.utc).isoformat(),
+        ))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error saving HTTP validators for {endpoint}: {e}")
+    finally:
+        if conn:
+            storage.release(conn)
+
+
+def conditional_headers(validators: Dict[str, Any]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from stored validators."""
+    headers: Dict[str, str] = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(resp: requests.Response) -> Dict[str, Any]:
+    """Extract the validators to store for a 200 response."""
+    return {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "content_hash": content_hash(resp.content),
+    }
+
+
+def is_unchanged(resp: requests.Response, validators: Dict[str, Any]) -> bool:
+    """
+    True when the server answered 304, or when it ignored the validators but
+    sent back a body identical to the one we processed last time.
+    """
+    if resp.status_code == 304:
+        return True
+    stored_hash = validators.get("content_hash")
+    return bool(stored_hash) and stored_hash == content_hash(resp.content)
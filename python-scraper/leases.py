@@ -0,0 +1,185 @@
+"""
+Per-run-type leases, so overlapping invocations never run the same scraper
+at once.
+
+A lease is one run_leases row: the owner (host, pid and a random suffix)
+and an expires_at a LEASE_TTL ahead. Taking one is a single conditional
+upsert, so exactly one of several racing processes wins; the holder keeps
+it alive from a heartbeat thread and deletes it when done. If the holder
+dies without releasing, the lease lapses once expires_at passes and the
+next run takes it over. A holder that stalls past expires_at can find its
+lease taken over that way: the heartbeat then sets the lease's "lost"
+event, and the scrapers stop before their next write.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator
+
+import storage
+
+# --- Configuration ---
+# Seconds a lease lasts without a heartbeat; the holder renews every third of it
+LEASE_TTL = float(os.environ.get("TTMS_LEASE_TTL", "120"))
+# Seconds a run waits for a busy lease before skipping (0: skip at once)
+LEASE_WAIT = float(os.environ.get("TTMS_LEASE_WAIT", "0"))
+# Seconds between attempts while waiting
+LEASE_POLL = 0.5
+
+_ACQUIRE_SQL = '''
+    INSERT INTO run_leases (run_type, owner, acquired_at, heartbeat_at, expires_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(run_type) DO UPDATE SET
+        owner = excluded.owner,
+        acquired_at = excluded.acquired_at,
+        heartbeat_at = excluded.heartbeat_at,
+        expires_at = excluded.expires_at
+    WHERE run_leases.expires_at <= excluded.acquired_at OR run_leases.owner = excluded.owner
+'''
+
+# run_type -> "lost" event of the lease this process holds on it
+_held: Dict[str, threading.Event] = {}
+
+
+def new_owner() -> str:
+    """An owner id unique to this process and call: host:pid:random."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _timestamps(ttl: float) -> tuple:
+    # Fixed-width timestamps, so expiry compares correctly as text
+    now = datetime.now(timezone.utc)
+    return now.isoformat(timespec="microseconds"), (now + timedelta(seconds=ttl)).isoformat(timespec="microseconds")
+
+
+def try_acquire(conn: sqlite3.Connection, run_type: str, owner: str, ttl: float | None = None) -> bool:
+    """Take run_type's lease for owner if it is free, lapsed or already owner's."""
+    now, expires = _timestamps(LEASE_TTL if ttl is None else ttl)
+    with conn:
+        cursor = conn.execute(_ACQUIRE_SQL, (run_type, owner, now, now, expires))
+    return cursor.rowcount == 1
+
+
+def renew(conn: sqlite3.Connection, run_type: str, owner: str, ttl: float | None = None) -> bool:
+    """Push owner's lease expiry out by ttl. False if owner no longer holds it."""
+    now, expires = _timestamps(LEASE_TTL if ttl is None else ttl)
+    with conn:
+        cursor = conn.execute(
+            "UPDATE run_leases SET heartbeat_at = ?, expires_at = ? WHERE run_type = ? AND owner = ?",
+            (now, expires, run_type, owner),
+        )
+    return cursor.rowcount == 1
+
+
+def release(conn: sqlite3.Connection, run_type: str, owner: str) -> None:
+    """Drop owner's lease on run_type; a lease someone else holds is left alone."""
+    with conn:
+        conn.execute("DELETE FROM run_leases WHERE run_type = ? AND owner = ?", (run_type, owner))
+
+
+def current_holder(db_file: str, run_type: str) -> Dict[str, Any] | None:
+    """{"owner", "acquired_at", "heartbeat_at", "expires_at"} of run_type's lease, or None."""
+    conn = storage.acquire(db_file)
+    try:
+        row = conn.execute(
+            "SELECT owner, acquired_at, heartbeat_at, expires_at FROM run_leases WHERE run_type = ?",
+            (run_type,),
+        ).fetchone()
+    finally:
+        storage.release(conn)
+    return dict(zip(("owner", "acquired_at", "heartbeat_at", "expires_at"), row)) if row else None
+
+
+def lease_lost(run_type: str) -> threading.Event | None:
+    """The "lost" event of the lease this process holds on run_type (see hold_lease), or None."""
+    return _held.get(run_type)
+
+
+def _heartbeat(
+    db_file: str,
+    run_type: str,
+    owner: str,
+    ttl: float,
+    stop: threading.Event,
+    lost: threading.Event,
+) -> None:
+    # Its own connection: the caller's may be mid-transaction on another thread
+    conn = storage.connect(db_file)
+    renewed = time.monotonic()
+    try:
+        while not stop.wait(ttl / 3):
+            try:
+                if not renew(conn, run_type, owner, ttl):
+                    print(f"Lost the {run_type} lease (it lapsed and another run took it)")
+                    lost.set()
+                    return
+                renewed = time.monotonic()
+            except sqlite3.Error as e:
+                print(f"Error renewing {run_type} lease: {e}")
+                if time.monotonic() - renewed >= ttl:
+                    # Unrenewed for a whole ttl: another run may hold it by now
+                    print(f"Lost the {run_type} lease (not renewed for {ttl:.0f}s)")
+                    lost.set()
+                    return
+    finally:
+        conn.close()
+
+
+@contextmanager
+def hold_lease(
+    db_file: str,
+    run_type: str,
+    wait: float | None = None,
+    ttl: float | None = None,
+) -> Iterator[Dict[str, Any] | None]:
+    """
+    Hold run_type's lease for the body of the with-block.
+
+    Yields {"owner", "waited", "lost"} once it is held, or None if another
+    run still held it after wait seconds (default LEASE_WAIT). waited is the
+    seconds spent waiting (0.0 if the lease was free). While held, a
+    heartbeat thread renews it every ttl / 3 and sets the lost event
+    (a threading.Event, also returned by lease_lost(run_type)) if the lease
+    is taken over; the body should then stop before its next write. It is
+    released on exit, however the block ends.
+    """
+    wait = LEASE_WAIT if wait is None else wait
+    ttl = LEASE_TTL if ttl is None else ttl
+    owner = new_owner()
+    started = time.monotonic()
+    conn = storage.acquire(db_file)
+    try:
+        held = first_try = try_acquire(conn, run_type, owner, ttl)
+        while not held and time.monotonic() - started < wait:
+            time.sleep(LEASE_POLL)
+            held = try_acquire(conn, run_type, owner, ttl)
+    finally:
+        storage.release(conn)
+    if not held:
+        yield None
+        return
+
+    stop, lost = threading.Event(), threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(db_file, run_type, owner, ttl, stop, lost), daemon=True)
+    heartbeat.start()
+    _held[run_type] = lost
+    try:
+        yield {"owner": owner, "waited": 0.0 if first_try else time.monotonic() - started, "lost": lost}
+    finally:
+        _held.pop(run_type, None)
+        stop.set()
+        heartbeat.join()
+        conn = storage.acquire(db_file)
+        try:
+            release(conn, run_type, owner)
+        except sqlite3.Error as e:
+            # It lapses on its own once expires_at passes
+            print(f"Error releasing {run_type} lease: {e}")
+        finally:
+            storage.release(conn)
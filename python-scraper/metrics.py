@@ -0,0 +1,138 @@
+"""
+Per-phase run timings and Prometheus text export.
+
+Each scraper run is split into phases, timed with time.perf_counter():
+  connect   request sent until response headers arrive (TCP/TLS + server wait)
+  transfer  reading the response body
+  parse     JSON / XML decoding
+  db_write  saving rows
+Phases are summed across every request of a run. They are stored per run in
+scraper_run_phases and folded into cumulative histogram counters, which
+write_prometheus() renders as a node_exporter textfile.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+PHASES = ("connect", "transfer", "parse", "db_write")
+# Histogram upper bounds in seconds; +Inf is implicit
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRICS_FILE = os.environ.get(
+    "TTMS_METRICS_FILE",
+    os.path.join(os.path.dirname(__file__), "database", "ttms_scrapers.prom"),
+)
+
+
+class PhaseTimer:
+    """Accumulates seconds per phase for one run."""
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def network_seconds(self) -> float | None:
+        """connect + transfer, or None if no request was timed."""
+        if "connect" not in self.seconds and "transfer" not in self.seconds:
+            return None
+        return self.seconds.get("connect", 0.0) + self.seconds.get("transfer", 0.0)
+
+
+def record_phases(cursor: sqlite3.Cursor, run_id: int, run_type: str, phases: Dict[str, float]) -> None:
+    """Store a run's phase timings and add them to the histograms (caller commits)."""
+    for phase, seconds in phases.items():
+        cursor.execute(
+            "INSERT OR REPLACE INTO scraper_run_phases (run_id, phase, seconds) VALUES (?, ?, ?)",
+            (run_id, phase, seconds),
+        )
+        for le in BUCKETS + (float("inf"),):
+            if seconds <= le:
+                cursor.execute('''
+                    INSERT INTO scraper_phase_histogram (run_type, phase, le, count) VALUES (?, ?, ?, 1)
+                    ON CONFLICT(run_type, phase, le) DO UPDATE SET count = count + 1
+                ''', (run_type, phase, le))
+        cursor.execute('''
+            INSERT INTO scraper_phase_totals (run_type, phase, count, sum_seconds) VALUES (?, ?, 1, ?)
+            ON CONFLICT(run_type, phase) DO UPDATE SET
+                count = count + 1,
+                sum_seconds = sum_seconds + excluded.sum_seconds
+        ''', (run_type, phase, seconds))
+
+
+def _le_label(le: float) -> str:
+    return "+Inf" if le == float("inf") else repr(le)
+
+
+def render_prometheus(conn: sqlite3.Connection) -> str:
+    """Render phase histograms and last-run gauges in Prometheus text format."""
+    lines = [
+        "# HELP ttms_scraper_phase_seconds Time spent per scraper run phase.",
+        "# TYPE ttms_scraper_phase_seconds histogram",
+    ]
+    totals = {
+        (run_type, phase): (count, total)
+        for run_type, phase, count, total in conn.execute(
+            "SELECT run_type, phase, count, sum_seconds FROM scraper_phase_totals ORDER BY run_type, phase"
+        )
+    }
+    buckets: Dict[tuple, list] = {}
+    for run_type, phase, le, count in conn.execute(
+        "SELECT run_type, phase, le, count FROM scraper_phase_histogram ORDER BY run_type, phase, le"
+    ):
+        buckets.setdefault((run_type, phase), []).append((le, count))
+    for key, (count, total) in totals.items():
+        run_type, phase = key
+        labels = f'run_type="{run_type}",phase="{phase}"'
+        have = dict(buckets.get(key, []))
+        # Buckets never hit have no row yet; carry the previous cumulative count
+        running = 0
+        for le in BUCKETS + (float("inf"),):
+            running = have.get(le, running)
+            lines.append(f'ttms_scraper_phase_seconds_bucket{{{labels},le="{_le_label(le)}"}} {running}')
+        lines.append(f"ttms_scraper_phase_seconds_sum{{{labels}}} {total}")
+        lines.append(f"ttms_scraper_phase_seconds_count{{{labels}}} {count}")
+
+    last_runs = conn.execute('''
+        SELECT run_type, duration_seconds, success FROM scraper_analytics
+        WHERE run_id IN (SELECT MAX(run_id) FROM scraper_analytics GROUP BY run_type)
+        ORDER BY run_type
+    ''').fetchall()
+    # Each family's HELP, TYPE and samples form one contiguous block
+    lines += [
+        "# HELP ttms_scraper_last_run_duration_seconds Duration of the most recent run.",
+        "# TYPE ttms_scraper_last_run_duration_seconds gauge",
+    ]
+    lines += [f'ttms_scraper_last_run_duration_seconds{{run_type="{run_type}"}} {duration or 0}'
+              for run_type, duration, _ in last_runs]
+    lines += [
+        "# HELP ttms_scraper_last_run_success Whether the most recent run succeeded.",
+        "# TYPE ttms_scraper_last_run_success gauge",
+    ]
+    lines += [f'ttms_scraper_last_run_success{{run_type="{run_type}"}} {1 if success else 0}'
+              for run_type, _, success in last_runs]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(conn: sqlite3.Connection, path: str = METRICS_FILE) -> str:
+    """
+    Write the metrics to path atomically (temp file + rename), as the
+    node_exporter textfile collector requires. Returns path.
+    """
+    text = render_prometheus(conn)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,210 @@
+"""
+Typed, long-format view of the numeric forecast fields.
+
+detailed_forecasts keeps every temperature, rainfall and heat-index figure as
+TEXT in wide Piarco / Crown Point column pairs. forecast_observations stores
+the same figures as one REAL per (forecastid, station, variable), with a
+covering index on (station, variable, issued_at, value) so per-station range
+queries never touch detailed_forecasts.
+"""
+
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+import storage
+from rollups import refresh_daily_rollups
+
+# detailed_forecasts column -> (station, variable). The Trinidad / Tobago
+# outlook figures are filed under those islands' reference stations.
+OBSERVATION_FIELDS: Dict[str, Tuple[str, str]] = {
+    'PiarcoMnTemp': ('piarco', 'min_temp'),
+    'CrownMnTemp': ('crown_point', 'min_temp'),
+    'TmPiarcoMnTemp': ('piarco', 'tomorrow_min_temp'),
+    'TmCrownMnTemp': ('crown_point', 'tomorrow_min_temp'),
+    'TmPiarcoMxTemp': ('piarco', 'tomorrow_max_temp'),
+    'TmCrownMxTemp': ('crown_point', 'tomorrow_max_temp'),
+    'minTrin24look': ('piarco', 'outlook24_min_temp'),
+    'maxTrin24look': ('piarco', 'outlook24_max_temp'),
+    'minTob24look': ('crown_point', 'outlook24_min_temp'),
+    'maxTob24look': ('crown_point', 'outlook24_max_temp'),
+    'minTrin48look': ('piarco', 'outlook48_min_temp'),
+    'maxTrin48look': ('piarco', 'outlook48_max_temp'),
+    'minTob48look': ('crown_point', 'outlook48_min_temp'),
+    'maxTob48look': ('crown_point', 'outlook48_max_temp'),
+    'PiarcoFcstMxTemp': ('piarco', 'forecast_max_temp'),
+    'CrownFcstMxTemp': ('crown_point', 'forecast_max_temp'),
+    'PiarcoActMxTemp': ('piarco', 'actual_max_temp'),
+    'CrownActMxTemp': ('crown_point', 'actual_max_temp'),
+    'PiarcoFcstMnTemp': ('piarco', 'forecast_min_temp'),
+    'CrownFcstMnTemp': ('crown_point', 'forecast_min_temp'),
+    'PiarcoRainfall': ('piarco', 'rainfall'),
+    'CrownPointRinfall': ('crown_point', 'rainfall'),
+    'cumlativeRain': ('piarco', 'cumulative_rainfall'),
+    'cumlativeCpRain': ('crown_point', 'cumulative_rainfall'),
+    'PiarcoheatIndex': ('piarco', 'heat_index'),
+    'CPointheatIndex': ('crown_point', 'heat_index'),
+}
+
+_INSERT_SQL = '''
+    INSERT OR REPLACE INTO forecast_observations (forecastid, station, variable, value, issued_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# Columns read from detailed_forecasts to build observations
+SOURCE_COLUMNS = ['forecastid', 'IssuedAt', 'insertionDate'] + list(OBSERVATION_FIELDS)
+
+
+def to_number(text: Any) -> float | None:
+    """Parse a TEXT figure as a float; 'TR' (trace rainfall) counts as 0.0."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = str(text).strip()
+    if not text:
+        return None
+    if text.upper() == 'TR':
+        return 0.0
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def issued_at(forecast: Dict[str, Any]) -> str | None:
+    """
+    ISO timestamp for a forecast: insertionDate plus the IssuedAt clock time
+    ("10:01 AM") when it parses, otherwise just the date.
+    """
+    date = (forecast.get('insertionDate') or '').strip()
+    if not date:
+        return None
+    clock = (forecast.get('IssuedAt') or '').strip().upper()
+    try:
+        return f"{date}T{datetime.strptime(clock, '%I:%M %p').strftime('%H:%M')}"
+    except ValueError:
+        return date
+
+
+def extract_observations(forecast: Dict[str, Any]) -> List[Tuple[int, str, str, float, str | None]]:
+    """Return forecast_observations rows for every numeric field of forecast."""
+    forecastid = forecast.get('forecastid')
+    if not isinstance(forecastid, int):
+        return []
+    when = issued_at(forecast)
+    rows = []
+    for column, (station, variable) in OBSERVATION_FIELDS.items():
+        value = to_number(forecast.get(column))
+        if value is not None:
+            rows.append((forecastid, station, variable, value, when))
+    return rows
+
+
+def save_observations(conn: sqlite3.Connection, forecasts: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write observations for forecasts on conn, inside the caller's transaction,
+    and refresh the daily rollups of the days they fall on. Returns the
+    number of observation rows written.
+    """
+    rows = [row for forecast in forecasts for row in extract_observations(forecast)]
+    if rows:
+        conn.executemany(_INSERT_SQL, rows)
+        refresh_daily_rollups(conn, {row[4] for row in rows})
+    return len(rows)
+
+
+def _extract_chunk(rows: List[Tuple]) -> List[Tuple]:
+    """Worker: turn raw detailed_forecasts rows into observation rows."""
+    out = []
+    for row in rows:
+        out.extend(extract_observations(dict(zip(SOURCE_COLUMNS, row))))
+    return out
+
+
+def backfill_observations(
+    db_file: str,
+    workers: int | None = None,
+    chunk_size: int = 2000,
+) -> Dict[str, int]:
+    """
+    Fill forecast_observations for every forecast that has none yet.
+
+    Rows are read in forecastid order in chunks, parsed across worker
+    processes, and written back in one transaction per chunk by this process
+    (SQLite has a single writer). At most 2 * workers chunks are in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    totals = {"forecasts": 0, "observations": 0}
+
+    storage.ensure_schema(db_file)
+    read_conn = sqlite3.connect(db_file)
+    write_conn = storage.connect(db_file)
+    try:
+        cursor = read_conn.execute(f'''
+            SELECT {', '.join(SOURCE_COLUMNS)} FROM detailed_forecasts
+            WHERE forecastid NOT IN (SELECT DISTINCT forecastid FROM forecast_observations)
+            ORDER BY forecastid
+        ''')
+
+        def write(rows: List[Tuple]) -> None:
+            with write_conn:
+                write_conn.executemany(_INSERT_SQL, rows)
+                refresh_daily_rollups(write_conn, {row[4] for row in rows})
+            totals["observations"] += len(rows)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight: Deque = deque()
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                totals["forecasts"] += len(chunk)
+                in_flight.append(executor.submit(_extract_chunk, chunk))
+                if len(in_flight) >= 2 * workers:
+                    write(in_flight.popleft().result())
+            while in_flight:
+                write(in_flight.popleft().result())
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+    print(
+        f"Backfilled {totals['observations']} observation(s) "
+        f"from {totals['forecasts']} forecast(s) using {workers} worker(s)."
+    )
+    return totals
+
+
+def get_station_series(
+    db_file: str,
+    station: str,
+    variable: str,
+    start: str,
+    end: str | None = None,
+) -> List[Tuple[str, float]]:
+    """
+    Return [(issued_at, value), ...] for one station/variable with
+    start <= issued_at (and issued_at <= end when given), oldest first.
+    Served entirely from the covering index.
+    """
+    sql = '''
+        SELECT issued_at, value FROM forecast_observations
+        WHERE station = ? AND variable = ? AND issued_at >= ?
+    '''
+    params: List[Any] = [station, variable, start]
+    if end is not None:
+        # Dates compare below any same-day timestamp, so extend a bare date
+        # to the end of that day.
+        sql += " AND issued_at <= ?"
+        params.append(end if 'T' in end else f"{end}T99")
+    sql += " ORDER BY issued_at"
+
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
@@ -0,0 +1,213 @@
+"""
+Retries, a persisted circuit breaker and resume checkpoints for the fetchers.
+
+Retries: with_retries() re-runs one request on connection errors, timeouts,
+5xx / 429 responses and bodies that fail to decode (a truncated transfer),
+sleeping with exponential backoff and full jitter between attempts, or for
+the server's Retry-After when it sends one.
+
+Circuit breaker: a run whose request still failed after its retries counts
+one failure against the endpoint. After BREAKER_THRESHOLD consecutive failed
+runs the breaker opens and later runs skip the endpoint without a request
+until the cooldown has passed; the cooldown doubles with each further
+failure, up to BREAKER_MAX_COOLDOWN. The first run after the cooldown is a
+trial: success closes the breaker, failure reopens it. State lives in the
+circuit_breakers table, so it holds across runs and processes.
+
+Checkpoints: small JSON documents in sync_state that let an interrupted
+sync resume where it stopped (see ttms_scraper.sync_forecasts).
+"""
+
+import json
+import os
+import random
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, TypeVar
+
+import requests
+
+import storage
+
+# --- Configuration ---
+# Attempts per request, including the first
+RETRY_ATTEMPTS = int(os.environ.get("TTMS_RETRY_ATTEMPTS", "4"))
+# Backoff before retry n is uniform in [0, min(max, base * 2**n)] seconds
+RETRY_BASE_DELAY = float(os.environ.get("TTMS_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.environ.get("TTMS_RETRY_MAX_DELAY", "30"))
+# Consecutive failed runs that open an endpoint's breaker
+BREAKER_THRESHOLD = int(os.environ.get("TTMS_BREAKER_THRESHOLD", "3"))
+# Seconds an open breaker waits before the trial run, and the cap on doubling it
+BREAKER_COOLDOWN = float(os.environ.get("TTMS_BREAKER_COOLDOWN", "300"))
+BREAKER_MAX_COOLDOWN = float(os.environ.get("TTMS_BREAKER_MAX_COOLDOWN", "21600"))
+
+T = TypeVar("T")
+
+
+# --- Retries ---
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    True for failures another attempt may not hit: connection errors,
+    timeouts, 5xx and 429 responses, and bodies that do not decode (JSON or
+    XML), which is how a truncated transfer shows up.
+    """
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return status is None or status >= 500 or status == 429
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout,
+                        requests.exceptions.ChunkedEncodingError,
+                        requests.exceptions.ContentDecodingError)):
+        return True
+    return isinstance(exc, (ValueError, ET.ParseError))
+
+
+def backoff_delay(attempt: int, base: float | None = None, cap: float | None = None) -> float:
+    """Full-jitter delay in seconds before retry number attempt (0-based)."""
+    base = RETRY_BASE_DELAY if base is None else base
+    cap = RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retry_after(exc: BaseException, cap: float) -> float | None:
+    """The response's Retry-After in seconds (capped), if it sent a numeric one."""
+    response = getattr(exc, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        return min(max(float(value), 0.0), cap) if value is not None else None
+    except ValueError:
+        return None
+
+
+def with_retries(
+    fn: Callable[[], T],
+    label: str,
+    attempts: int | None = None,
+    base_delay: float | None = None,
+    max_delay: float | None = None,
+) -> T:
+    """
+    Call fn() up to attempts times, backing off between attempts while the
+    failure is_retryable(). The last error (or any non-retryable one) is
+    raised to the caller.
+    """
+    attempts = max(RETRY_ATTEMPTS if attempts is None else attempts, 1)
+    cap = RETRY_MAX_DELAY if max_delay is None else max_delay
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            delay = _retry_after(e, cap)
+            if delay is None:
+                delay = backoff_delay(attempt, base_delay, cap)
+            print(f"{label}: {e}; retry {attempt + 1}/{attempts - 1} in {delay:.2f} s")
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+# --- Circuit breaker ---
+
+def check_circuit(db_file: str, endpoint: str) -> str | None:
+    """
+    Return the ISO time endpoint's breaker stays open until when a run
+    should skip it, or None when a request may go ahead (breaker closed, or
+    open with its cooldown over, which makes this run the trial).
+    """
+    conn = None
+    try:
+        conn = storage.acquire(db_file)
+        row = conn.execute(
+            "SELECT open_until FROM circuit_breakers WHERE endpoint = ?", (endpoint,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        # Never let a broken breaker table stop the scrapers
+        print(f"Error reading circuit breaker for {endpoint}: {e}")
+        return None
+    finally:
+        if conn:
+            storage.release(conn)
+    if not row or not row[0]:
+        return None
+    return row[0] if row[0] > datetime.now(timezone.utc).isoformat() else None
+
+
+def record_outcome(db_file: str, endpoint: str, error: str | None = None) -> None:
+    """
+    Record a run against endpoint: error=None closes its breaker, otherwise
+    the failure is counted and the breaker opens once BREAKER_THRESHOLD
+    consecutive runs have failed.
+    """
+    now = datetime.now(timezone.utc)
+    conn = None
+    try:
+        conn = storage.acquire(db_file)
+        cursor = conn.cursor()
+        if error is None:
+            cursor.execute('''
+                UPDATE circuit_breakers SET failures = 0, open_until = NULL, updated_at = ?
+                WHERE endpoint = ? AND failures > 0
+            ''', (now.isoformat(), endpoint))
+            if cursor.rowcount:
+                print(f"Circuit breaker for {endpoint} closed")
+        else:
+            row = cursor.execute(
+                "SELECT failures FROM circuit_breakers WHERE endpoint = ?", (endpoint,)
+            ).fetchone()
+            failures = (row[0] if row else 0) + 1
+            open_until = None
+            if failures >= BREAKER_THRESHOLD:
+                cooldown = min(BREAKER_COOLDOWN * 2 ** (failures - BREAKER_THRESHOLD), BREAKER_MAX_COOLDOWN)
+                open_until = (now + timedelta(seconds=cooldown)).isoformat()
+                print(f"Circuit breaker for {endpoint} open until {open_until} "
+                      f"after {failures} failed run(s)")
+            cursor.execute('''
+                INSERT OR REPLACE INTO circuit_breakers (endpoint, failures, open_until, last_error, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (endpoint, failures, open_until, error, now.isoformat()))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error updating circuit breaker for {endpoint}: {e}")
+    finally:
+        if conn:
+            storage.release(conn)
+
+
+# --- Checkpoints ---
+
+def load_checkpoint(db_file: str, name: str) -> Dict[str, Any] | None:
+    """Return the checkpoint stored under name in sync_state, or None."""
+    conn = None
+    try:
+        conn = storage.acquire(db_file)
+        row = conn.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error reading checkpoint {name}: {e}")
+        return None
+    finally:
+        if conn:
+            storage.release(conn)
+
+
+def save_checkpoint(db_file: str, name: str, checkpoint: Dict[str, Any] | None) -> None:
+    """Store checkpoint under name in sync_state; None deletes it."""
+    conn = None
+    try:
+        conn = storage.acquire(db_file)
+        if checkpoint is None:
+            conn.execute("DELETE FROM sync_state WHERE name = ?", (name,))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (name, value, updated_at) VALUES (?, ?, ?)",
+                (name, json.dumps(checkpoint), datetime.now(timezone.utc).isoformat()),
+            )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error saving checkpoint {name}: {e}")
+    finally:
+        if conn:
+            storage.release(conn)
@@ -0,0 +1,213 @@
+"""
+Retention for scraper_analytics: old run rows rolled up, then deleted.
+
+The RSS job alone logs a run every 10 minutes. Raw rows are kept for
+ANALYTICS_RETENTION_DAYS; after that each whole UTC day is folded into
+analytics_rollups, one row per (hour, run_type) and per (day, run_type)
+with the run count, success rate, duration p50 / p95 and record totals,
+and the day's raw rows and their scraper_run_phases are deleted. Each day
+is its own transaction, so a write lock is held for one small batch at a
+time and an interrupted run leaves no day half rolled up. Hourly rollups
+are dropped after ROLLUP_HOURLY_DAYS; daily ones are kept.
+
+compact() also hands the freed pages back to the filesystem with
+incremental vacuum. That needs auto_vacuum=INCREMENTAL, which an existing
+database only gets from one full VACUUM; compact(convert=True) does that
+once (it rewrites the whole file, so it is left to the explicit command).
+"""
+
+import math
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Tuple
+
+import storage
+
+# --- Configuration ---
+# Raw scraper_analytics rows younger than this many days are never touched
+ANALYTICS_RETENTION_DAYS = float(os.environ.get("TTMS_ANALYTICS_RETENTION_DAYS", "30"))
+# Hourly rollups older than this many days are dropped (daily rollups stay)
+ROLLUP_HOURLY_DAYS = float(os.environ.get("TTMS_ROLLUP_HOURLY_DAYS", "365"))
+# Raw rows read per query while rolling up
+RETENTION_READ_BATCH = 5000
+# Pages freed per incremental_vacuum step (each step is its own transaction)
+VACUUM_STEP_PAGES = 2000
+
+_RUN_COLUMNS = "run_id, run_timestamp, run_type, duration_seconds, success, records_fetched, records_inserted"
+
+# A period already rolled up (only if clocks went backwards) is merged in;
+# the percentiles then become a run-weighted mean of the two, an estimate
+_ROLLUP_UPSERT_SQL = '''
+    INSERT INTO analytics_rollups (
+        granularity, period_start, run_type, runs, successes, success_rate,
+        duration_sum, duration_p50, duration_p95, records_fetched, records_inserted
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(granularity, period_start, run_type) DO UPDATE SET
+        runs = runs + excluded.runs,
+        successes = successes + excluded.successes,
+        success_rate = (successes + excluded.successes) * 1.0 / (runs + excluded.runs),
+        duration_sum = duration_sum + excluded.duration_sum,
+        duration_p50 = (duration_p50 * runs + excluded.duration_p50 * excluded.runs) / (runs + excluded.runs),
+        duration_p95 = (duration_p95 * runs + excluded.duration_p95 * excluded.runs) / (runs + excluded.runs),
+        records_fetched = records_fetched + excluded.records_fetched,
+        records_inserted = records_inserted + excluded.records_inserted
+'''
+
+
+def percentile(values: List[float], q: float) -> float | None:
+    """Nearest-rank q-quantile (0 < q <= 1) of values, already sorted; None if empty."""
+    if not values:
+        return None
+    return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+def aggregate_runs(runs: List[Tuple]) -> Tuple:
+    """
+    (runs, successes, success_rate, duration_sum, p50, p95, records_fetched,
+    records_inserted) for rows laid out as _RUN_COLUMNS.
+    """
+    durations = sorted(r[3] for r in runs if r[3] is not None)
+    successes = sum(1 for r in runs if r[4])
+    return (
+        len(runs),
+        successes,
+        successes / len(runs),
+        sum(durations),
+        percentile(durations, 0.5),
+        percentile(durations, 0.95),
+        sum(r[5] or 0 for r in runs),
+        sum(r[6] or 0 for r in runs),
+    )
+
+
+def _rollup_rows(runs: List[Tuple]) -> Iterator[Tuple]:
+    """analytics_rollups rows for one day of runs: per hour, then for the day."""
+    # run_timestamp is UTC ISO text, so its prefixes are the hour and the day
+    for granularity, width, suffix in (("hour", 13, ":00:00+00:00"), ("day", 10, "T00:00:00+00:00")):
+        periods: Dict[Tuple[str, str], List[Tuple]] = {}
+        for run in runs:
+            periods.setdefault((run[1][:width] + suffix, run[2]), []).append(run)
+        for (period_start, run_type), members in sorted(periods.items()):
+            yield (granularity, period_start, run_type) + aggregate_runs(members)
+
+
+def _iter_runs(conn: sqlite3.Connection, max_run_id: int) -> Iterator[Tuple]:
+    """Runs up to max_run_id in run_id order, read in batches so no cursor spans a write."""
+    last = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT {_RUN_COLUMNS} FROM scraper_analytics WHERE run_id > ? AND run_id <= ? "
+            "ORDER BY run_id LIMIT ?",
+            (last, max_run_id, RETENTION_READ_BATCH),
+        ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1][0]
+
+
+def roll_up_analytics(
+    db_file: str = storage.DB_FILE,
+    retention_days: float | None = None,
+    now: datetime | None = None,
+) -> Dict[str, Any]:
+    """
+    Fold raw scraper_analytics rows older than retention_days (default
+    ANALYTICS_RETENTION_DAYS, rounded back to a UTC midnight so only whole
+    days go) into analytics_rollups and delete them, one transaction per
+    day. Then drops hourly rollups older than ROLLUP_HOURLY_DAYS.
+    Returns {"days", "runs", "rollups", "hourly_dropped", "cutoff"}.
+    """
+    now = now or datetime.now(timezone.utc)
+    days = ANALYTICS_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    result = {"days": 0, "runs": 0, "rollups": 0, "hourly_dropped": 0, "cutoff": cutoff.isoformat()}
+
+    conn = storage.acquire(db_file)
+    try:
+        # run_id follows run_timestamp, so everything to roll up is at or below this id
+        max_run_id = conn.execute(
+            "SELECT MAX(run_id) FROM scraper_analytics WHERE run_timestamp < ?", (cutoff.isoformat(),)
+        ).fetchone()[0]
+        if max_run_id is not None:
+            old_runs = (r for r in _iter_runs(conn, max_run_id) if r[1] < cutoff.isoformat())
+            for _, day_runs in groupby(old_runs, key=lambda r: r[1][:10]):
+                runs = list(day_runs)
+                rollups = list(_rollup_rows(runs))
+                ids = [(r[0],) for r in runs]
+                with conn:
+                    conn.executemany(_ROLLUP_UPSERT_SQL, rollups)
+                    conn.executemany("DELETE FROM scraper_run_phases WHERE run_id = ?", ids)
+                    conn.executemany("DELETE FROM scraper_analytics WHERE run_id = ?", ids)
+                result["days"] += 1
+                result["runs"] += len(runs)
+                result["rollups"] += len(rollups)
+
+        hourly_cutoff = now - timedelta(days=ROLLUP_HOURLY_DAYS)
+        with conn:
+            result["hourly_dropped"] = conn.execute(
+                "DELETE FROM analytics_rollups WHERE granularity = 'hour' AND period_start < ?",
+                (hourly_cutoff.isoformat(),),
+            ).rowcount
+        return result
+    finally:
+        storage.release(conn)
+
+
+def _file_size(db_file: str) -> int:
+    return sum(os.path.getsize(p) for p in (db_file, f"{db_file}-wal") if os.path.exists(p))
+
+
+def compact(
+    db_file: str = storage.DB_FILE,
+    retention_days: float | None = None,
+    convert: bool = False,
+    now: datetime | None = None,
+) -> Dict[str, Any]:
+    """
+    Roll up and delete old analytics (see roll_up_analytics), then release
+    the free pages with incremental vacuum, VACUUM_STEP_PAGES per
+    transaction, and truncate the WAL. If the database is not yet in
+    auto_vacuum=INCREMENTAL mode, convert=True switches it with one full
+    VACUUM; without it the freed pages just stay on the free list for reuse.
+    Returns roll_up_analytics()'s counts plus "reclaimed_bytes" (pages
+    released times page size), "file_before" / "file_after" (database plus
+    WAL, in bytes), "free_pages" left and "mode" ("incremental", "full"
+    or "none").
+    """
+    result = roll_up_analytics(db_file, retention_days, now)
+    file_before = _file_size(db_file)
+    conn = storage.acquire(db_file)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+        mode = "incremental"
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if convert:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                mode = "full"
+            else:
+                mode = "none"
+        if mode == "incremental":
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            while free:
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+                free, previous = conn.execute("PRAGMA freelist_count").fetchone()[0], free
+                if free >= previous:
+                    break
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        storage.release(conn)
+    result.update({
+        "mode": mode,
+        "reclaimed_bytes": (pages_before - pages_after) * page_size,
+        "free_pages": free_pages,
+        "file_before": file_before,
+        "file_after": _file_size(db_file),
+    })
+    return result
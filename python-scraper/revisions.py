@@ -0,0 +1,92 @@
+"""
+Revision history for amended forecasts.
+
+Every detailed_forecasts row carries a content_hash of its API fields. A
+sync hashes each incoming forecast and compares it with the stored hash:
+equal means nothing to write. When they differ (the Met Service amended the
+forecast) the row is updated in place and forecast_revisions records the
+new hash, the hash it replaced and only the fields that changed, as
+{"field": [old, new]} JSON. An index on seen_at serves "what changed
+since T" without scanning the history.
+"""
+
+import hashlib
+import json
+import sqlite3
+from typing import Any, Dict, List, Sequence, Tuple
+
+import storage
+
+
+def content_hash(values: Tuple[Any, ...]) -> str:
+    """Stable 128-bit hex digest of a row's values, in column order."""
+    encoded = json.dumps(values, separators=(',', ':'), default=str)
+    return hashlib.blake2b(encoded.encode('ascii'), digest_size=16).hexdigest()
+
+
+def _as_text(value: Any) -> str | None:
+    """A value as SQLite stores it in a TEXT column."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        value = int(value)
+    return str(value)
+
+
+def diff_fields(columns: Sequence[str], old: Sequence[Any], new: Sequence[Any]) -> Dict[str, List[Any]]:
+    """
+    Return {column: [old, new]} for every column whose value differs. Values
+    are compared as text, so a stored '30' equals an incoming 30.
+    """
+    return {c: [o, n] for c, o, n in zip(columns, old, new) if _as_text(o) != _as_text(n)}
+
+
+def record_revisions(conn: sqlite3.Connection, revisions: List[Tuple[int, str, str | None, str, Dict[str, List[Any]]]]) -> None:
+    """
+    Write (forecastid, content_hash, previous_hash, seen_at, changes) rows on
+    conn, inside the caller's transaction. A forecast that returns to an
+    earlier version keeps one row for that hash, moved to the latest sighting.
+    """
+    conn.executemany('''
+        INSERT INTO forecast_revisions (forecastid, content_hash, previous_hash, seen_at, changes)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(forecastid, content_hash) DO UPDATE SET
+            previous_hash = excluded.previous_hash,
+            seen_at = excluded.seen_at,
+            changes = excluded.changes
+    ''', [
+        (fid, digest, previous, seen_at, json.dumps(changes, ensure_ascii=False, separators=(',', ':')))
+        for fid, digest, previous, seen_at, changes in revisions
+    ])
+
+
+def get_revisions_since(db_file: str, since: str, forecastid: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Return forecast amendments recorded after since (ISO timestamp, UTC),
+    oldest first, each with forecastid, content_hash, previous_hash, seen_at
+    and changes ({field: [old, new]}). forecastid narrows it to one forecast.
+    """
+    sql = '''
+        SELECT forecastid, content_hash, previous_hash, seen_at, changes
+        FROM forecast_revisions WHERE seen_at > ?
+    '''
+    params: List[Any] = [since]
+    if forecastid is not None:
+        sql += " AND forecastid = ?"
+        params.append(forecastid)
+    sql += " ORDER BY seen_at, forecastid"
+
+    conn = storage.acquire(db_file)
+    try:
+        return [
+            {
+                "forecastid": row[0],
+                "content_hash": row[1],
+                "previous_hash": row[2],
+                "seen_at": row[3],
+                "changes": json.loads(row[4]),
+            }
+            for row in conn.execute(sql, params)
+        ]
+    finally:
+        storage.release(conn)
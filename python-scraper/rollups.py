@@ -0,0 +1,139 @@
+"""
+Materialized per-day rollups of the station observations, for charts.
+
+daily_rollups holds one row per (day, station) with the day's lowest
+minimum temperature, highest actual maximum, highest reported rainfall and
+cumulative rainfall, all taken from forecast_observations by the date the
+figures were issued. Writers call refresh_daily_rollups() with the days
+they touched, inside their own transaction, so a new forecast costs one
+small index range scan for its day instead of a history-wide recount.
+"""
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import storage
+
+# rollup column -> forecast_observations variable and how a day combines them
+ROLLUP_FIELDS = {
+    'min_temp': ('min_temp', 'MIN'),
+    'max_temp': ('actual_max_temp', 'MAX'),
+    'rainfall': ('rainfall', 'MAX'),
+    'cumulative_rainfall': ('cumulative_rainfall', 'MAX'),
+}
+STATIONS = ('piarco', 'crown_point')
+
+_AGGREGATES = ',\n               '.join(
+    f"{func}(CASE WHEN variable = '{variable}' THEN value END)"
+    for variable, func in ROLLUP_FIELDS.values()
+)
+_VARIABLES = ', '.join(f"'{variable}'" for variable, _ in ROLLUP_FIELDS.values())
+_COLUMNS = ', '.join(ROLLUP_FIELDS)
+
+# One day: the (station, variable, issued_at) index serves each range scan
+_REFRESH_DAY_SQL = f'''
+    INSERT INTO daily_rollups (day, station, {_COLUMNS}, reports)
+    SELECT ?, station,
+           {_AGGREGATES},
+           COUNT(DISTINCT forecastid)
+    FROM forecast_observations
+    WHERE station IN ({', '.join(f"'{s}'" for s in STATIONS)})
+      AND variable IN ({_VARIABLES})
+      AND issued_at >= ? AND issued_at <= ?
+    GROUP BY station
+'''
+_REBUILD_SQL = f'''
+    INSERT INTO daily_rollups (day, station, {_COLUMNS}, reports)
+    SELECT substr(issued_at, 1, 10), station,
+           {_AGGREGATES},
+           COUNT(DISTINCT forecastid)
+    FROM forecast_observations
+    WHERE station IN ({', '.join(f"'{s}'" for s in STATIONS)})
+      AND variable IN ({_VARIABLES})
+      AND issued_at IS NOT NULL
+    GROUP BY 1, station
+'''
+
+
+def refresh_daily_rollups(conn: sqlite3.Connection, days: Iterable[str | None]) -> int:
+    """
+    Recompute daily_rollups for the given days (YYYY-MM-DD; None and any
+    time part are ignored) on conn, inside the caller's transaction. A day
+    left without observations loses its rows. Returns the days refreshed.
+    """
+    unique = sorted({day[:10] for day in days if day})
+    for day in unique:
+        conn.execute("DELETE FROM daily_rollups WHERE day = ?", (day,))
+        # A bare date sorts before any same-day timestamp; T99 sorts after
+        conn.execute(_REFRESH_DAY_SQL, (day, day, f"{day}T99"))
+    return len(unique)
+
+
+def fill_daily_rollups(cursor: sqlite3.Cursor) -> None:
+    """Recompute every row of daily_rollups in one pass (full scan; caller commits)."""
+    cursor.execute("DELETE FROM daily_rollups")
+    cursor.execute(_REBUILD_SQL)
+
+
+def rebuild_daily_rollups(db_file: str) -> int:
+    """Rebuild daily_rollups for the whole history. Returns its row count."""
+    conn = storage.acquire(db_file)
+    try:
+        with conn:
+            fill_daily_rollups(conn.cursor())
+        return conn.execute("SELECT COUNT(*) FROM daily_rollups").fetchone()[0]
+    finally:
+        storage.release(conn)
+
+
+def rollup_arrays(rows: Iterable[Sequence[Any]], stations: Sequence[str] = STATIONS) -> Dict[str, Any]:
+    """
+    Shape (day, station, *ROLLUP_FIELDS) rows, ordered by day, as parallel
+    arrays: {"days": [...], station: {field: [...]}}. Every array lines up
+    with "days"; a station missing on a day gets None there.
+    """
+    days: List[str] = []
+    series = {s: {f: [] for f in ROLLUP_FIELDS} for s in stations}
+    for day, station, *values in rows:
+        if station not in series:
+            continue
+        if not days or days[-1] != day:
+            days.append(day)
+            for fields in series.values():
+                for column in fields.values():
+                    column.append(None)
+        for column, value in zip(series[station].values(), values):
+            column[-1] = value
+    return {"days": days, **series}
+
+
+def rollup_query(start: str, end: str | None = None, station: str | None = None) -> Tuple[str, Tuple[Any, ...]]:
+    """SQL and parameters selecting the rows rollup_arrays() expects."""
+    sql = f"SELECT day, station, {_COLUMNS} FROM daily_rollups WHERE day >= ?"
+    params: List[Any] = [start]
+    if end is not None:
+        sql += " AND day <= ?"
+        params.append(end)
+    if station is not None:
+        sql += " AND station = ?"
+        params.append(station)
+    return sql + " ORDER BY day, station", tuple(params)
+
+
+def get_daily_rollups(
+    db_file: str,
+    start: str,
+    end: str | None = None,
+    station: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Return the rollups for start <= day <= end (YYYY-MM-DD) as compact
+    arrays (see rollup_arrays), optionally for a single station.
+    """
+    sql, params = rollup_query(start, end, station)
+    conn = storage.acquire(db_file)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        storage.release(conn)
+    return rollup_arrays(rows, (station,) if station else STATIONS)
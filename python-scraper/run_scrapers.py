@@ -1,27 +1,60 @@
 #!/usr/bin/env python3
 """
 Orchestrator script to run TTMS scrapers once per invocation.
-Use CLI arg to choose which to run: rss | forecast | both (default: both)
+Use CLI arg to choose which to run: rss | forecast | both | auto (default: auto)
+Pass --full to walk every forecast page instead of stopping at known ones.
+A scraper already running in another process is skipped; pass --wait=SECONDS to wait for it instead.
+Use "replay [forecast|rss]" to rebuild tables from the raw-payload archive offline.
+Use "backfill-observations" to fill the typed observation table for existing rows.
+Use "backfill-conditions [--reparse]" to parse the marine and rain-chance fields of existing rows.
+Use "rebuild-rollups" to recompute the per-day station rollups from the full history.
+Use "daemon" to stay running and schedule both scrapers in-process instead of cron.
+Use "metrics [path]" to write run phase timings as a Prometheus textfile.
+Use "snapshot" to rebuild the app snapshot files (normally written after every successful run).
+Use "compact [--days=N]" to roll old run analytics up into hourly/daily rows and reclaim the space.
+Use "compress-text [--retrain]" to compress stored forecast and alert text with a trained dictionary.
+Use "check-stats" to verify the maintained row counters and rebuild them if they drifted.
+Use "reclassify" to re-run alert level/type classification over all stored alerts.
+Use "search <terms> [--from=YYYY-MM-DD] [--to=YYYY-MM-DD] [--area=name] [--alerts|--forecasts]
+[--limit=N]" for ranked full-text search over forecast text and alerts.
+Use "export <table> [--format=csv|ndjson|parquet] [--out=path] [--columns=a,b] [--from=] [--to=]"
+to stream detailed_forecasts, weather_alerts or scraper_analytics to a file.
 """
 
 import os
 import sys
+import time
+import random
+import signal
 import sqlite3
+import threading
 from datetime import datetime, timezone, timedelta
 
 # Add current directory to path so we can import our modules
 sys.path.append(os.path.dirname(__file__))
 
-# Import our scraper modules
-from ttms_scraper import setup_database, fetch_all_forecasts, save_forecasts_to_db, log_scraper_run, get_database_stats
-from ttms_rss_scraper import fetch_rss_alerts, save_alerts_to_db
+# Only storage and metrics (sqlite3 and the standard library) load up front.
+# The scraper modules pull in requests and friends, which costs more than a
+# cron tick that skips both scrapers does in total, so every command imports
+# what it needs when it runs.
+import storage
+from leases import current_holder, hold_lease, lease_lost
+from metrics import METRICS_FILE, PhaseTimer, write_prometheus
 
-DB_FILE = os.path.join(os.path.dirname(__file__), "database", "weather_forecasts.db")
+DB_FILE = storage.DB_FILE
+
+RSS_INTERVAL = timedelta(minutes=10)
+FORECAST_INTERVAL = timedelta(hours=1)
+COMPACT_INTERVAL = timedelta(days=1)
+# Daemon runs are spread by up to this fraction of their interval
+DAEMON_JITTER = float(os.environ.get("TTMS_DAEMON_JITTER", "0.1"))
+# Seconds a run waits for another process to finish publishing the app snapshot
+SNAPSHOT_WAIT = 60
 
 def _get_last_success_timestamp(run_type: str):
     """Return datetime of the most recent successful run for run_type or None."""
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = storage.acquire(DB_FILE)
         cur = conn.cursor()
         cur.execute(
             """
@@ -44,7 +77,7 @@ def _get_last_success_timestamp(run_type: str):
         return None
     finally:
         try:
-            conn.close()
+            storage.release(conn)
         except Exception:
             pass
 
@@ -53,77 +86,453 @@ def should_run_rss(now_utc: datetime) -> bool:
     last = _get_last_success_timestamp('rss_alerts')
     if not last:
         return True
-    return (now_utc - last) >= timedelta(minutes=10)
+    return (now_utc - last) >= RSS_INTERVAL
 
 def should_run_forecasts(now_utc: datetime) -> bool:
     """Run forecasts if never run or last success >= 60 minutes ago."""
     last = _get_last_success_timestamp('forecasts')
     if not last:
         return True
-    return (now_utc - last) >= timedelta(hours=1)
+    return (now_utc - last) >= FORECAST_INTERVAL
+
+def should_run_compact(now_utc: datetime) -> bool:
+    """Roll up old analytics if never done or last done >= 1 day ago."""
+    last = _get_last_success_timestamp('compact')
+    if not last:
+        return True
+    return (now_utc - last) >= COMPACT_INTERVAL
 
-def run_rss_scraper():
+def run_rss_scraper(session=None):
     """
     Runs the RSS scraper to fetch weather alerts.
     """
+    from ttms_rss_scraper import fetch_rss_alerts, save_alerts_to_db, commit_rss_validators
+
     print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Starting RSS Weather Alerts Scraper ---")
     
     start_time = datetime.now(timezone.utc)
+    succeeded = False
     
     try:
         # Fetch and save alerts
-        alert_data = fetch_rss_alerts()
+        fetch_info = {}
+        timer = PhaseTimer()
+        alert_data = fetch_rss_alerts(fetch_info=fetch_info, session=session, timer=timer,
+                                      lease_lost=lease_lost('rss_alerts'))
         
-        if alert_data:
+        if fetch_info.get('lease_lost'):
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc),
+                           0, 0, False, "Lost the rss_alerts lease to another run", phases=timer.seconds)
+        elif fetch_info.get('circuit_open'):
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc),
+                           0, 0, False, f"Circuit breaker open until {fetch_info['circuit_open']}",
+                           status='circuit_open')
+        elif fetch_info.get('unchanged'):
+            print("RSS feed unchanged since last run; skipping parse and save.")
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc),
+                           0, 0, True, status='unchanged', phases=timer.seconds)
+            succeeded = True
+        elif alert_data:
             print(f"Total alerts fetched: {len(alert_data)}")
-            inserted_count = save_alerts_to_db(alert_data)
-            log_scraper_run('rss_alerts', start_time, datetime.now(timezone.utc), 
-                           len(alert_data), inserted_count, True)
+            with timer.phase('db_write'):
+                inserted_count = save_alerts_to_db(alert_data)
+            commit_rss_validators(fetch_info)
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc), 
+                           len(alert_data), inserted_count, True, phases=timer.seconds)
+            succeeded = True
         else:
             print("Could not fetch any alert data.")
-            log_scraper_run('rss_alerts', start_time, datetime.now(timezone.utc), 
-                           0, 0, False, "No alert data fetched")
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc), 
+                           0, 0, False, "No alert data fetched", phases=timer.seconds)
             
     except Exception as e:
         print(f"Error during RSS scraping: {e}")
-        log_scraper_run('rss_alerts', start_time, datetime.now(timezone.utc), 
+        storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc), 
                        0, 0, False, str(e))
     
+    if succeeded:
+        publish_app_snapshot()
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- RSS Scraper finished. ---")
 
-def run_forecast_scraper():
+def publish_app_snapshot(wait=SNAPSHOT_WAIT):
+    """
+    Rewrites the app snapshot files (see snapshots.py) after a successful
+    run. Unchanged data publishes no new version; alerts that have aged out
+    do. The RSS and forecast runs can finish together, so publishing holds
+    its own lease. A failure here is reported but never fails the run.
+    """
+    from snapshots import publish_snapshot, snapshot_dir
+
+    def job():
+        try:
+            result = publish_snapshot(DB_FILE)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"Error publishing app snapshot: {e}")
+            return
+        if result['changed']:
+            print(f"Published app snapshot v{result['version']} to {snapshot_dir(DB_FILE)} "
+                  f"({result['size']} bytes, {result['gzip_size']} gzipped, {result['deltas']} delta(s))")
+        else:
+            print(f"App snapshot unchanged (v{result['version']})")
+
+    run_exclusive('snapshot', job, wait)
+
+def run_exclusive(run_type, job, wait=None, due=None):
+    """
+    Runs job() holding run_type's lease (see leases.py), so a slow run and
+    the next cron tick never scrape the same thing at once. If another
+    process holds it, waits up to wait seconds (default TTMS_LEASE_WAIT)
+    and then skips. due, if given, is asked again once the lease is held:
+    a run that finished in the meantime (or that we waited for) has
+    usually just done the work.
+    """
+    with hold_lease(DB_FILE, run_type, wait=wait) as lease:
+        if lease is None:
+            holder = current_holder(DB_FILE, run_type)
+            detail = f" ({holder['owner']}, until {holder['expires_at']})" if holder else ""
+            print(f"Skipping {run_type}: another run holds its lease{detail}")
+        elif due is not None and not due():
+            print(f"Skipping {run_type}: another run has just done it")
+        else:
+            job()
+
+def _report_page_progress(progress):
+    """Print one progress line per committed forecast page."""
+    print(f"  page {progress['page']}/{progress['page_count']}: {progress['items']} item(s), "
+          f"{progress['new']} new (total {progress['total_fetched']} fetched, {progress['total_new']} new)")
+
+def run_forecast_scraper(full: bool = False, session=None):
     """
     Runs the forecast scraper to fetch weather forecasts.
+
+    By default this is an incremental sync that stops paginating at the first
+    page already covered by the stored high-water mark; full=True walks every page.
     """
+    from ttms_scraper import sync_forecasts
+
     print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Starting Weather Forecast Scraper ---")
     
     start_time = datetime.now(timezone.utc)
+    succeeded = False
     
     try:
-        # Fetch and save forecasts
-        forecast_data = fetch_all_forecasts()
+        # Fetch and save forecasts page by page
+        timer = PhaseTimer()
+        result = sync_forecasts(full=full, on_page=_report_page_progress, session=session, timer=timer,
+                                lease_lost=lease_lost('forecasts'))
+        pages = {'pages_fetched': result.get('pages_fetched'), 'pages_skipped': result.get('pages_skipped'),
+                 'phases': timer.seconds}
         
-        if forecast_data:
-            print(f"Total forecasts fetched: {len(forecast_data)}")
-            forecast_inserted = save_forecasts_to_db(forecast_data)
-            log_scraper_run('forecasts', start_time, datetime.now(timezone.utc), 
-                           len(forecast_data), forecast_inserted, True)
+        if result.get('circuit_open'):
+            storage.log_scraper_run(DB_FILE, 'forecasts', start_time, datetime.now(timezone.utc),
+                           0, 0, False, f"Circuit breaker open until {result['circuit_open']}",
+                           status='circuit_open')
+        elif result.get('unchanged'):
+            print("Forecasts unchanged since last sync; skipping parse and save.")
+            storage.log_scraper_run(DB_FILE, 'forecasts', start_time, datetime.now(timezone.utc),
+                           0, 0, True, status='unchanged', **pages)
+            succeeded = True
+        elif result.get('complete') and result.get('fetched'):
+            print(f"Total forecasts fetched: {result['fetched']} ({result['new']} new, {result['updated']} amended)")
+            storage.log_scraper_run(DB_FILE, 'forecasts', start_time, datetime.now(timezone.utc), 
+                           result['fetched'], result['new'], True, **pages)
+            succeeded = True
+        elif result.get('fetched'):
+            # Pages already committed are kept; the next run picks up the rest
+            message = result.get('error') or (
+                f"Incomplete sync: {result.get('pages_fetched')} of {result.get('page_count')} page(s) fetched")
+            print(message)
+            storage.log_scraper_run(DB_FILE, 'forecasts', start_time, datetime.now(timezone.utc),
+                           result['fetched'], result['new'], False, message, **pages)
         else:
             print("Could not fetch any forecast data.")
-            log_scraper_run('forecasts', start_time, datetime.now(timezone.utc), 
-                           0, 0, False, "No forecast data fetched")
+            storage.log_scraper_run(DB_FILE, 'forecasts', start_time, datetime.now(timezone.utc), 
+                           0, 0, False, result.get('error') or result.get('fetch_error') or "No forecast data fetched", **pages)
             
     except Exception as e:
         print(f"Error during forecast scraping: {e}")
-        log_scraper_run('forecasts', start_time, datetime.now(timezone.utc), 
+        storage.log_scraper_run(DB_FILE, 'forecasts', start_time, datetime.now(timezone.utc), 
                        0, 0, False, str(e))
     
+    if succeeded:
+        publish_app_snapshot()
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Forecast Scraper finished. ---")
 
+def run_replay(kind=None):
+    """
+    Re-derives the database from the raw-payload archive without network
+    access. To rebuild from scratch, delete weather_forecasts.db first.
+    """
+    from ttms_scraper import replay_forecasts_from_archive
+    from ttms_rss_scraper import replay_alerts_from_archive
+
+    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Replaying raw-payload archive ---")
+    if kind in (None, 'forecast'):
+        replay_forecasts_from_archive()
+    if kind in (None, 'rss'):
+        replay_alerts_from_archive()
+
+def export_metrics(path=None):
+    """Writes phase histograms and last-run gauges as a Prometheus textfile."""
+    conn = None
+    try:
+        conn = storage.acquire(DB_FILE)
+        path = write_prometheus(conn, path or METRICS_FILE)
+        print(f"Wrote metrics to {path}")
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error writing metrics: {e}")
+    finally:
+        if conn:
+            storage.release(conn)
+
+def _jittered(interval: timedelta, jitter: float) -> float:
+    """interval in seconds, moved by up to +/- jitter of itself."""
+    seconds = interval.total_seconds()
+    return max(seconds + random.uniform(-jitter, jitter) * seconds, 0.0)
+
+def run_daemon(jobs=('rss', 'forecast', 'compact'), jitter: float = DAEMON_JITTER):
+    """
+    Runs the selected jobs on their intervals until SIGTERM/SIGINT.
+
+    One HTTP session and one DB connection stay open for the life of the
+    process. At start-up any job that is overdue (going by its last
+    successful run) runs straight away, once, however many runs were missed;
+    the others resume on their usual cadence. Each next run is jittered. A
+    stop signal lets the job in progress finish, then exits. The metrics
+    textfile is rewritten after every job.
+    """
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"\nReceived {signal.Signals(signum).name}; stopping after the current job...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    from ttms_scraper import make_http_session
+
+    storage.open_shared(DB_FILE)
+    storage.ensure_schema(DB_FILE)
+    session = make_http_session()
+    table = {
+        'rss': ('rss_alerts', RSS_INTERVAL,
+                lambda: run_exclusive('rss_alerts', lambda: run_rss_scraper(session=session), wait=0)),
+        'forecast': ('forecasts', FORECAST_INTERVAL,
+                     lambda: run_exclusive('forecasts', lambda: run_forecast_scraper(session=session), wait=0)),
+        'compact': ('compact', COMPACT_INTERVAL, lambda: run_exclusive('compact', run_compact, wait=0)),
+    }
+
+    now_utc = datetime.now(timezone.utc)
+    next_run = {}
+    for name in jobs:
+        run_type, interval, _ = table[name]
+        last = _get_last_success_timestamp(run_type)
+        due_in = 0.0 if not last else (last + interval - now_utc).total_seconds()
+        if due_in > 0:
+            # Not due yet: keep the usual cadence, spread like any other run
+            delay = due_in + random.uniform(0, jitter) * interval.total_seconds()
+        else:
+            # Never run, or missed while we were down: catch up once, now
+            delay = 0.0
+        next_run[name] = time.monotonic() + delay
+        print(f"Daemon: {name} every {interval}, first run in {delay:.0f}s")
+
+    try:
+        while not stop.is_set():
+            name = min(next_run, key=next_run.get)
+            wait = next_run[name] - time.monotonic()
+            if wait > 0:
+                stop.wait(wait)
+                continue
+            _, interval, job = table[name]
+            job()
+            export_metrics()
+            next_run[name] = time.monotonic() + _jittered(interval, jitter)
+    finally:
+        session.close()
+        display_status()
+        storage.close_shared(DB_FILE)
+        print("Daemon stopped.")
+
+def run_compact(retention_days=None, convert=False):
+    """
+    Rolls scraper_analytics rows past retention up into analytics_rollups,
+    deletes them and releases the freed pages (see retention.py). Scheduled
+    runs only use incremental vacuum; convert=True (the compact command)
+    also switches an older database to auto_vacuum=INCREMENTAL with one full
+    VACUUM the first time.
+    """
+    from retention import compact
+
+    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Compacting run analytics ---")
+    start_time = datetime.now(timezone.utc)
+    try:
+        result = compact(DB_FILE, retention_days, convert=convert)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error compacting: {e}")
+        storage.log_scraper_run(DB_FILE, 'compact', start_time, datetime.now(timezone.utc), 0, 0, False, str(e))
+        return
+    print(f"Rolled up {result['runs']} run(s) from {result['days']} day(s) before {result['cutoff'][:10]} "
+          f"into {result['rollups']} rollup row(s); dropped {result['hourly_dropped']} old hourly rollup(s).")
+    if result['mode'] == 'none':
+        print("auto_vacuum is off, so freed pages stay in the file for reuse; "
+              "run 'run_scrapers.py compact' to switch it on.")
+    print(f"Reclaimed {result['reclaimed_bytes']:,} bytes ({'no' if result['mode'] == 'none' else result['mode']} vacuum); "
+          f"database and WAL {result['file_before']:,} -> {result['file_after']:,} bytes.")
+    storage.log_scraper_run(DB_FILE, 'compact', start_time, datetime.now(timezone.utc),
+                            result['runs'], result['rollups'], True)
+
+def run_compress_text(retrain=False):
+    """
+    Compresses the stored forecast and alert text (see textcodec.py), training
+    the dictionary first if there is none yet or retrain is set. New rows are
+    compressed as they are saved; this converts what was stored before, or
+    re-encodes everything after a retrain. The file keeps its size until the
+    next compact releases the freed pages.
+    """
+    from textcodec import compress_existing
+
+    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Compressing stored text ---")
+    started = time.perf_counter()
+    try:
+        result = compress_existing(DB_FILE, retrain=retrain)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error compressing text: {e}")
+        return
+    if result['dictionary']:
+        print(f"Using dictionary {result['dictionary']} ({result['dictionary_bytes']:,} bytes).")
+    else:
+        print("No dictionary (too little text to train on, or TTMS_TEXT_COMPRESSION is off).")
+    print(f"Re-encoded {result['updated']} of {result['rows']} row(s) in {time.perf_counter() - started:.2f} s; "
+          f"stored text {result['bytes_before']:,} -> {result['bytes_after']:,} bytes.")
+    print(f"Database file {result['file_bytes']:,} bytes; run compact to release the freed pages.")
+
+def run_reclassify():
+    """Re-applies the current alert classifier to the whole weather_alerts history."""
+    from ttms_rss_scraper import reclassify_alerts
+
+    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Reclassifying stored alerts ---")
+    try:
+        reclassify_alerts()
+    except sqlite3.Error as e:
+        print(f"Error reclassifying alerts: {e}")
+
+def run_rollup_rebuild():
+    """Recomputes daily_rollups from scratch (normally they are kept current on every save)."""
+    from rollups import rebuild_daily_rollups
+
+    started = time.perf_counter()
+    try:
+        rows = rebuild_daily_rollups(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error rebuilding daily rollups: {e}")
+        return
+    print(f"Rebuilt {rows} daily rollup row(s) in {time.perf_counter() - started:.2f} s.")
+
+def run_stats_check():
+    """
+    Recounts the tables behind table_stats and rebuilds the counters if
+    they disagree. Full scans: run it occasionally, not on every start.
+    """
+    try:
+        drift = storage.check_table_stats(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error checking table stats: {e}")
+        return
+    if not drift:
+        print("Table stats are consistent.")
+    for table, values in drift.items():
+        print(f"Rebuilt stats for {table}: stored {values['stored']}, actual {values['actual']}")
+
+def _split_options(argv):
+    """Splits subcommand args into ({'name': 'value'} for --name=value flags, [positional])."""
+    options = {}
+    positional = []
+    for a in argv:
+        if a.startswith('--'):
+            key, _, value = a[2:].partition('=')
+            options[key.lower()] = value
+        else:
+            positional.append(a)
+    return options, positional
+
+def _subcommand_args(name):
+    """Everything after the subcommand name in sys.argv, case preserved."""
+    at = [a.lower() for a in sys.argv].index(name)
+    return sys.argv[at + 1:]
+
+def run_search(argv):
+    """
+    Full-text search from the command line. argv is everything after
+    "search", case preserved; an argument containing spaces is searched as
+    a phrase.
+    """
+    from search import search_forecasts, search_alerts
+
+    options, words = _split_options(argv)
+    terms = []
+    for a in words:
+        a = a.replace('"', ' ').strip()
+        terms.append(f'"{a}"' if ' ' in a else a)
+    text = ' '.join(terms)
+    if not text:
+        print("Usage: run_scrapers.py search <terms> [--from=YYYY-MM-DD] [--to=YYYY-MM-DD] "
+              "[--area=name] [--alerts|--forecasts] [--limit=N]")
+        return
+    start, end = options.get('from') or None, options.get('to') or None
+    try:
+        limit = int(options.get('limit') or 20)
+    except ValueError:
+        print(f"Invalid --limit: {options['limit']}")
+        return
+
+    try:
+        if 'alerts' not in options:
+            results = search_forecasts(DB_FILE, text, start, end, options.get('area') or None, limit)
+            print(f"\n--- Forecasts matching {text} ({len(results)}) ---")
+            for r in results:
+                print(f"{r['insertionDate']}  #{r['forecastid']}  {', '.join(r['areas'])}")
+                print(f"    {r['snippet']}")
+        if 'forecasts' not in options:
+            results = search_alerts(DB_FILE, text, start, end, limit)
+            print(f"\n--- Alerts matching {text} ({len(results)}) ---")
+            for r in results:
+                print(f"{r['published'] or r['pub_date']}  {r['title']}")
+                print(f"    {r['snippet']}")
+    except sqlite3.Error as e:
+        print(f"Error searching: {e}")
+
+def run_export(argv):
+    """Streams one history table to a CSV / NDJSON / Parquet file and reports throughput."""
+    from export import DEFAULT_CHUNK_SIZE, EXPORT_TABLES, FORMATS, export_table
+
+    options, positional = _split_options(argv)
+    if not positional:
+        print(f"Usage: run_scrapers.py export <{'|'.join(EXPORT_TABLES)}> [--format={'|'.join(FORMATS)}] "
+              "[--out=path] [--columns=a,b] [--from=YYYY-MM-DD] [--to=YYYY-MM-DD] [--chunk=N]")
+        return
+    table = positional[0]
+    fmt = (options.get('format') or 'csv').lower()
+    path = options.get('out') or f"{table}.{fmt}"
+    columns = [c.strip() for c in (options.get('columns') or '').split(',') if c.strip()]
+    try:
+        chunk_size = int(options.get('chunk') or DEFAULT_CHUNK_SIZE)
+        result = export_table(DB_FILE, table, path, fmt, columns or None,
+                              options.get('from') or None, options.get('to') or None, chunk_size)
+    except ValueError as e:
+        print(f"Export failed: {e}")
+        return
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error exporting {table}: {e}")
+        return
+    print(f"Exported {result['rows']} row(s) of {table} to {result['path']} in {result['seconds']:.2f} s "
+          f"({result['rows_per_second']:,.0f} rows/s).")
+
 def display_status():
     """Displays current status and statistics."""
     try:
-        stats = get_database_stats()
+        stats = storage.get_database_stats(DB_FILE)
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] --- Current Status ---")
         print(f"Total forecasts: {stats.get('total_forecasts', 0)}")
         print(f"Total scraper runs: {stats.get('total_runs', 0)}")
@@ -140,39 +549,137 @@ def main():
       - rss: force run RSS only
       - forecast: force run Forecasts only
       - both: force run both
-      - auto (default): run RSS if 10+ min since last success; Forecasts if 60+ min
+      - auto (default): run RSS if 10+ min since last success; Forecasts if 60+ min;
+        compact analytics if a day since the last compaction
+      - replay [forecast|rss]: rebuild from the raw-payload archive, no network
+      - backfill-observations: one-shot parallel fill of forecast_observations
+      - backfill-conditions [--reparse]: one-shot parallel fill of forecast_conditions
+        (--reparse: every forecast again, after a parser change)
+      - rebuild-rollups: recompute daily_rollups from every stored observation
+      - daemon: keep running, scheduling RSS, forecasts and compaction with jitter (stop with SIGTERM)
+      - metrics [path]: write the Prometheus textfile (default TTMS_METRICS_FILE)
+      - snapshot: publish the app snapshot and its deltas now (see snapshots.py)
+      - compact [--days=N]: roll run analytics older than N days (default
+        TTMS_ANALYTICS_RETENTION_DAYS) into hourly/daily rollups, delete them
+        and vacuum; reports the bytes reclaimed. auto and daemon do this daily
+      - compress-text [--retrain]: compress stored text columns with the trained
+        dictionary (training one first if needed); run compact afterwards
+      - check-stats: verify table_stats counters against full counts, rebuilding on drift
+      - reclassify: re-run alert level/type classification over stored alerts
+      - search <terms>: BM25-ranked full-text search (--from/--to/--area/--limit,
+        --alerts or --forecasts to search only one of them)
+      - export <table>: stream a history table to CSV / NDJSON / Parquet
+        (--format, --out, --columns, --from/--to, --chunk)
+
+    Flags:
+      - --full: resync every forecast page, ignoring the high-water mark
+      - --wait=SECONDS: if another run of the same scraper holds its lease,
+        wait up to this long for it (default TTMS_LEASE_WAIT, 0: skip at once)
     """
     print("=== TTMS Weather Data Scrapers ===")
-    print("Setting up database...")
-
-    # Setup database
-    setup_database()
 
     # Determine which scraper(s) to run based on CLI arg
-    arg = sys.argv[1].lower() if len(sys.argv) > 1 else 'auto'
+    args = [a.lower() for a in sys.argv[1:]]
+    full = '--full' in args
+    waits = [a.partition('=')[2] for a in args if a.startswith('--wait=')]
+    try:
+        wait = float(waits[-1]) if waits else None
+    except ValueError:
+        print(f"Invalid --wait: {waits[-1]}")
+        return
+    positional = [a for a in args if not a.startswith('--')]
+    arg = positional[0] if positional else 'auto'
     now_utc = datetime.now(timezone.utc)
 
-    if arg == 'rss':
-        run_rss_scraper()
-    elif arg == 'forecast':
-        run_forecast_scraper()
-    elif arg == 'both':
-        run_rss_scraper()
-        run_forecast_scraper()
-    else:
-        # auto mode
-        if should_run_rss(now_utc):
-            run_rss_scraper()
+    # One connection (and statement cache) for the whole invocation
+    conn = storage.open_shared(DB_FILE)
+    try:
+        due = None
+        if arg == 'auto' and storage.schema_version(conn) == storage.SCHEMA_VERSION:
+            # Most cron ticks have nothing due; find out before any scraper
+            # module is imported (see the imports at the top)
+            due = (should_run_rss(now_utc), should_run_forecasts(now_utc), should_run_compact(now_utc))
         else:
-            print("Skipping RSS: last successful run < 10 minutes ago")
+            # Only runs DDL when the schema version has changed
+            storage.ensure_schema(DB_FILE)
 
-        if should_run_forecasts(now_utc):
-            run_forecast_scraper()
+        if arg == 'rss':
+            run_exclusive('rss_alerts', run_rss_scraper, wait)
+        elif arg == 'forecast':
+            run_exclusive('forecasts', lambda: run_forecast_scraper(full=full), wait)
+        elif arg == 'both':
+            run_exclusive('rss_alerts', run_rss_scraper, wait)
+            run_exclusive('forecasts', lambda: run_forecast_scraper(full=full), wait)
+        elif arg == 'replay':
+            run_replay(positional[1] if len(positional) > 1 else None)
+        elif arg == 'backfill-observations':
+            from observations import backfill_observations
+            backfill_observations(DB_FILE)
+        elif arg == 'backfill-conditions':
+            from conditions import backfill_conditions
+            options, _ = _split_options(_subcommand_args('backfill-conditions'))
+            backfill_conditions(DB_FILE, reparse='reparse' in options)
+        elif arg == 'rebuild-rollups':
+            run_rollup_rebuild()
+        elif arg == 'daemon':
+            run_daemon()
+            return
+        elif arg == 'metrics':
+            # Keep the path's case; args above were lowercased
+            paths = [a for a in sys.argv[1:] if not a.startswith('--')][1:]
+            export_metrics(paths[0] if paths else None)
+            return
+        elif arg == 'search':
+            # Keep the terms' case for display; FTS matching ignores it anyway
+            run_search(_subcommand_args('search'))
+            return
+        elif arg == 'export':
+            # Paths and column names keep their case
+            run_export(_subcommand_args('export'))
+            return
+        elif arg == 'snapshot':
+            publish_app_snapshot(wait)
+        elif arg == 'compact':
+            options, _ = _split_options(_subcommand_args('compact'))
+            try:
+                days = float(options['days']) if options.get('days') else None
+            except ValueError:
+                print(f"Invalid --days: {options['days']}")
+                return
+            run_exclusive('compact', lambda: run_compact(days, convert=True), wait)
+        elif arg == 'compress-text':
+            options, _ = _split_options(_subcommand_args('compress-text'))
+            run_exclusive('compress_text', lambda: run_compress_text('retrain' in options), wait)
+        elif arg == 'check-stats':
+            run_stats_check()
+        elif arg == 'reclassify':
+            run_reclassify()
         else:
-            print("Skipping Forecasts: last successful run < 60 minutes ago")
+            # auto mode
+            rss_due, forecasts_due, compact_due = due or (
+                should_run_rss(now_utc), should_run_forecasts(now_utc), should_run_compact(now_utc))
+            if rss_due:
+                run_exclusive('rss_alerts', run_rss_scraper, wait,
+                              due=lambda: should_run_rss(datetime.now(timezone.utc)))
+            else:
+                print("Skipping RSS: last successful run < 10 minutes ago")
+
+            if forecasts_due:
+                run_exclusive('forecasts', lambda: run_forecast_scraper(full=full), wait,
+                              due=lambda: should_run_forecasts(datetime.now(timezone.utc)))
+            else:
+                print("Skipping Forecasts: last successful run < 60 minutes ago")
 
-    # Show brief status
-    display_status()
+            if compact_due:
+                run_exclusive('compact', run_compact, wait,
+                              due=lambda: should_run_compact(datetime.now(timezone.utc)))
+            else:
+                print("Skipping compaction: last run < 1 day ago")
+
+        # Show brief status
+        display_status()
+    finally:
+        storage.close_shared(DB_FILE)
 
 if __name__ == "__main__":
     main()
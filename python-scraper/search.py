@@ -0,0 +1,192 @@
+"""
+Full-text search over forecast narratives and alert text (SQLite FTS5).
+
+forecast_fts indexes textArea1..3, synopsis and outlook1/2 (rowid =
+forecastid); alert_fts indexes alert titles and descriptions. Both keep
+their own plain copy of the text. Several of those columns are stored
+compressed (see textcodec.py), and SQLite cannot decode them without a
+Python function, so the writers index the text they already hold in
+Python: ttms_scraper and ttms_rss_scraper call index_forecasts() /
+index_alerts() in the same transaction as the row. Only deletes are left
+to triggers, which need no decoding. The schema thus never calls a Python
+function, and the sqlite3 shell or any other connection can write the
+tables; rows written that way are just not searchable. The tables and
+triggers themselves are created by the storage migrations (version 11).
+
+Both use the porter stemmer, so "flooding" also finds "flood" and "floods".
+Results are ranked with BM25 (best first).
+"""
+
+import re
+import sqlite3
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Sequence
+
+import storage
+
+FORECAST_TEXT_COLUMNS = ['textArea1', 'textArea2', 'textArea3', 'synopsis', 'outlook1', 'outlook2']
+# BM25 column weights for alert_fts (alert_id, title, description)
+ALERT_WEIGHTS = (0.0, 4.0, 1.0)
+DEFAULT_LIMIT = 20
+
+_TERM_RE = re.compile(r'"[^"]*"|\S+')
+_FORECAST_INDEX_SQL = (
+    f"INSERT INTO forecast_fts (rowid, {', '.join(FORECAST_TEXT_COLUMNS)}) "
+    f"VALUES ({', '.join(['?'] * (len(FORECAST_TEXT_COLUMNS) + 1))})"
+)
+_ALERT_INDEX_SQL = "INSERT INTO alert_fts (alert_id, title, description) VALUES (?, ?, ?)"
+
+
+def index_forecasts(conn: sqlite3.Connection, forecasts: Iterable[Dict[str, Any]]) -> None:
+    """
+    (Re)index forecasts, dicts holding forecastid and the plain
+    FORECAST_TEXT_COLUMNS, on conn inside the caller's transaction.
+    """
+    rows = [(f['forecastid'],) + tuple(f.get(c) for c in FORECAST_TEXT_COLUMNS) for f in forecasts]
+    if rows:
+        conn.executemany("DELETE FROM forecast_fts WHERE rowid = ?", [row[:1] for row in rows])
+        conn.executemany(_FORECAST_INDEX_SQL, rows)
+
+
+def index_alerts(conn: sqlite3.Connection, alerts: Sequence[Sequence[Any]]) -> None:
+    """
+    (Re)index alerts, (alert_id, title, plain description) tuples, on conn
+    inside the caller's transaction. Callers pass a batch at a time.
+    """
+    if alerts:
+        # One statement: each lookup by the UNINDEXED alert_id is a scan
+        ids = [alert[0] for alert in alerts]
+        conn.execute(f"DELETE FROM alert_fts WHERE alert_id IN ({','.join(['?'] * len(ids))})", ids)
+        conn.executemany(_ALERT_INDEX_SQL, alerts)
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must appear, and
+    "double-quoted" runs must appear as phrases. Each term is quoted, so
+    punctuation in the input can never be read as FTS5 syntax.
+    """
+    terms = []
+    for term in _TERM_RE.findall(text):
+        term = term.strip('"')
+        if term:
+            terms.append('"%s"' % term.replace('"', '""'))
+    return ' '.join(terms)
+
+
+def search_forecasts(
+    db_file: str,
+    text: str,
+    start: str | None = None,
+    end: str | None = None,
+    area: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> List[Dict[str, Any]]:
+    """
+    Return up to limit forecasts matching text, best BM25 match first.
+
+    start / end bound insertionDate (YYYY-MM-DD, inclusive). area keeps
+    forecasts whose forecastArea1..3 mentions it (case-insensitive), e.g.
+    "tobago". Each result has forecastid, insertionDate, forecastPeriod,
+    areas, score (lower is better) and a snippet with matches in [brackets].
+    """
+    query = fts_query(text)
+    if not query:
+        return []
+    sql = '''
+        SELECT f.forecastid, f.insertionDate, f.forecastPeriod,
+               f.forecastArea1, f.forecastArea2, f.forecastArea3,
+               bm25(forecast_fts) AS score,
+               snippet(forecast_fts, -1, '[', ']', '...', 16) AS snippet
+        FROM forecast_fts
+        JOIN detailed_forecasts f ON f.forecastid = forecast_fts.rowid
+        WHERE forecast_fts MATCH ?
+    '''
+    params: List[Any] = [query]
+    if start:
+        sql += " AND f.insertionDate >= ?"
+        params.append(start)
+    if end:
+        sql += " AND f.insertionDate <= ?"
+        params.append(end)
+    if area:
+        sql += " AND (f.forecastArea1 LIKE ? OR f.forecastArea2 LIKE ? OR f.forecastArea3 LIKE ?)"
+        params += [f"%{area}%"] * 3
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    conn = storage.acquire(db_file)
+    try:
+        results = []
+        for row in conn.execute(sql, params):
+            results.append({
+                "forecastid": row[0],
+                "insertionDate": row[1],
+                "forecastPeriod": row[2],
+                "areas": [a for a in row[3:6] if a],
+                "score": row[6],
+                "snippet": row[7],
+            })
+        return results
+    finally:
+        storage.release(conn)
+
+
+def _published_date(pub_date: str | None) -> str | None:
+    """RFC 822 pubDate -> YYYY-MM-DD, or None if it cannot be parsed."""
+    try:
+        return parsedate_to_datetime(pub_date).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def search_alerts(
+    db_file: str,
+    text: str,
+    start: str | None = None,
+    end: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+) -> List[Dict[str, Any]]:
+    """
+    Return up to limit alerts matching text, best BM25 match first (title
+    hits weigh more than description hits). start / end (YYYY-MM-DD,
+    inclusive) bound the publication date. pub_date is RFC 822 text, which
+    SQL cannot range-compare, so the date filter runs here over the ranked
+    matches.
+    """
+    query = fts_query(text)
+    if not query:
+        return []
+    sql = f'''
+        SELECT a.alert_id, a.title, a.pub_date, a.alert_level, a.alert_type,
+               bm25(alert_fts, {', '.join(map(str, ALERT_WEIGHTS))}) AS score,
+               snippet(alert_fts, -1, '[', ']', '...', 16) AS snippet
+        FROM alert_fts
+        JOIN weather_alerts a ON a.alert_id = alert_fts.alert_id
+        WHERE alert_fts MATCH ?
+        ORDER BY score
+    '''
+    conn = storage.acquire(db_file)
+    try:
+        results = []
+        for row in conn.execute(sql, (query,)):
+            published = _published_date(row[2])
+            if (start or end) and published is None:
+                continue
+            if (start and published < start) or (end and published > end):
+                continue
+            results.append({
+                "alert_id": row[0],
+                "title": row[1],
+                "pub_date": row[2],
+                "published": published,
+                "alert_level": row[3],
+                "alert_type": row[4],
+                "score": row[5],
+                "snippet": row[6],
+            })
+            if len(results) >= limit:
+                break
+        return results
+    finally:
+        storage.release(conn)
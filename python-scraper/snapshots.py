@@ -0,0 +1,373 @@
+"""
+Prebuilt, versioned app snapshot: the latest forecast plus the active alerts.
+
+Every app client needs the same payload, so rather than query per request
+each successful scraper run writes it once as static files in snapshots/
+next to the database:
+
+  manifest.json                 version, hash and the files below
+  snapshot-v<N>.json[.gz|.br]   the full payload of version N, precompressed;
+                                the previous SNAPSHOT_DELTAS are kept too, to
+                                build deltas from
+  deltas/<M>-to-<N>.json[.gz|.br]
+                                what changed since each of the previous
+                                SNAPSHOT_DELTAS versions
+
+A client holding version M fetches manifest.json; if deltas lists M it
+downloads that delta and applies it (see apply_delta), otherwise the full
+snapshot the manifest names. Every file but the manifest gets a new name
+per version and is in place before manifest.json is renamed over the old
+one, so whichever manifest a client reads, the files it lists match it. The payload hash is SHA-256 of its canonical JSON, so a client can
+check what it built. A run that changes nothing publishes no new version.
+Brotli files are written only when the optional brotli package is installed.
+"""
+
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Tuple
+
+import storage
+from textcodec import codec
+
+# --- Configuration ---
+DB_FILE = storage.DB_FILE
+# Overrides the default snapshots/ directory next to the database
+SNAPSHOT_DIR = os.environ.get("TTMS_SNAPSHOT_DIR")
+# Number of previous versions a delta is published from
+SNAPSHOT_DELTAS = int(os.environ.get("TTMS_SNAPSHOT_DELTAS", "5"))
+# An alert counts as active for this long after publication
+ACTIVE_ALERT_HOURS = float(os.environ.get("TTMS_ACTIVE_ALERT_HOURS", "48"))
+# Levels that announce the end of a warning rather than a warning
+CLEAR_LEVELS = ("GREEN",)
+# alert_type values that name no hazard; those alerts are matched by title words
+GENERIC_TYPES = ("OTHER", "DISCONTINUATION")
+MANIFEST_NAME = "manifest.json"
+# The detailed_forecasts columns the app renders (types/weather.ts); the rest,
+# jsonObject above all, would only weigh down every snapshot and delta
+SNAPSHOT_FORECAST_COLUMNS = [
+    'forecastid', 'insertionDate', 'IssuedAt', 'forecastTime', 'forecaster', 'forecastPeriod', 'timePeriod',
+    'forecastArea1', 'forecastArea2', 'forecastArea3', 'textArea1', 'textArea2', 'textArea3', 'synopsis',
+    'imageTrin', 'imagebago', 'seas', 'waves1', 'waves2', 'probrainfall',
+    'PiarcoFcstMxTemp', 'PiarcoFcstMnTemp', 'PiarcoActMxTemp', 'PiarcoMnTemp',
+    'CrownFcstMxTemp', 'CrownFcstMnTemp', 'CrownActMxTemp', 'CrownMnTemp',
+    'PiarcoheatIndex', 'CPointheatIndex', 'sunrise', 'sunset',
+    'trinAmHigh', 'trinPmHigh', 'trinAmLow', 'trinPmLow', 'tobAmHigh', 'tobPmHigh', 'tobAmLow', 'tobPmLow',
+    'outlook1', 'minTrin24look', 'maxTrin24look', 'minTob24look', 'maxTob24look',
+    'outlook2', 'minTrin48look', 'maxTrin48look', 'minTob48look', 'maxTob48look',
+]
+
+
+# Title wording that ends an alert, whatever level or type it was filed under
+_CLEAR_RE = re.compile(r'\b(?:cancel(?:led|lation)?|discontinu(?:ed|ation))\b', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'#\s*(\d+)')
+_KIND_RE = re.compile(r'\b(alert|watch|warning)s?\b', re.IGNORECASE)
+# What is left of a title once the above are gone, minus level words and punctuation
+_FILLER_RE = re.compile(r'\b(?:of|the|for|level|yellow|orange|red|green)\b|[^a-z ]')
+
+_StagedFile = Tuple[str, str]
+
+
+def snapshot_dir(db_file: str) -> str:
+    """Snapshot directory that belongs to db_file (TTMS_SNAPSHOT_DIR if set)."""
+    return SNAPSHOT_DIR or os.path.join(os.path.dirname(os.path.abspath(db_file)), "snapshots")
+
+
+def _published(pub_date: str | None) -> datetime | None:
+    try:
+        published = parsedate_to_datetime(pub_date)
+    except (TypeError, ValueError):
+        return None
+    return published if published.tzinfo else published.replace(tzinfo=timezone.utc)
+
+
+def is_clear(alert: Dict[str, Any]) -> bool:
+    """True for a notice that ends an alert: a CLEAR_LEVELS level, or cancellation wording in the title."""
+    return alert["alert_level"] in CLEAR_LEVELS or bool(_CLEAR_RE.search(alert["title"] or ""))
+
+
+def alert_key(alert: Dict[str, Any]) -> Tuple[str, str | None, int | None]:
+    """
+    (subject, kind, number) naming what alert is about, for matching an
+    all-clear to the alerts it ends: "Cancellation of Severe Weather Watch
+    #1" and "Severe Weather Watch # 1- Yellow Level" both give ("severe
+    weather", "watch", 1). The subject is the alert_type, or for the
+    GENERIC_TYPES the title words left once wording, levels and numbers
+    are dropped. kind and number are None when the title gives none.
+    """
+    title = alert["title"] or ""
+    number = _NUMBER_RE.search(title)
+    kind = _KIND_RE.search(title)
+    subject = alert["alert_type"]
+    if subject in GENERIC_TYPES:
+        words = _KIND_RE.sub(" ", _CLEAR_RE.sub(" ", _NUMBER_RE.sub(" ", title))).lower()
+        subject = " ".join(_FILLER_RE.sub(" ", words).split())
+    return subject, kind.group(1).lower() if kind else None, int(number.group(1)) if number else None
+
+
+def _ends(clear: Tuple[str, str | None, int | None], key: Tuple[str, str | None, int | None]) -> bool:
+    """Whether an all-clear with key clear ends an alert with key; a part either leaves out matches any."""
+    return clear[0] == key[0] and all(c is None or k is None or c == k for c, k in zip(clear[1:], key[1:]))
+
+
+def active_alerts(
+    conn: sqlite3.Connection,
+    now: datetime | None = None,
+    db_file: str = DB_FILE,
+) -> List[Dict[str, Any]]:
+    """
+    Alerts published in the last ACTIVE_ALERT_HOURS that are still in force:
+    not themselves an all-clear (see is_clear), and with no later all-clear
+    for the same alert (see alert_key). Newest first, each with its
+    publication time as ISO text under "published". db_file is the database
+    conn is open on; its dictionaries decode the compressed text.
+    """
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(hours=ACTIVE_ALERT_HOURS)
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    # pub_date is RFC 822 text, so SQL can only narrow by insertion_date,
+    # which is never earlier than publication
+    text_codec = codec(db_file)
+    rows = [text_codec.decode_dict(dict(row)) for row in cursor.execute(
+        "SELECT * FROM weather_alerts WHERE insertion_date >= ?", (since.isoformat(),))]
+
+    alerts = []
+    clears: List[Tuple[datetime, Tuple[str, str | None, int | None]]] = []
+    for row in rows:
+        published = _published(row["pub_date"])
+        if published is None or not since <= published <= now:
+            continue
+        if is_clear(row):
+            clears.append((published, alert_key(row)))
+        else:
+            alerts.append((published, row))
+
+    result = []
+    for published, row in sorted(alerts, key=lambda a: (-a[0].timestamp(), a[1]["alert_id"])):
+        key = alert_key(row)
+        if any(cleared > published and _ends(clear, key) for cleared, clear in clears):
+            continue
+        row["published"] = published.isoformat()
+        result.append(row)
+    return result
+
+
+def build_payload(
+    conn: sqlite3.Connection,
+    now: datetime | None = None,
+    db_file: str = DB_FILE,
+) -> Dict[str, Any]:
+    """
+    {"forecast": SNAPSHOT_FORECAST_COLUMNS of the latest forecast or None,
+    "alerts": active_alerts()}.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    row = cursor.execute(f"SELECT {', '.join(SNAPSHOT_FORECAST_COLUMNS)} FROM detailed_forecasts "
+                         f"ORDER BY forecastid DESC LIMIT 1").fetchone()
+    forecast = codec(db_file).decode_dict(dict(row)) if row else None
+    return {"forecast": forecast, "alerts": active_alerts(conn, now, db_file)}
+
+
+def _canonical(payload: Any) -> bytes:
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def payload_hash(payload: Dict[str, Any]) -> str:
+    """SHA-256 of the payload's canonical JSON (sorted keys, no whitespace)."""
+    return hashlib.sha256(_canonical(payload)).hexdigest()
+
+
+def make_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What turns payload old into payload new:
+      forecast  {"set": {column: value}} for changed columns of the same
+                forecast row, or {"replace": row} when the row is new
+      alerts    {"upsert": [alert, ...], "remove": [alert_id, ...]}
+    Alerts are applied by alert_id and then re-sorted newest first.
+    """
+    old_forecast, new_forecast = old.get("forecast"), new.get("forecast")
+    if old_forecast == new_forecast:
+        forecast: Dict[str, Any] = {}
+    elif old_forecast and new_forecast and old_forecast.keys() == new_forecast.keys() \
+            and old_forecast.get("forecastid") == new_forecast.get("forecastid"):
+        forecast = {"set": {k: v for k, v in new_forecast.items() if old_forecast[k] != v}}
+    else:
+        forecast = {"replace": new_forecast}
+
+    old_alerts = {a["alert_id"]: a for a in old.get("alerts", [])}
+    new_ids = {a["alert_id"] for a in new["alerts"]}
+    return {
+        "forecast": forecast,
+        "alerts": {
+            "upsert": [a for a in new["alerts"] if old_alerts.get(a["alert_id"]) != a],
+            "remove": sorted(set(old_alerts) - new_ids),
+        },
+    }
+
+
+def apply_delta(old: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Reference client: the payload make_delta(old, new) was built to reach."""
+    forecast = old.get("forecast")
+    if "replace" in delta["forecast"]:
+        forecast = delta["forecast"]["replace"]
+    elif "set" in delta["forecast"]:
+        forecast = dict(forecast, **delta["forecast"]["set"])
+
+    alerts = {a["alert_id"]: a for a in old.get("alerts", [])}
+    for alert_id in delta["alerts"]["remove"]:
+        alerts.pop(alert_id, None)
+    for alert in delta["alerts"]["upsert"]:
+        alerts[alert["alert_id"]] = alert
+    ordered = sorted(alerts.values(), key=lambda a: a["alert_id"])
+    ordered.sort(key=lambda a: datetime.fromisoformat(a["published"]), reverse=True)
+    return {"forecast": forecast, "alerts": ordered}
+
+
+def _load_brotli() -> Any:
+    """brotli (or brotlicffi) if installed, else None; the .br files are optional."""
+    for name in ("brotli", "brotlicffi"):
+        try:
+            return __import__(name)
+        except ImportError:
+            continue
+    return None
+
+
+def _stage(path: str, data: bytes) -> _StagedFile:
+    """Write data next to path under a temporary name; _commit() moves it into place."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+    return tmp_path, path
+
+
+def _commit(staged: List[_StagedFile]) -> None:
+    """Rename staged files into place, in order."""
+    for tmp_path, path in staged:
+        os.replace(tmp_path, path)
+
+
+def _stage_encoded(root: str, name: str, body: bytes, staged: List[_StagedFile]) -> Dict[str, Any]:
+    """Stage name, name.gz and (with brotli) name.br under root; returns their sizes."""
+    files = {"path": name, "size": len(body)}
+    staged.append(_stage(os.path.join(root, name), body))
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    staged.append(_stage(os.path.join(root, f"{name}.gz"), gz))
+    files["gzip_size"] = len(gz)
+    brotli = _load_brotli()
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        staged.append(_stage(os.path.join(root, f"{name}.br"), br))
+        files["br_size"] = len(br)
+    return files
+
+
+def load_manifest(root: str) -> Dict[str, Any] | None:
+    """The current manifest.json under root, or None if there is none (or it is unreadable)."""
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def snapshot_name(version: int) -> str:
+    """The snapshot file of version under the snapshot directory (plus .gz / .br)."""
+    return f"snapshot-v{version}.json"
+
+
+def _load_version(root: str, version: int) -> Dict[str, Any] | None:
+    try:
+        with open(os.path.join(root, f"{snapshot_name(version)}.gz"), "rb") as fh:
+            return json.loads(gzip.decompress(fh.read()))
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def _prune(root: str, keep_from: int) -> None:
+    """Drop snapshots and deltas of versions before keep_from (and files of the older layout)."""
+    for sub, prefix, sep in (("", "snapshot-v", "."), ("deltas", "", "-"), ("versions", "v", ".")):
+        directory = os.path.join(root, sub)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if not name.startswith(prefix):
+                continue
+            try:
+                version = int(name[len(prefix):].split(sep, 1)[0])
+            except ValueError:
+                continue
+            if version < keep_from:
+                os.remove(os.path.join(directory, name))
+    for suffix in ("", ".gz", ".br"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(root, f"snapshot.json{suffix}"))
+
+
+def publish_snapshot(
+    db_file: str = DB_FILE,
+    out_dir: str | None = None,
+    keep: int | None = None,
+    now: datetime | None = None,
+) -> Dict[str, Any]:
+    """
+    Build the payload from db_file and, if its hash differs from the
+    published one, write it as the next version with deltas from up to keep
+    (default SNAPSHOT_DELTAS) previous versions. Callers that may overlap
+    must serialise this themselves (run_scrapers holds the "snapshot" lease).
+    Returns {"version", "hash", "changed", "deltas", "size", "gzip_size"}.
+    """
+    root = out_dir or snapshot_dir(db_file)
+    keep = SNAPSHOT_DELTAS if keep is None else keep
+    conn = storage.acquire(db_file)
+    try:
+        payload = build_payload(conn, now, db_file)
+    finally:
+        storage.release(conn)
+    digest = payload_hash(payload)
+
+    manifest = load_manifest(root)
+    if manifest and manifest.get("hash") == digest:
+        return {"version": manifest["version"], "hash": digest, "changed": False,
+                "deltas": len(manifest.get("deltas", {})), "size": manifest["snapshot"]["size"],
+                "gzip_size": manifest["snapshot"]["gzip_size"]}
+
+    version = manifest["version"] + 1 if manifest else 1
+    # Snapshot and deltas go under names no manifest has listed yet; the
+    # manifest is renamed over the live one only once they are all in place
+    deltas, staged = {}, []
+    try:
+        snapshot = _stage_encoded(root, snapshot_name(version), _canonical(payload), staged)
+        for previous in range(max(version - keep, 1), version):
+            old = _load_version(root, previous)
+            if old is None:
+                continue
+            delta = dict(make_delta(old, payload), **{"from": previous, "to": version, "hash": digest})
+            deltas[str(previous)] = _stage_encoded(
+                root, f"deltas/{previous}-to-{version}.json", _canonical(delta), staged)
+        staged.append(_stage(os.path.join(root, MANIFEST_NAME), json.dumps({
+            "version": version,
+            "hash": digest,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "snapshot": snapshot,
+            "deltas": deltas,
+        }, indent=2).encode("utf-8")))
+    except BaseException:
+        for tmp_path, _ in staged:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+        raise
+    _commit(staged)
+    # Only now that the manifest no longer lists them
+    _prune(root, max(version - keep, 1))
+    return {"version": version, "hash": digest, "changed": True, "deltas": len(deltas),
+            "size": snapshot["size"], "gzip_size": snapshot["gzip_size"]}
@@ -0,0 +1,1041 @@
+"""
+SQLite storage layer shared by the TTMS scrapers.
+
+Every connection that writes goes through connect() so both scrapers use WAL
+journaling and the same synchronous / cache settings.
+
+Helpers open connections with acquire() and hand them back with release().
+Normally that is a fresh connection per call; a process can call
+open_shared() once so every helper reuses the same connection instead, and
+with it the connection's cache of compiled (prepared) statements.
+
+The schema is versioned with PRAGMA user_version. ensure_schema() reads that
+one value and only runs DDL when it is behind SCHEMA_VERSION; to change the
+schema, append a step to MIGRATIONS rather than editing an existing one.
+Each step carries its own DDL and data fill as they were at its version,
+never a call into the module that owns the table today, so it does the
+same thing however far behind the database it runs on is.
+Run logging and the summary stats used by both scrapers live here too.
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Sequence, TypeVar
+
+from metrics import record_phases
+from textcodec import (
+    COMPRESS_MIN_BYTES, MIN_TRAIN_SAMPLES, TEXT_COMPRESSION, TRAIN_SAMPLE_BYTES,
+    TextCodec, register as register_text_functions, train_dictionary,
+)
+
+# --- Configuration ---
+DB_FILE = os.environ.get("TTMS_DB_FILE") or os.path.join(
+    os.path.dirname(__file__), "database", "weather_forecasts.db"
+)
+# NORMAL is durable across application crashes in WAL mode; FULL also
+# survives power loss at the cost of an fsync per commit.
+SQLITE_SYNCHRONOUS = os.environ.get("TTMS_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+# Page cache size in KiB (negative cache_size means KiB to SQLite)
+SQLITE_CACHE_SIZE_KIB = int(os.environ.get("TTMS_SQLITE_CACHE_KIB", "16384"))
+# How long a write waits for another process's write lock before failing
+# with "database is locked"; long enough to outlast any one batch commit
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("TTMS_SQLITE_BUSY_TIMEOUT_MS", "30000"))
+# Rows per transaction for the bulk writers
+WRITE_BATCH_SIZE = int(os.environ.get("TTMS_WRITE_BATCH_SIZE", "1000"))
+# Compiled statements kept per connection (sqlite3's cached_statements)
+STATEMENT_CACHE_SIZE = 256
+
+_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+T = TypeVar("T")
+
+# abspath(db_file) -> connection kept open by open_shared()
+_shared: Dict[str, sqlite3.Connection] = {}
+
+
+def apply_pragmas(
+    conn: sqlite3.Connection,
+    synchronous: str | None = None,
+    cache_size_kib: int | None = None,
+) -> None:
+    """Apply busy_timeout, switch the database to WAL and apply synchronous / cache_size."""
+    level = (synchronous or SQLITE_SYNCHRONOUS).upper()
+    if level not in _SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unsupported synchronous level: {level}")
+    kib = SQLITE_CACHE_SIZE_KIB if cache_size_kib is None else int(cache_size_kib)
+
+    # First, so switching to WAL waits out a writer too
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={level}")
+    conn.execute(f"PRAGMA cache_size={-abs(kib)}")
+
+
+def connect(
+    db_file: str,
+    synchronous: str | None = None,
+    cache_size_kib: int | None = None,
+) -> sqlite3.Connection:
+    """
+    Open db_file with the scraper pragmas applied and ttms_text() registered
+    for reads (see textcodec.py), creating its directory first if need be.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+    conn = sqlite3.connect(db_file, cached_statements=STATEMENT_CACHE_SIZE)
+    apply_pragmas(conn, synchronous, cache_size_kib)
+    register_text_functions(conn, db_file)
+    return conn
+
+
+def database_file(conn: sqlite3.Connection) -> str:
+    """The path of the main database conn has open."""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def open_shared(db_file: str) -> sqlite3.Connection:
+    """Open (or return) the long-lived connection that acquire() hands out for db_file."""
+    key = os.path.abspath(db_file)
+    if key not in _shared:
+        _shared[key] = connect(db_file)
+    return _shared[key]
+
+
+def close_shared(db_file: str | None = None) -> None:
+    """Close the shared connection for db_file, or every shared connection."""
+    keys = [os.path.abspath(db_file)] if db_file else list(_shared)
+    for key in keys:
+        conn = _shared.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+
+def acquire(db_file: str) -> sqlite3.Connection:
+    """Return the shared connection for db_file if one is open, else a new one."""
+    return _shared.get(os.path.abspath(db_file)) or connect(db_file)
+
+
+def release(conn: sqlite3.Connection) -> None:
+    """
+    Hand back a connection from acquire(). Private connections are closed;
+    the shared one stays open, minus any transaction the caller left behind.
+    """
+    if conn in _shared.values():
+        if conn.in_transaction:
+            conn.rollback()
+    else:
+        conn.close()
+
+
+def batched(rows: Sequence[T], size: int = WRITE_BATCH_SIZE) -> Iterator[List[T]]:
+    """Yield consecutive slices of rows with at most size elements each."""
+    size = max(int(size), 1)
+    for start in range(0, len(rows), size):
+        yield list(rows[start:start + size])
+
+
+# --- Schema ---
+
+def _ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
+    """Add any of the given columns that an older database is missing."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, col_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+
+def _baseline_schema(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 1: every table as of the switch to versioned migrations. Written
+    to be idempotent, because databases from before then are at version 0
+    but already hold some (or all) of these tables.
+    """
+    # Drop legacy table if it ever existed
+    cursor.execute("DROP TABLE IF EXISTS forecasts")
+
+    # detailed_forecasts mirrors the API's forecast fields
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS detailed_forecasts (
+            forecastid INTEGER PRIMARY KEY,
+            amended TEXT,
+            IssuedAt TEXT,
+            forecastTime TEXT,
+            forecaster TEXT,
+            forecastPeriod TEXT,
+            forecastArea1 TEXT,
+            forecastArea2 TEXT,
+            forecastArea3 TEXT,
+            textArea1 TEXT,
+            textArea2 TEXT,
+            textArea3 TEXT,
+            addMarine TEXT,
+            imageTrin TEXT,
+            imagebago TEXT,
+            seas TEXT,
+            waves1 TEXT,
+            waves2 TEXT,
+            PiarcoMnTemp TEXT,
+            CrownMnTemp TEXT,
+            TmPiarcoMnTemp TEXT,
+            TmCrownMnTemp TEXT,
+            TmWeatherPiarcoMn TEXT,
+            TmWeatherCpMn TEXT,
+            TmPiarcoMxTemp TEXT,
+            TmCrownMxTemp TEXT,
+            TmWeatherPiarcoMx TEXT,
+            TmWeatherCpMx TEXT,
+            outlook1 TEXT,
+            minTrin24look TEXT,
+            maxTrin24look TEXT,
+            minTob24look TEXT,
+            maxTob24look TEXT,
+            outlook2 TEXT,
+            minTrin48look TEXT,
+            maxTrin48look TEXT,
+            minTob48look TEXT,
+            maxTob48look TEXT,
+            outlook24WeatherPiarco TEXT,
+            outlook48WeatherPiarco TEXT,
+            outlook24WeatherCrown TEXT,
+            outlook48WeatherCrown TEXT,
+            PiarcoFcstMxTemp TEXT,
+            CrownFcstMxTemp TEXT,
+            PiarcoActMxTemp TEXT,
+            CrownActMxTemp TEXT,
+            PiarcoFcstMnTemp TEXT,
+            CrownFcstMnTemp TEXT,
+            PiarcoRainfall TEXT,
+            CrownPointRinfall TEXT,
+            cumlativeRain TEXT,
+            cumlativeCpRain TEXT,
+            PiarcoheatIndex TEXT,
+            CPointheatIndex TEXT,
+            sunrise TEXT,
+            sunset TEXT,
+            gustywinds TEXT,
+            gustywinds2 TEXT,
+            tideDate TEXT,
+            tideTime TEXT,
+            tideTime2 TEXT,
+            trinAmHigh TEXT,
+            trinPmHigh TEXT,
+            trinAmLow TEXT,
+            trinPmLow TEXT,
+            tobAmHigh TEXT,
+            tobPmHigh TEXT,
+            tobAmLow TEXT,
+            tobPmLow TEXT,
+            precipitation TEXT,
+            timePeriod TEXT,
+            probrainfall TEXT,
+            uvrate TEXT,
+            jsonObject TEXT,
+            wx24 TEXT,
+            wx24cp TEXT,
+            wx48 TEXT,
+            wx48cp TEXT,
+            synopsis TEXT,
+            TmPiarco TEXT,
+            TmCrown TEXT,
+            insertionDate TEXT
+        )
+    ''')
+
+    # Alerts from the RSS feed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weather_alerts (
+            alert_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            link TEXT,
+            pub_date TEXT,
+            alert_level TEXT,
+            alert_type TEXT,
+            issued_by TEXT,
+            insertion_date TEXT
+        )
+    ''')
+
+    # Analytics table for run logging (shared by scrapers)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scraper_analytics (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_timestamp TEXT NOT NULL,
+            run_type TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT,
+            duration_seconds REAL,
+            records_fetched INTEGER,
+            records_inserted INTEGER,
+            success BOOLEAN,
+            error_message TEXT,
+            api_response_time REAL,
+            total_records_in_db INTEGER,
+            pages_fetched INTEGER,
+            pages_skipped INTEGER,
+            status TEXT
+        )
+    ''')
+    _ensure_columns(cursor, "scraper_analytics", {
+        "pages_fetched": "INTEGER",
+        "pages_skipped": "INTEGER",
+        "status": "TEXT",
+    })
+
+    # Small key/value store for sync bookkeeping (high-water marks etc.)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TEXT
+        )
+    ''')
+
+    # ETag / Last-Modified / body hash per endpoint for conditional GETs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS http_validators (
+            endpoint TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            updated_at TEXT
+        )
+    ''')
+
+    # Typed long-format copy of the numeric forecast fields
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_observations (
+            forecastid INTEGER NOT NULL,
+            station TEXT NOT NULL,
+            variable TEXT NOT NULL,
+            value REAL NOT NULL,
+            issued_at TEXT,
+            PRIMARY KEY (forecastid, station, variable)
+        ) WITHOUT ROWID
+    ''')
+    # Covering index: range scans by station/variable/time read only the index
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_observations_series
+        ON forecast_observations (station, variable, issued_at, value)
+    ''')
+
+    # Per-run phase timings and latency histograms (see metrics.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scraper_run_phases (
+            run_id INTEGER NOT NULL,
+            phase TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            PRIMARY KEY (run_id, phase)
+        )
+    ''')
+    # Cumulative bucket counts (le = upper bound, +Inf included) per run type/phase
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scraper_phase_histogram (
+            run_type TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            le REAL NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_type, phase, le)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scraper_phase_totals (
+            run_type TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            sum_seconds REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (run_type, phase)
+        )
+    ''')
+
+
+# Tables with a row counter in table_stats -> column whose maximum is kept
+STATS_TABLES = {
+    "detailed_forecasts": "insertionDate",
+    "weather_alerts": "pub_date",
+    "scraper_analytics": "run_timestamp",
+}
+
+
+def _table_stats(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 2: table_stats holds a row count and latest value per table,
+    kept current by triggers so stats never need a full scan.
+    """
+    tables = {
+        "detailed_forecasts": "insertionDate",
+        "weather_alerts": "pub_date",
+        "scraper_analytics": "run_timestamp",
+    }
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS table_stats (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            latest TEXT
+        )
+    ''')
+    for table, column in tables.items():
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_stats_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE table_stats SET
+                    row_count = row_count + 1,
+                    latest = CASE WHEN NEW.{column} > latest OR latest IS NULL
+                                  THEN NEW.{column} ELSE latest END
+                WHERE table_name = '{table}';
+            END
+        ''')
+        # Only re-scan for the maximum when the current maximum goes away
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_stats_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE table_stats SET
+                    row_count = row_count - 1,
+                    latest = CASE WHEN OLD.{column} = latest
+                                  THEN (SELECT MAX({column}) FROM {table}) ELSE latest END
+                WHERE table_name = '{table}';
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_stats_update AFTER UPDATE OF {column} ON {table}
+            WHEN NEW.{column} IS NOT OLD.{column}
+            BEGIN
+                UPDATE table_stats SET
+                    latest = CASE WHEN NEW.{column} > latest OR latest IS NULL THEN NEW.{column}
+                                  WHEN OLD.{column} = latest THEN (SELECT MAX({column}) FROM {table})
+                                  ELSE latest END
+                WHERE table_name = '{table}';
+            END
+        ''')
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO table_stats (table_name, row_count, latest)
+            SELECT ?, COUNT(*), MAX({column}) FROM {table}
+        ''', (table,))
+
+
+def rebuild_table_stats(cursor: sqlite3.Cursor) -> None:
+    """Recount every STATS_TABLES table from scratch (full scans; caller commits)."""
+    for table, column in STATS_TABLES.items():
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO table_stats (table_name, row_count, latest)
+            SELECT ?, COUNT(*), MAX({column}) FROM {table}
+        ''', (table,))
+
+
+def _full_text_search(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 3: FTS5 indexes over forecast text and alerts (see search.py):
+    forecast_fts an external-content index over detailed_forecasts, alert_fts
+    with its own copy, both kept in step by triggers and filled from the
+    existing rows.
+    """
+    text_columns = ['textArea1', 'textArea2', 'textArea3', 'synopsis', 'outlook1', 'outlook2']
+    columns = ', '.join(text_columns)
+    new_values = ', '.join(f"NEW.{c}" for c in text_columns)
+    old_values = ', '.join(f"OLD.{c}" for c in text_columns)
+    tokenize = "porter unicode61 remove_diacritics 2"
+
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS forecast_fts USING fts5(
+            {columns},
+            content='detailed_forecasts', content_rowid='forecastid',
+            tokenize='{tokenize}'
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS forecast_fts_insert AFTER INSERT ON detailed_forecasts
+        BEGIN
+            INSERT INTO forecast_fts (rowid, {columns}) VALUES (NEW.forecastid, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS forecast_fts_delete AFTER DELETE ON detailed_forecasts
+        BEGIN
+            INSERT INTO forecast_fts (forecast_fts, rowid, {columns})
+            VALUES ('delete', OLD.forecastid, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS forecast_fts_update AFTER UPDATE OF {columns} ON detailed_forecasts
+        BEGIN
+            INSERT INTO forecast_fts (forecast_fts, rowid, {columns})
+            VALUES ('delete', OLD.forecastid, {old_values});
+            INSERT INTO forecast_fts (rowid, {columns}) VALUES (NEW.forecastid, {new_values});
+        END
+    ''')
+    cursor.execute("INSERT INTO forecast_fts (forecast_fts) VALUES ('rebuild')")
+
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS alert_fts USING fts5(
+            alert_id UNINDEXED, title, description,
+            tokenize='{tokenize}'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS alert_fts_insert AFTER INSERT ON weather_alerts
+        BEGIN
+            INSERT INTO alert_fts (alert_id, title, description)
+            VALUES (NEW.alert_id, NEW.title, NEW.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS alert_fts_delete AFTER DELETE ON weather_alerts
+        BEGIN
+            DELETE FROM alert_fts WHERE alert_id = OLD.alert_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS alert_fts_update AFTER UPDATE OF title, description ON weather_alerts
+        BEGIN
+            UPDATE alert_fts SET title = NEW.title, description = NEW.description
+            WHERE alert_id = OLD.alert_id;
+        END
+    ''')
+    cursor.execute("DELETE FROM alert_fts")
+    cursor.execute("INSERT INTO alert_fts (alert_id, title, description) SELECT alert_id, title, description FROM weather_alerts")
+
+
+def _forecast_revisions(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 4: detailed_forecasts.content_hash and forecast_revisions (see
+    revisions.py). Existing rows get their hash the next time they are seen.
+    """
+    _ensure_columns(cursor, "detailed_forecasts", {"content_hash": "TEXT"})
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_revisions (
+            forecastid INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            previous_hash TEXT,
+            seen_at TEXT NOT NULL,
+            changes TEXT NOT NULL,
+            PRIMARY KEY (forecastid, content_hash)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_revisions_seen_at
+        ON forecast_revisions (seen_at, forecastid)
+    ''')
+
+
+def _daily_rollups(cursor: sqlite3.Cursor) -> None:
+    """Version 5: daily_rollups (see rollups.py), filled from existing observations."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT NOT NULL,
+            station TEXT NOT NULL,
+            min_temp REAL, max_temp REAL, rainfall REAL, cumulative_rainfall REAL,
+            reports INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, station)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("DELETE FROM daily_rollups")
+    cursor.execute('''
+        INSERT INTO daily_rollups (day, station, min_temp, max_temp, rainfall, cumulative_rainfall, reports)
+        SELECT substr(issued_at, 1, 10), station,
+               MIN(CASE WHEN variable = 'min_temp' THEN value END),
+               MAX(CASE WHEN variable = 'actual_max_temp' THEN value END),
+               MAX(CASE WHEN variable = 'rainfall' THEN value END),
+               MAX(CASE WHEN variable = 'cumulative_rainfall' THEN value END),
+               COUNT(DISTINCT forecastid)
+        FROM forecast_observations
+        WHERE station IN ('piarco', 'crown_point')
+          AND variable IN ('min_temp', 'actual_max_temp', 'rainfall', 'cumulative_rainfall')
+          AND issued_at IS NOT NULL
+        GROUP BY 1, station
+    ''')
+
+
+def _circuit_breakers(cursor: sqlite3.Cursor) -> None:
+    """Version 6: circuit_breakers, per-endpoint breaker state (see resilience.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS circuit_breakers (
+            endpoint TEXT PRIMARY KEY,
+            failures INTEGER NOT NULL DEFAULT 0,
+            open_until TEXT,
+            last_error TEXT,
+            updated_at TEXT
+        )
+    ''')
+
+
+def _run_leases(cursor: sqlite3.Cursor) -> None:
+    """Version 7: run_leases, one lease per run type (see leases.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS run_leases (
+            run_type TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            acquired_at TEXT NOT NULL,
+            heartbeat_at TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+    ''')
+
+
+def _analytics_rollups(cursor: sqlite3.Cursor) -> None:
+    """Version 8: analytics_rollups, where old scraper_analytics rows go (see retention.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics_rollups (
+            granularity TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            run_type TEXT NOT NULL,
+            runs INTEGER NOT NULL,
+            successes INTEGER NOT NULL,
+            success_rate REAL,
+            duration_sum REAL,
+            duration_p50 REAL,
+            duration_p95 REAL,
+            records_fetched INTEGER,
+            records_inserted INTEGER,
+            PRIMARY KEY (granularity, period_start, run_type)
+        )
+    ''')
+
+
+def _migration_codec(cursor: sqlite3.Cursor) -> TextCodec:
+    """
+    A TextCodec that also knows the dictionaries this migration stored and
+    has not committed yet. Deliberately not the shared codec(), which must
+    never encode with a dictionary a rollback could take back.
+    """
+    text_codec = TextCodec(database_file(cursor.connection))
+    text_codec.refresh(cursor.connection)
+    return text_codec
+
+
+def _text_compression(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 9: text_dictionaries, the trained zlib dictionaries for the
+    compressed prose columns (see textcodec.py), and the existing values of
+    those columns compressed in place, batch by batch, with a dictionary
+    trained on them when there are enough to learn from.
+    """
+    columns = {
+        "detailed_forecasts": ("textArea1", "textArea2", "textArea3", "synopsis", "jsonObject"),
+        "weather_alerts": ("description",),
+    }
+    batch_size = 500
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_dictionaries (
+            dict_id INTEGER PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            sample_rows INTEGER,
+            data BLOB NOT NULL
+        )
+    ''')
+    if not TEXT_COMPRESSION:
+        return
+    conn = cursor.connection
+    text_codec = _migration_codec(cursor)
+
+    # Newest text first, the budget split evenly between the tables
+    samples: List[bytes] = []
+    for table, names in columns.items():
+        used = 0
+        for row in conn.execute(f"SELECT {', '.join(names)} FROM {table} ORDER BY rowid DESC"):
+            for value in row:
+                if isinstance(value, str) and len(value) >= COMPRESS_MIN_BYTES:
+                    samples.append(value.encode("utf-8"))
+                    used += len(samples[-1])
+            if used >= TRAIN_SAMPLE_BYTES // len(columns):
+                break
+    if len(samples) >= MIN_TRAIN_SAMPLES:
+        data = train_dictionary(samples)
+        cursor.execute(
+            "INSERT INTO text_dictionaries (created_at, sample_rows, data) VALUES (?, ?, ?)",
+            (datetime.now(timezone.utc).isoformat(), len(samples), data),
+        )
+        text_codec.add_dictionary(cursor.lastrowid, data)
+
+    for table, names in columns.items():
+        assignments = ", ".join(f"{c} = ?" for c in names)
+        positions = range(len(names))
+        last = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, {', '.join(names)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            updates = []
+            for row in rows:
+                encoded = text_codec.encode_row(row[1:], positions)
+                if encoded != row[1:]:
+                    updates.append(encoded + row[:1])
+            cursor.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates)
+
+
+def _forecast_conditions(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 10: forecast_conditions, the parsed marine and rain-chance fields
+    (see conditions.py). Existing forecasts are parsed by
+    `run_scrapers.py backfill-conditions`.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_conditions (
+            forecastid INTEGER PRIMARY KEY,
+            seas_min INTEGER,
+            seas_max INTEGER,
+            waves1_min REAL,
+            waves1_max REAL,
+            waves1_qualifier TEXT,
+            waves1_peak REAL,
+            waves1_peak_area TEXT,
+            waves2_min REAL,
+            waves2_max REAL,
+            waves2_qualifier TEXT,
+            waves2_peak REAL,
+            waves2_peak_area TEXT,
+            rain_probability REAL,
+            chance_level TEXT,
+            chance_min REAL,
+            chance_max REAL,
+            chance_of TEXT
+        )
+    ''')
+
+
+def _plain_search_index(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 11: the search indexes rebuilt to hold their own plain text,
+    written by the scrapers, with only delete triggers, none of which calls
+    ttms_text(), so the schema works on any connection (see search.py).
+    They are refilled from every stored row, decoded here.
+    """
+    columns = ['textArea1', 'textArea2', 'textArea3', 'synopsis', 'outlook1', 'outlook2']
+    tokenize = "porter unicode61 remove_diacritics 2"
+    batch_size = 1000
+    for trigger in ('forecast_fts_insert', 'forecast_fts_delete', 'forecast_fts_update',
+                    'alert_fts_insert', 'alert_fts_delete', 'alert_fts_update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS forecast_fts")
+    cursor.execute("DROP TABLE IF EXISTS alert_fts")
+    cursor.execute("DROP VIEW IF EXISTS forecast_text")
+
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE forecast_fts USING fts5(
+            {', '.join(columns)},
+            tokenize='{tokenize}'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER forecast_fts_delete AFTER DELETE ON detailed_forecasts
+        BEGIN
+            DELETE FROM forecast_fts WHERE rowid = OLD.forecastid;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE alert_fts USING fts5(
+            alert_id UNINDEXED, title, description,
+            tokenize='{tokenize}'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER alert_fts_delete AFTER DELETE ON weather_alerts
+        BEGIN
+            DELETE FROM alert_fts WHERE alert_id = OLD.alert_id;
+        END
+    ''')
+
+    conn = cursor.connection
+    text_codec = _migration_codec(cursor)
+    reader = conn.execute(f"SELECT forecastid, {', '.join(columns)} FROM detailed_forecasts")
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
+        cursor.executemany(
+            f"INSERT INTO forecast_fts (rowid, {', '.join(columns)}) "
+            f"VALUES ({', '.join(['?'] * (len(columns) + 1))})",
+            [tuple(map(text_codec.decode, row)) for row in rows],
+        )
+    reader = conn.execute("SELECT alert_id, title, description FROM weather_alerts")
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
+        cursor.executemany(
+            "INSERT INTO alert_fts (alert_id, title, description) VALUES (?, ?, ?)",
+            [(a, t, text_codec.decode(d)) for a, t, d in rows],
+        )
+
+
+def _condition_ranges(cursor: sqlite3.Cursor) -> None:
+    """
+    Version 12: forecast_conditions keeps a second wave range with its own
+    qualifier and area instead of a "peak" (see conditions.py). The table is
+    recreated and refilled from the stored forecasts. The parsing is the
+    parser's, not part of the schema: a later parser change is applied with
+    `run_scrapers.py backfill-conditions --reparse`, not by a migration.
+    """
+    # Imported here: conditions imports storage itself
+    from conditions import CONDITION_COLUMNS, extract_conditions
+
+    columns = [
+        'forecastid', 'seas_min', 'seas_max',
+        'waves1_min', 'waves1_max', 'waves1_qualifier', 'waves1_area',
+        'waves1_second_min', 'waves1_second_max', 'waves1_second_qualifier', 'waves1_second_area',
+        'waves2_min', 'waves2_max', 'waves2_qualifier', 'waves2_area',
+        'waves2_second_min', 'waves2_second_max', 'waves2_second_qualifier', 'waves2_second_area',
+        'rain_probability', 'chance_level', 'chance_min', 'chance_max', 'chance_of',
+    ]
+    source = ['forecastid', 'seas', 'waves1', 'waves2', 'probrainfall', 'textArea1']
+    batch_size = 2000
+    cursor.execute("DROP TABLE IF EXISTS forecast_conditions")
+    cursor.execute('''
+        CREATE TABLE forecast_conditions (
+            forecastid INTEGER PRIMARY KEY,
+            seas_min INTEGER,
+            seas_max INTEGER,
+            waves1_min REAL,
+            waves1_max REAL,
+            waves1_qualifier TEXT,
+            waves1_area TEXT,
+            waves1_second_min REAL,
+            waves1_second_max REAL,
+            waves1_second_qualifier TEXT,
+            waves1_second_area TEXT,
+            waves2_min REAL,
+            waves2_max REAL,
+            waves2_qualifier TEXT,
+            waves2_area TEXT,
+            waves2_second_min REAL,
+            waves2_second_max REAL,
+            waves2_second_qualifier TEXT,
+            waves2_second_area TEXT,
+            rain_probability REAL,
+            chance_level TEXT,
+            chance_min REAL,
+            chance_max REAL,
+            chance_of TEXT
+        )
+    ''')
+
+    conn = cursor.connection
+    text_codec = _migration_codec(cursor)
+    insert_sql = (
+        f"INSERT INTO forecast_conditions ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['?'] * len(columns))})"
+    )
+    reader = conn.execute(f"SELECT {', '.join(source)} FROM detailed_forecasts")
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
+        parsed = [extract_conditions(dict(zip(source, map(text_codec.decode, row)))) for row in rows]
+        cursor.executemany(insert_sql, [
+            tuple(values[c] for c in columns)
+            for values in (dict(zip(CONDITION_COLUMNS, row)) for row in parsed if row is not None)
+        ])
+
+
+# MIGRATIONS[n - 1] takes a database from user_version n - 1 to n
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _baseline_schema,
+    _table_stats,
+    _full_text_search,
+    _forecast_revisions,
+    _daily_rollups,
+    _circuit_breakers,
+    _run_leases,
+    _analytics_rollups,
+    _text_compression,
+    _forecast_conditions,
+    _plain_search_index,
+    _condition_ranges,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply any pending MIGRATIONS in one transaction. Returns the version the
+    database was at before. A no-op (one PRAGMA read) when already current.
+    """
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+    # IMMEDIATE takes the write lock up front so two processes starting
+    # together cannot both migrate; re-read the version once we hold it.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = schema_version(conn)
+        cursor = conn.cursor()
+        for step in MIGRATIONS[version:]:
+            step(cursor)
+        conn.execute(f"PRAGMA user_version = {max(version, SCHEMA_VERSION)}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return version
+
+
+def ensure_schema(db_file: str = DB_FILE) -> None:
+    """Create or upgrade the database at db_file to SCHEMA_VERSION."""
+    conn = None
+    try:
+        conn = acquire(db_file)
+        previous = migrate(conn)
+        if previous < SCHEMA_VERSION:
+            print(f"Database '{db_file}' migrated from schema version {previous} to {SCHEMA_VERSION}.")
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+    finally:
+        if conn:
+            release(conn)
+
+
+# --- Run logging and stats ---
+
+# Table whose size is recorded with each run, by run_type
+RUN_TYPE_TABLES = {
+    "forecasts": "detailed_forecasts",
+    "rss_alerts": "weather_alerts",
+}
+
+_RUN_INSERT_SQL = '''
+    INSERT INTO scraper_analytics (
+        run_timestamp, run_type, start_time, end_time, duration_seconds,
+        records_fetched, records_inserted, success, error_message,
+        api_response_time, total_records_in_db,
+        pages_fetched, pages_skipped, status
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def log_scraper_run(
+    db_file: str,
+    run_type: str,
+    start_time: datetime,
+    end_time: datetime,
+    records_fetched: int,
+    records_inserted: int,
+    success: bool,
+    error_message: str | None = None,
+    api_response_time: float | None = None,
+    pages_fetched: int | None = None,
+    pages_skipped: int | None = None,
+    status: str | None = None,
+    phases: Dict[str, float] | None = None,
+) -> None:
+    """
+    Log a scraper run to the analytics table. phases maps phase name to
+    seconds (see metrics.py); when given, api_response_time defaults to
+    the connect + transfer total.
+    """
+    conn = None
+    try:
+        conn = acquire(db_file)
+        cursor = conn.cursor()
+
+        duration = (end_time - start_time).total_seconds()
+        if api_response_time is None and phases:
+            api_response_time = phases.get("connect", 0.0) + phases.get("transfer", 0.0)
+
+        cursor.execute(
+            "SELECT row_count FROM table_stats WHERE table_name = ?", (RUN_TYPE_TABLES.get(run_type),)
+        )
+        row = cursor.fetchone()
+        total_records = row[0] if row else None
+
+        cursor.execute(_RUN_INSERT_SQL, (
+            datetime.now(timezone.utc).isoformat(),
+            run_type,
+            start_time.isoformat(),
+            end_time.isoformat(),
+            duration,
+            records_fetched,
+            records_inserted,
+            success,
+            error_message,
+            api_response_time,
+            total_records,
+            pages_fetched,
+            pages_skipped,
+            status,
+        ))
+        if phases:
+            record_phases(cursor, cursor.lastrowid, run_type, phases)
+
+        conn.commit()
+        print(f"Logged scraper run analytics for {run_type}")
+    except sqlite3.Error as e:
+        print(f"Error logging scraper run: {e}")
+    finally:
+        if conn:
+            release(conn)
+
+
+def get_database_stats(db_file: str = DB_FILE) -> Dict[str, Any]:
+    """
+    Return high-level stats about the forecasts, alerts and runs stored.
+    Counts come from table_stats, so this costs the same at any DB size.
+    """
+    conn = None
+    try:
+        conn = acquire(db_file)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT table_name, row_count, latest FROM table_stats")
+        counters = {name: (count, latest) for name, count, latest in cursor.fetchall()}
+        forecasts_count, latest_forecast = counters.get("detailed_forecasts", (0, None))
+        alerts_count, latest_alert = counters.get("weather_alerts", (0, None))
+        run_count = counters.get("scraper_analytics", (0, None))[0]
+
+        cursor.execute(
+            "SELECT run_type, run_timestamp, success FROM scraper_analytics ORDER BY run_id DESC LIMIT 1"
+        )
+        last_run = cursor.fetchone()
+
+        return {
+            "total_forecasts": forecasts_count,
+            "latest_forecast_date": latest_forecast,
+            "total_alerts": alerts_count,
+            "latest_alert_date": latest_alert,
+            "total_runs": run_count,
+            "last_run": {
+                "type": last_run[0] if last_run else None,
+                "timestamp": last_run[1] if last_run else None,
+                "success": last_run[2] if last_run else None,
+            },
+        }
+    except sqlite3.Error as e:
+        print(f"Error getting database stats: {e}")
+        return {}
+    finally:
+        if conn:
+            release(conn)
+
+
+def check_table_stats(db_file: str = DB_FILE, repair: bool = True) -> Dict[str, Any]:
+    """
+    Compare table_stats with real COUNT(*) / MAX() values (full scans).
+    Returns {table: {"stored": (count, latest), "actual": (count, latest)}}
+    for every table that drifted, and rebuilds the counters if repair is set.
+    """
+    conn = None
+    try:
+        conn = acquire(db_file)
+        stored = {
+            name: (count, latest)
+            for name, count, latest in conn.execute("SELECT table_name, row_count, latest FROM table_stats")
+        }
+        drift = {}
+        for table, column in STATS_TABLES.items():
+            actual = tuple(conn.execute(f"SELECT COUNT(*), MAX({column}) FROM {table}").fetchone())
+            if stored.get(table) != actual:
+                drift[table] = {"stored": stored.get(table), "actual": actual}
+        if drift and repair:
+            with conn:
+                rebuild_table_stats(conn.cursor())
+        return drift
+    finally:
+        if conn:
+            release(conn)
@@ -0,0 +1,77 @@
+"""
+Shared fixtures: a throwaway database the scrapers write to, and the local
+stand-in server (benchmarks/standin_server.py) with fast retries.
+
+Run from python-scraper/: python -m pytest tests
+"""
+
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+import resilience  # noqa: E402
+import storage  # noqa: E402
+import ttms_rss_scraper  # noqa: E402
+import ttms_scraper  # noqa: E402
+from standin_server import Faults, StandinData, make_server, start_in_thread  # noqa: E402
+
+SAMPLE_PAGE = os.path.join(HERE, "..", "forecast_page_1.json")
+
+
+@pytest.fixture(scope="session")
+def template() -> dict:
+    """The first item of forecast_page_1.json, as the API sends it."""
+    with open(SAMPLE_PAGE, encoding="utf-8") as fh:
+        return json.load(fh)["items"][0]
+
+
+@pytest.fixture(scope="session")
+def make_forecast(template):
+    """make_forecast(forecast_id, **changes): a copy of template with that id and those fields."""
+    def make(forecast_id: int, **changes) -> dict:
+        item = copy.copy(template)
+        item["forecastid"] = forecast_id
+        item.update(changes)
+        return item
+    return make
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch) -> str:
+    """A migrated database in tmp_path that both scrapers write to."""
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(ttms_scraper, "DB_FILE", path)
+    monkeypatch.setattr(ttms_rss_scraper, "DB_FILE", path)
+    storage.ensure_schema(path)
+    yield path
+    storage.close_shared(path)
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """
+    A stand-in server with 100 forecasts (20 a page) and 40 alerts, no
+    faults yet, the scrapers (and, through the environment, any
+    run_scrapers.py they start) pointed at it and retry backoff and breaker
+    cooldown shortened. Yields its handler class: .data, .faults, .requests.
+    """
+    server = make_server(StandinData(100, 20, 40), faults=Faults(seed=1))
+    env = start_in_thread(server)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(ttms_scraper, "API_BASE_URL", env["TTMS_API_BASE_URL"])
+    monkeypatch.setattr(ttms_rss_scraper, "RSS_FEED_URL", env["TTMS_RSS_FEED_URL"])
+    monkeypatch.setattr(resilience, "RETRY_BASE_DELAY", 0.005)
+    monkeypatch.setattr(resilience, "BREAKER_COOLDOWN", 0.5)
+    try:
+        yield server.RequestHandlerClass
+    finally:
+        server.shutdown()
+        server.server_close()
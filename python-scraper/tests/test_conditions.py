@@ -0,0 +1,64 @@
+"""
+Marine and rain-chance parsing, and the forecast_conditions rows written at
+insert time and by backfill-conditions.
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+import conditions
+import ttms_scraper
+
+CHANCE = "There is also the medium (40% - 60%) chance of isolated thunderstorm activity, favoring western areas."
+KNOWN = [
+    (conditions.parse_waves, " 1.2m to 1.5m, Near 2.0m (Leewards)   ",
+     ((1.2, 1.5, None, None), (2.0, 2.0, "near", "leewards"))),
+    (conditions.parse_waves, " 1.0m to 1.5m in open waters and below 1.0m in sheltered areas ",
+     ((1.0, 1.5, None, "open waters"), (None, 1.0, "below", "sheltered areas"))),
+    (conditions.parse_waves, " Below 1.0m, occasionally choppy near showers ",
+     ((None, 1.0, "below", None), (None, None, None, None))),
+    (conditions.parse_waves, " 1.5 to 2.0 metres ", ((1.5, 2.0, None, None), (None, None, None, None))),
+    (conditions.parse_waves, " Below 1 metre in sheltered areas ",
+     ((None, 1.0, "below", "sheltered areas"), (None, None, None, None))),
+    (conditions.parse_waves, " 1.0 meters to 1.5 meters ", ((1.0, 1.5, None, None), (None, None, None, None))),
+    (conditions.parse_seas, " Slight to Moderate ", (3, 4)),
+    (conditions.parse_probability, "40", 40.0),
+    (conditions.parse_chance, CHANCE, ("medium", 40.0, 60.0, "isolated thunderstorm activity")),
+]
+SEAS = [" Slight to Moderate ", " Moderate ", " Moderate to Rough ", " Slight "]
+WAVES = [" 1.0m to 1.5m ", " Near 2.0m in open waters ", " 1.5 to 2.0 metres ", " Below 0.5m ", " Above 2.5m "]
+CHANCES = [CHANCE, "There is a low (10% - 30%) chance of showers.", ""]
+
+
+@pytest.mark.parametrize("parse, text, expected", KNOWN, ids=[f"{p.__name__}:{t.strip()[:24]}" for p, t, _ in KNOWN])
+def test_known_parses(parse, text, expected):
+    assert parse(text) == expected
+
+
+def all_conditions(db_file: str) -> list:
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT * FROM forecast_conditions ORDER BY forecastid").fetchall()
+    finally:
+        conn.close()
+
+
+def test_backfill_matches_insert_time(db_file, make_forecast):
+    rng = random.Random(5)
+    forecasts = [make_forecast(i, seas=rng.choice(SEAS), waves1=rng.choice(WAVES), waves2=rng.choice(WAVES),
+                               probrainfall=str(rng.choice([10, 40, 70])),
+                               textArea1="Partly cloudy. " + rng.choice(CHANCES))
+                 for i in range(1, 201)]
+    ttms_scraper.bulk_save_forecasts(forecasts)
+    at_insert = all_conditions(db_file)
+    assert at_insert == [conditions.extract_conditions(f) for f in forecasts]
+
+    for workers in (1, 2):
+        conn = sqlite3.connect(db_file)
+        with conn:
+            conn.execute("DELETE FROM forecast_conditions")
+        conn.close()
+        conditions.backfill_conditions(db_file, workers=workers, chunk_size=50)
+        assert all_conditions(db_file) == at_insert
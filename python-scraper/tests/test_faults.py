@@ -0,0 +1,98 @@
+"""
+Forecast sync and RSS fetch against the stand-in server with faults
+injected: retries ride out 5xx and truncated bodies, an interrupted sync
+resumes where it stopped, and the circuit breaker opens and closes.
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+import resilience
+import ttms_rss_scraper
+import ttms_scraper
+from standin_server import StandinData
+
+
+def count(db_file: str, table: str) -> int:
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("fault", ["error_rate", "truncate_rate"])
+def test_sync_rides_out_faults(db_file, standin, fault):
+    setattr(standin.faults, fault, 0.2)
+    result = ttms_scraper.sync_forecasts()
+    assert standin.faults.injected
+    assert result["complete"]
+    assert count(db_file, "detailed_forecasts") == standin.data.forecasts
+
+
+def test_rss_rides_out_faults(db_file, standin):
+    standin.faults.error_rate = standin.faults.truncate_rate = 0.15
+    for _ in range(10):
+        standin.data.rss_feed.cache_clear()  # a new body each time, so nothing comes back 304
+        alerts = ttms_rss_scraper.fetch_rss_alerts({})
+        assert len(alerts) == standin.data.rss_items
+    assert standin.faults.injected
+
+
+def test_resume_after_failed_page(db_file, standin):
+    # Enough pages that the shifted head stops short of the failed page
+    data = standin.data = StandinData(200, 20, 40)
+    standin.faults.down_pages = {7}
+    first = ttms_scraper.sync_forecasts()
+    assert not first["complete"]
+    assert resilience.load_checkpoint(db_file, ttms_scraper.RESUME_CHECKPOINT)["page"] == 7
+    stored = count(db_file, "detailed_forecasts")
+    assert stored == 6 * data.per_page
+
+    # Recovered, and new forecasts have pushed every page down
+    standin.faults.down_pages = set()
+    before = [data.forecast(i) for i in range(1, data.forecasts + 1)]
+    data.publish(2 * data.per_page + 5)
+    assert [data.forecast(i) for i in range(1, len(before) + 1)] == before
+    seen = len(standin.requests)
+    second = ttms_scraper.sync_forecasts()
+
+    pages = sorted({int(path.rsplit("=", 1)[1]) for path, _ in standin.requests[seen:] if "page=" in path})
+    head_end = 1 + -(-(2 * data.per_page + 5) // data.per_page)
+    assert pages == [1] + list(range(2, head_end + 1)) + list(range(7, data.page_count + 1))
+    assert second["complete"]
+    assert second["new"] == data.forecasts - stored
+    assert second["updated"] == 0
+    assert count(db_file, "forecast_revisions") == 0
+    assert count(db_file, "detailed_forecasts") == data.forecasts
+    assert resilience.load_checkpoint(db_file, ttms_scraper.RESUME_CHECKPOINT) is None
+    assert ttms_scraper.get_high_water_mark() == data.forecasts
+
+
+def test_circuit_breaker(db_file, standin):
+    standin.faults.down = True
+    failed = [ttms_scraper.sync_forecasts() for _ in range(resilience.BREAKER_THRESHOLD)]
+    assert not any(result["complete"] for result in failed)
+
+    seen = len(standin.requests)
+    skipped = ttms_scraper.sync_forecasts()
+    assert skipped.get("circuit_open")
+    assert len(standin.requests) == seen
+    assert count(db_file, "detailed_forecasts") == 0
+
+    time.sleep(resilience.BREAKER_COOLDOWN + 0.1)
+    standin.faults.down = False
+    trial = ttms_scraper.sync_forecasts()
+    assert trial["complete"]
+    assert trial["new"] == standin.data.forecasts
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("SELECT failures FROM circuit_breakers").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+    after = ttms_scraper.sync_forecasts()
+    assert after["complete"] and not after.get("circuit_open")
+    assert after["new"] == after["updated"] == 0
@@ -0,0 +1,111 @@
+"""
+Run leases: one holder at a time, a lost lease stops the writes, and
+overlapping run_scrapers.py processes neither collide nor double up.
+"""
+
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import leases
+import resilience
+import ttms_scraper
+from standin_server import StandinData
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "run_scrapers.py")
+
+
+def launch(args: list, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, SCRIPT] + args, env=env, text=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+def finish(procs: list) -> list:
+    """(returncode, output) per process, once all have exited."""
+    outputs = [p.communicate(timeout=120)[0] for p in procs]
+    return [(p.returncode, out) for p, out in zip(procs, outputs)]
+
+
+def query(db_file: str, sql: str) -> list:
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def forecast_runs(db_file: str) -> int:
+    return query(db_file, "SELECT COUNT(*) FROM scraper_analytics WHERE run_type = 'forecasts' AND success")[0][0]
+
+
+def test_one_holder_at_a_time(db_file):
+    with leases.hold_lease(db_file, "forecasts") as first:
+        assert first is not None and first["waited"] == 0.0
+        assert leases.current_holder(db_file, "forecasts")["owner"] == first["owner"]
+        with leases.hold_lease(db_file, "forecasts", wait=0) as second:
+            assert second is None
+        # Another run type is a separate lease
+        with leases.hold_lease(db_file, "rss_alerts") as other:
+            assert other is not None
+    with leases.hold_lease(db_file, "forecasts") as again:
+        assert again is not None
+
+
+def test_takeover_sets_lost(db_file):
+    assert leases.lease_lost("forecasts") is None
+    with leases.hold_lease(db_file, "forecasts", ttl=0.3) as lease:
+        assert leases.lease_lost("forecasts") is lease["lost"]
+        conn = sqlite3.connect(db_file)
+        with conn:
+            conn.execute("UPDATE run_leases SET owner = 'another run' WHERE run_type = 'forecasts'")
+        conn.close()
+        assert lease["lost"].wait(2)
+    assert leases.lease_lost("forecasts") is None
+    # Releasing a lease it no longer owns leaves the new holder's alone
+    assert leases.current_holder(db_file, "forecasts")["owner"] == "another run"
+
+
+def test_sync_stops_when_lease_lost(db_file, standin):
+    lost = threading.Event()
+    result = ttms_scraper.sync_forecasts(lease_lost=lost, max_workers=1, on_page=lambda progress: lost.set())
+    assert not result["complete"]
+    assert "Lost the forecasts lease" in result["error"]
+    assert query(db_file, "SELECT COUNT(*) FROM detailed_forecasts")[0][0] == standin.data.per_page
+    # Neither a checkpoint nor a breaker outcome from a run that no longer holds the lease
+    assert resilience.load_checkpoint(db_file, ttms_scraper.RESUME_CHECKPOINT) is None
+    assert query(db_file, "SELECT COUNT(*) FROM circuit_breakers")[0][0] == 0
+
+
+def test_overlapping_runs(db_file, standin):
+    standin.latency = 0.05
+    env = dict(os.environ, TTMS_DB_FILE=db_file)
+    results = finish([launch(["forecast"], env) for _ in range(3)])
+    assert all(code == 0 for code, _ in results)
+    assert not any("database is locked" in out for _, out in results)
+    assert sum("Skipping forecasts: another run holds its lease" in out for _, out in results) == 2
+    assert forecast_runs(db_file) == 1
+    assert query(db_file, "SELECT COUNT(*) FROM detailed_forecasts")[0][0] == standin.data.forecasts
+
+
+def test_lapsed_lease_taken_over(db_file, standin):
+    # Slow enough that the first run is still fetching when it is killed
+    standin.data = StandinData(1000, 20, 40)
+    standin.latency = 0.2
+    env = dict(os.environ, TTMS_DB_FILE=db_file, TTMS_LEASE_TTL="2")
+    victim = launch(["forecast"], env)
+    time.sleep(1.0)
+    os.kill(victim.pid, signal.SIGKILL)
+    victim.communicate()
+
+    [(code, out)] = finish([launch(["forecast"], env)])
+    assert code == 0
+    assert "another run holds its lease" in out
+    time.sleep(2.5)
+    [(code, out)] = finish([launch(["forecast"], env)])
+    assert code == 0
+    assert forecast_runs(db_file) == 1
+    assert query(db_file, "SELECT COUNT(*) FROM detailed_forecasts")[0][0] == standin.data.forecasts
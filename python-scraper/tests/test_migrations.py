@@ -0,0 +1,149 @@
+"""
+Schema migrations: a database at any earlier version, holding rows written
+the way that version wrote them, ends up at SCHEMA_VERSION with the same
+schema as a fresh one and with its data intact (decoded, searchable, and
+with its conditions parsed).
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+import conditions
+import search
+import storage
+import textcodec
+
+PHRASES = [
+    "Generally fair but slightly hazy conditions despite brief, isolated showers.",
+    "Partly cloudy with periods of light to moderate showers.",
+    "Saharan dust haze will reduce visibility over the islands.",
+    "A tropical wave is expected to bring heavy showers and gusty winds.",
+    "Localized street flooding and landslides are possible in heavy downpours.",
+    "Clear to partly cloudy skies overnight with light winds.",
+]
+WAVES = [" 1.0m to 1.5m ", " 1.5 to 2.0 metres ", " Below 1.0m, occasionally choppy near showers ", " Near 2.0m "]
+
+
+def schema(conn: sqlite3.Connection) -> tuple:
+    """(type, name) of every schema object, and each table's columns."""
+    objects = sorted(conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'").fetchall())
+    columns = {name: [row[1] for row in conn.execute(f"PRAGMA table_info({name})")]
+               for kind, name in objects if kind == "table"}
+    return objects, columns
+
+
+def build_rows(make_forecast) -> tuple:
+    rng = random.Random(9)
+    forecasts = [
+        make_forecast(i, textArea1=" ".join(rng.sample(PHRASES, 3)), textArea2=" ".join(rng.sample(PHRASES, 2)),
+                      waves1=rng.choice(WAVES), probrainfall=str(rng.choice([10, 30, 60])))
+        for i in range(1, 41)
+    ]
+    alerts = [{
+        "alert_id": f"test-{i}",
+        "title": f"Adverse Weather Alert #{i} - Yellow Level",
+        "description": " ".join(rng.sample(PHRASES, 3)),
+        "link": "",
+        "pub_date": "Mon, 01 Sep 2025 12:00:00 +0000",
+        "alert_level": "YELLOW",
+        "alert_type": "ADVERSE_WEATHER",
+        "issued_by": "TTMS",
+        "insertion_date": "2025-09-01",
+    } for i in range(1, 26)]
+    return forecasts, alerts
+
+
+def at_version(db_file: str, version: int, forecasts: list, alerts: list) -> None:
+    """
+    A database at version holding plain forecasts and alerts. Version 0 is a
+    database from before versioned migrations, which already has the tables.
+    """
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        for step in storage.MIGRATIONS[:max(version, 1)]:
+            step(cursor)
+        for table, rows in (("detailed_forecasts", forecasts), ("weather_alerts", alerts)):
+            names = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            names = [n for n in names if n in rows[0]]
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['?'] * len(names))})",
+                [tuple(row[n] for n in names) for row in rows])
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def migrate(db_file: str) -> int:
+    conn = storage.connect(db_file)
+    try:
+        return storage.migrate(conn)
+    finally:
+        conn.close()
+
+
+def test_fresh_database(tmp_path):
+    db_file = str(tmp_path / "fresh.db")
+    assert migrate(db_file) == 0
+    conn = sqlite3.connect(db_file)
+    try:
+        assert storage.schema_version(conn) == storage.SCHEMA_VERSION == 12
+    finally:
+        conn.close()
+    # Already current: nothing to do
+    assert migrate(db_file) == storage.SCHEMA_VERSION
+
+
+@pytest.mark.parametrize("version", [0, 2, 3, 8, 9, 10, 11])
+def test_upgrade_keeps_data(tmp_path, make_forecast, version):
+    forecasts, alerts = build_rows(make_forecast)
+    db_file = str(tmp_path / f"v{version}.db")
+    at_version(db_file, version, forecasts, alerts)
+    assert migrate(db_file) == version
+
+    fresh = str(tmp_path / "fresh.db")
+    migrate(fresh)
+    conn, fresh_conn = sqlite3.connect(db_file), sqlite3.connect(fresh)
+    try:
+        assert storage.schema_version(conn) == storage.SCHEMA_VERSION
+        assert schema(conn) == schema(fresh_conn)
+
+        text_codec = textcodec.codec(db_file)
+        for table, key, rows in (("detailed_forecasts", "forecastid", forecasts),
+                                 ("weather_alerts", "alert_id", alerts)):
+            columns = textcodec.COMPRESSED_COLUMNS[table]
+            stored = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid").fetchall()
+            assert [text_codec.decode_row(row, range(len(columns))) for row in stored] == \
+                [tuple(row.get(c) for c in columns) for row in rows]
+
+        compressed = conn.execute(
+            "SELECT COUNT(*) FROM detailed_forecasts WHERE typeof(textArea1) = 'blob'").fetchone()[0]
+        dictionaries = conn.execute("SELECT COUNT(*) FROM text_dictionaries").fetchone()[0]
+        if version < 9:
+            # Version 9 compressed what was there, with a dictionary trained on it
+            assert compressed == len(forecasts)
+            assert dictionaries == 1
+        else:
+            assert compressed == dictionaries == 0
+
+        assert conn.execute("SELECT * FROM forecast_conditions ORDER BY forecastid").fetchall() == \
+            [conditions.extract_conditions(f) for f in forecasts]
+    finally:
+        conn.close()
+        fresh_conn.close()
+
+    if version < 11:
+        # Version 11 rebuilt the search indexes from the decoded text
+        expected = sorted(f["forecastid"] for f in forecasts
+                          if any("Saharan" in (f.get(c) or "") for c in search.FORECAST_TEXT_COLUMNS))
+        found = sorted(hit["forecastid"] for hit in search.search_forecasts(db_file, "saharan dust", limit=100))
+        assert found == expected
+        expected = sorted(a["alert_id"] for a in alerts if "landslides" in a["description"])
+        found = sorted(hit["alert_id"] for hit in search.search_alerts(db_file, "landslides", limit=100))
+        assert found == expected
+    storage.close_shared(db_file)
@@ -0,0 +1,71 @@
+"""
+Analytics retention: compact() rolls up and deletes old runs without
+losing count of any, and releases the space they took.
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import retention
+import storage
+
+NOW = datetime(2025, 9, 1, 12, 0, tzinfo=timezone.utc)
+DAYS = 60
+
+
+def fill(db_file: str) -> list:
+    """An RSS run every 10 minutes and a forecast run every hour, with phases; returns (stamp, type, duration)."""
+    rng = random.Random(1)
+    rows, phases, runs = [], [], []
+    t = NOW - timedelta(days=DAYS)
+    while t < NOW:
+        kinds = [("rss_alerts", rng.lognormvariate(0, 0.5))]
+        if t.minute < 10:
+            kinds.append(("forecasts", rng.lognormvariate(2, 0.6)))
+        for run_type, duration in kinds:
+            stamp = t.isoformat()
+            rows.append((stamp, run_type, stamp, stamp, duration, 50, rng.randint(0, 3),
+                         rng.random() > 0.03, None, duration / 2, None, None, None, None))
+            runs.append((stamp, run_type, duration))
+            for phase in ("connect", "transfer", "parse", "db_write"):
+                phases.append((len(rows), phase, duration / 4))
+        t += timedelta(minutes=10)
+    conn = storage.connect(db_file)
+    try:
+        with conn:
+            conn.executemany(storage._RUN_INSERT_SQL, rows)
+            conn.executemany("INSERT INTO scraper_run_phases VALUES (?, ?, ?)", phases)
+    finally:
+        conn.close()
+    return runs
+
+
+def count(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_compact(db_file):
+    runs = fill(db_file)
+    result = retention.compact(db_file, retention_days=30, convert=True, now=NOW)
+
+    sample_day = (NOW - timedelta(days=45)).date().isoformat()
+    durations = sorted(d for stamp, run_type, d in runs if stamp[:10] == sample_day and run_type == "rss_alerts")
+    conn = sqlite3.connect(db_file)
+    try:
+        kept = count(conn, "scraper_analytics")
+        assert result["runs"] == len(runs) - kept
+        assert conn.execute("SELECT SUM(runs) FROM analytics_rollups WHERE granularity = 'day'").fetchone()[0] \
+            == result["runs"]
+        assert count(conn, "scraper_run_phases") == 4 * kept
+        # Rolled up by whole days: the day the retention window starts in is kept
+        assert conn.execute("SELECT MIN(run_timestamp) FROM scraper_analytics").fetchone()[0] \
+            >= (NOW - timedelta(days=30)).date().isoformat()
+        p95 = conn.execute(
+            "SELECT duration_p95 FROM analytics_rollups WHERE granularity = 'day' "
+            "AND period_start = ? AND run_type = 'rss_alerts'", (f"{sample_day}T00:00:00+00:00",)).fetchone()[0]
+        assert p95 == retention.percentile(durations, 0.95)
+    finally:
+        conn.close()
+    assert result["mode"] == "full"
+    assert result["file_after"] < result["file_before"]
@@ -0,0 +1,17 @@
+"""
+run_scrapers.py as a fresh checkout runs it.
+"""
+
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "run_scrapers.py")
+
+
+def test_fresh_checkout_creates_database(tmp_path):
+    db_file = tmp_path / "fresh" / "database" / "weather_forecasts.db"
+    proc = subprocess.run([sys.executable, SCRIPT, "check-stats"], env=dict(os.environ, TTMS_DB_FILE=str(db_file)),
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    assert db_file.exists()
@@ -0,0 +1,150 @@
+"""
+App snapshots: every published delta rebuilds the full snapshot, and the
+alerts in it are the ones no later all-clear has ended.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import snapshots
+import storage
+import ttms_rss_scraper
+import ttms_scraper
+
+NOW = datetime(2025, 9, 1, 12, 0, tzinfo=timezone.utc)
+KEEP = 3
+# Real titles, levels and types from the TTMS feed, oldest first and
+# published an hour apart, and the titles still active after the last one
+REAL_SEQUENCES = [
+    ([("Adverse Weather Watch # 1 - Yellow", "YELLOW", "ADVERSE_WEATHER"),
+      ("Adverse Weather Alert #1 - Yellow Level", "YELLOW", "ADVERSE_WEATHER"),
+      ("Cancellation of Adverse Weather Watch #1", "UNKNOWN", "ADVERSE_WEATHER")],
+     ["Adverse Weather Alert #1 - Yellow Level"]),
+    ([("Severe Weather Watch # 1- Yellow Level", "YELLOW", "OTHER"),
+      ("Cancellation  of Severe Weather Watch #1", "UNKNOWN", "DISCONTINUATION")],
+     []),
+    ([("Hazardous Seas Warning #2 - Yellow Level", "YELLOW", "HAZARDOUS_SEAS"),
+      ("Hazardous Seas Warning -Cancellation", "UNKNOWN", "HAZARDOUS_SEAS")],
+     []),
+    ([("Hazardous Seas Warning #3 - Yellow Level", "YELLOW", "HAZARDOUS_SEAS"),
+      ("Hazardous Seas Warning Discontinuation - Green Level", "GREEN", "HAZARDOUS_SEAS")],
+     []),
+    ([("Adverse Weather Alert #2 - Yellow Level", "YELLOW", "ADVERSE_WEATHER"),
+      ("Cancellation of Adverse Weather Alert #1 - Green Level", "GREEN", "ADVERSE_WEATHER")],
+     ["Adverse Weather Alert #2 - Yellow Level"]),
+]
+
+
+def alert(n: int, published: datetime, level: str, alert_type: str, title: str | None = None) -> dict:
+    return {
+        "alert_id": f"test-{n}",
+        "title": title or f"{alert_type.replace('_', ' ').title()} Alert #{n} - {level.title()} Level",
+        "description": f"Test alert {n}. Residents in low-lying areas should remain vigilant.",
+        "link": f"https://example.invalid/alerts/{n}",
+        "pub_date": format_datetime(published),
+        "alert_level": level,
+        "alert_type": alert_type,
+        "issued_by": "TTMS",
+        "insertion_date": published.isoformat(),
+    }
+
+
+def active_titles(db_file: str) -> list:
+    conn = storage.connect(db_file)
+    try:
+        return [a["title"] for a in snapshots.active_alerts(conn, NOW, db_file)]
+    finally:
+        conn.close()
+
+
+def read_snapshot(root: str) -> tuple:
+    """The payload the manifest names, and the bytes of it and of its .gz."""
+    name = snapshots.load_manifest(root)["snapshot"]["path"]
+    with open(os.path.join(root, name), "rb") as fh:
+        body = fh.read()
+    with open(os.path.join(root, name + ".gz"), "rb") as fh:
+        gz = gzip.decompress(fh.read())
+    return json.loads(body), body, gz
+
+
+def test_deltas_rebuild_the_snapshot(db_file, tmp_path, make_forecast):
+    root = str(tmp_path / "snapshots")
+
+    def forecast(n: int, **changes) -> dict:
+        return make_forecast(n, insertionDate=(date(2025, 1, 1) + timedelta(days=n // 2)).isoformat(), **changes)
+
+    ttms_scraper.bulk_save_forecasts([forecast(i) for i in range(1, 21)])
+    ttms_rss_scraper.bulk_save_alerts([alert(i, NOW - timedelta(hours=20 - i), "YELLOW", "FLOOD")
+                                       for i in range(20)])
+    steps = [
+        lambda: None,
+        lambda: ttms_scraper.bulk_save_forecasts([forecast(21)]),
+        lambda: ttms_scraper.bulk_save_forecasts([forecast(21, textArea1="Amended: heavy showers.")]),
+        lambda: ttms_rss_scraper.bulk_save_alerts([alert(20 + i, NOW - timedelta(minutes=5 * i), "ORANGE", "HIGH_WIND")
+                                                   for i in range(3)]),
+        lambda: ttms_rss_scraper.bulk_save_alerts([alert(30, NOW - timedelta(minutes=1), "GREEN", "FLOOD",
+                                                         "Flood Alert Discontinuation - Green Level")]),
+        lambda: ttms_scraper.bulk_save_forecasts([forecast(22)]),
+    ]
+    payloads = {}
+    for step in steps:
+        step()
+        result = snapshots.publish_snapshot(db_file, root, KEEP, now=NOW)
+        assert result["changed"]
+        payload, body, gz = read_snapshot(root)
+        assert gz == body
+        assert snapshots.payload_hash(payload) == result["hash"]
+        payloads[result["version"]] = payload
+
+        manifest = snapshots.load_manifest(root)
+        assert manifest["version"] == result["version"]
+        assert sorted(map(int, manifest["deltas"])) == list(range(max(result["version"] - KEEP, 1), result["version"]))
+        for start, entry in manifest["deltas"].items():
+            with open(os.path.join(root, entry["path"]), encoding="utf-8") as fh:
+                delta = json.load(fh)
+            rebuilt = snapshots.apply_delta(payloads[int(start)], delta)
+            assert rebuilt == payload
+            assert snapshots.payload_hash(rebuilt) == manifest["hash"] == delta["hash"]
+        kept = [n for n in os.listdir(root) if n.startswith("snapshot-v") and n.endswith(".json")]
+        assert len(kept) == min(result["version"], KEEP + 1)
+    assert result["version"] == len(steps)
+
+
+def test_no_change_publishes_no_version(db_file, tmp_path, make_forecast):
+    root = str(tmp_path / "snapshots")
+    ttms_scraper.bulk_save_forecasts([make_forecast(1)])
+    first = snapshots.publish_snapshot(db_file, root, KEEP, now=NOW)
+    again = snapshots.publish_snapshot(db_file, root, KEEP, now=NOW)
+    assert not again["changed"]
+    assert again["version"] == first["version"] == 1
+    assert again["hash"] == first["hash"]
+
+
+@pytest.mark.parametrize("sequence, expected", REAL_SEQUENCES, ids=[s[-1][0] for s, _ in REAL_SEQUENCES])
+def test_real_all_clears(db_file, sequence, expected):
+    ttms_rss_scraper.bulk_save_alerts([
+        alert(i, NOW - timedelta(hours=len(sequence) - i), level, alert_type, title)
+        for i, (title, level, alert_type) in enumerate(sequence)
+    ])
+    assert sorted(active_titles(db_file)) == sorted(expected)
+
+
+def test_unnumbered_all_clear_ends_every_alert_of_its_type(db_file):
+    floods = [alert(i, NOW - timedelta(hours=5 - i), "YELLOW", "FLOOD") for i in range(3)]
+    winds = [alert(10, NOW - timedelta(hours=4), "YELLOW", "HIGH_WIND")]
+    ttms_rss_scraper.bulk_save_alerts(floods + winds)
+    assert len(active_titles(db_file)) == 4
+
+    ttms_rss_scraper.bulk_save_alerts([alert(20, NOW - timedelta(hours=1), "GREEN", "FLOOD",
+                                             "Flood Alert Discontinuation - Green Level")])
+    assert active_titles(db_file) == [winds[0]["title"]]
+
+    # A flood alert issued after the all-clear is in force again
+    later = alert(21, NOW - timedelta(minutes=30), "ORANGE", "FLOOD")
+    ttms_rss_scraper.bulk_save_alerts([later])
+    assert active_titles(db_file) == [later["title"], winds[0]["title"]]
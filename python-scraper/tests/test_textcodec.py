@@ -0,0 +1,114 @@
+"""
+Text column compression: compress_existing() keeps every value and search
+result, and writers pick up a dictionary trained after they started.
+"""
+
+import random
+import sqlite3
+from datetime import datetime, timezone
+
+import search
+import storage
+import textcodec
+import ttms_rss_scraper
+import ttms_scraper
+
+PHRASES = [
+    "Generally fair but slightly hazy conditions despite brief, isolated showers.",
+    "Partly cloudy with periods of light to moderate showers.",
+    "A tropical wave is expected to bring heavy showers and gusty winds.",
+    "Saharan dust haze will reduce visibility over the islands.",
+    "Localized street flooding and landslides are possible in heavy downpours.",
+    "The Intertropical Convergence Zone is producing scattered thunderstorms.",
+]
+QUERIES = ["heavy showers", "saharan dust", "flooding", "thunderstorms"]
+
+
+def history(make_forecast) -> tuple:
+    rng = random.Random(3)
+    forecasts = [make_forecast(i, textArea1=" ".join(rng.sample(PHRASES, 3)), synopsis=" ".join(rng.sample(PHRASES, 2)))
+                 for i in range(1, 61)]
+    alerts = [{
+        "alert_id": f"test-{i}",
+        "title": f"Adverse Weather Alert #{i} - Yellow Level",
+        "description": " ".join(rng.sample(PHRASES, 4)),
+        "link": "",
+        "pub_date": "Mon, 01 Sep 2025 12:00:00 +0000",
+        "alert_level": "YELLOW",
+        "alert_type": "ADVERSE_WEATHER",
+        "issued_by": "TTMS",
+        "insertion_date": "2025-09-01",
+    } for i in range(1, 31)]
+    return forecasts, alerts
+
+
+def all_text(db_file: str) -> list:
+    """Every compressed column of every row, decoded, in rowid order."""
+    conn = sqlite3.connect(db_file)
+    try:
+        values = []
+        for table, columns in textcodec.COMPRESSED_COLUMNS.items():
+            rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+            values.extend(textcodec.codec(db_file).decode_row(row, range(len(columns))) for row in rows)
+        return values
+    finally:
+        conn.close()
+
+
+def searches(db_file: str) -> list:
+    return [[hit["forecastid"] for hit in search.search_forecasts(db_file, q)] for q in QUERIES] + \
+        [[hit["alert_id"] for hit in search.search_alerts(db_file, q)] for q in QUERIES]
+
+
+def test_compress_existing(db_file, make_forecast, monkeypatch):
+    forecasts, alerts = history(make_forecast)
+    monkeypatch.setattr(textcodec, "TEXT_COMPRESSION", False)
+    ttms_scraper.bulk_save_forecasts(forecasts)
+    ttms_rss_scraper.bulk_save_alerts(alerts)
+    plain_text, plain_searches = all_text(db_file), searches(db_file)
+    assert all(any(hits) for hits in plain_searches)
+
+    monkeypatch.setattr(textcodec, "TEXT_COMPRESSION", True)
+    result = textcodec.compress_existing(db_file, batch_size=25)
+    assert result["dictionary"] == 1
+    assert result["updated"] == result["rows"] == len(forecasts) + len(alerts)
+    assert result["bytes_after"] < result["bytes_before"]
+    assert all_text(db_file) == plain_text
+    assert searches(db_file) == plain_searches
+    # Already encoded with the current dictionary: nothing to rewrite
+    assert textcodec.compress_existing(db_file)["updated"] == 0
+
+    item = make_forecast(len(forecasts) + 1, jsonObject=forecasts[-1]["jsonObject"])
+    ttms_scraper.bulk_save_forecasts([item])
+    conn = sqlite3.connect(db_file)
+    try:
+        stored = conn.execute("SELECT jsonObject FROM detailed_forecasts WHERE forecastid = ?",
+                              (item["forecastid"],)).fetchone()[0]
+    finally:
+        conn.close()
+    assert isinstance(stored, bytes)
+    assert int.from_bytes(stored[1:3], "big") == result["dictionary"]
+    assert textcodec.codec(db_file).decode(stored) == item["jsonObject"]
+
+
+def test_writer_picks_up_new_dictionary(db_file, make_forecast):
+    forecasts, _ = history(make_forecast)
+    ttms_scraper.bulk_save_forecasts(forecasts[:1])
+    assert textcodec.codec(db_file).current_id == 0
+
+    # Trained by another process: this one's shared codec has not seen it
+    samples = [f[c].encode("utf-8") for f in forecasts for c in ("textArea1", "synopsis")]
+    conn = storage.connect(db_file)
+    with conn:
+        conn.execute("INSERT INTO text_dictionaries (created_at, sample_rows, data) VALUES (?, ?, ?)",
+                     (datetime.now(timezone.utc).isoformat(), len(samples), textcodec.train_dictionary(samples)))
+    conn.close()
+
+    ttms_scraper.bulk_save_forecasts(forecasts[1:2])
+    conn = sqlite3.connect(db_file)
+    try:
+        stored = conn.execute("SELECT textArea1 FROM detailed_forecasts WHERE forecastid = 2").fetchone()[0]
+    finally:
+        conn.close()
+    assert int.from_bytes(stored[1:3], "big") == 1
+    assert textcodec.codec(db_file).decode(stored) == forecasts[1]["textArea1"]
@@ -0,0 +1,339 @@
+"""
+Transparent compression of the long prose columns.
+
+detailed_forecasts.jsonObject, textArea1..3 and synopsis, and
+weather_alerts.description, are stored as raw-deflate BLOBs primed with a
+preset dictionary trained on this database's own text. The text repeats
+from row to row: the same phrases, place names and JSON keys. Short values,
+and values that would not shrink, stay plain TEXT, so a column can hold
+both. A compressed value is one format byte, the two-byte id of its
+dictionary in text_dictionaries, then the deflate stream. Old dictionaries
+are kept, so every value stays readable after a retrain.
+
+Writers encode with codec(db_file).encode_row(). Readers decode in Python
+with decode() / decode_row() / decode_dict(), or in SQL with ttms_text(),
+which storage.connect() registers on every connection for ad-hoc reads.
+No trigger, view or index calls it: the search index keeps its own plain
+copy (see search.py), so any connection, the sqlite3 shell included, can
+write every table; it just sees those columns' compressed BLOBs.
+
+The version 9 migration (see storage.py) compressed the rows stored before
+it. compress_existing(), behind `run_scrapers.py compress-text`, does the
+same later on demand: it trains a dictionary if there is none (or on
+--retrain), then re-encodes existing rows in batches. With
+TTMS_TEXT_COMPRESSION=0 it decodes every row back to plain text instead.
+"""
+
+import heapq
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence
+
+# --- Configuration ---
+COMPRESSED_COLUMNS = {
+    "detailed_forecasts": ("textArea1", "textArea2", "textArea3", "synopsis", "jsonObject"),
+    "weather_alerts": ("description",),
+}
+TEXT_COMPRESSION = os.environ.get("TTMS_TEXT_COMPRESSION", "1") not in ("0", "false", "no")
+# Shorter values are left as TEXT: three header bytes would eat the saving
+COMPRESS_MIN_BYTES = int(os.environ.get("TTMS_COMPRESS_MIN_BYTES", "48"))
+COMPRESS_LEVEL = 9
+# zlib only ever uses the last 32 KiB of a preset dictionary
+DICT_SIZE = 32 * 1024
+# Newest text sampled to train a dictionary, and the least worth training on
+TRAIN_SAMPLE_BYTES = 1024 * 1024
+MIN_TRAIN_SAMPLES = 20
+# Dictionary training: candidate segment length, and the substring length
+# whose frequency scores a segment
+SEGMENT_BYTES = 96
+DMER_BYTES = 8
+SQL_FUNCTION = "ttms_text"
+
+_FORMAT = 1
+
+
+class TextCodec:
+    """
+    Encoder / decoder for one database's compressed columns. Dictionaries
+    are read on first use over a connection of its own, and again when a
+    value names one this process has not seen (trained by another process).
+    Writers call refresh() once per batch so that new values, too, switch to
+    a dictionary another process has trained. Safe to share between threads.
+    """
+
+    def __init__(self, db_file: str) -> None:
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._dicts: Dict[int, bytes] | None = None
+        # Streams primed with each dictionary; copy() skips re-priming per value
+        self._compressors: Dict[int, Any] = {}
+        self._decompressors: Dict[int, Any] = {}
+
+    def _load(self) -> Dict[int, bytes]:
+        dicts: Dict[int, bytes] = {}
+        if os.path.exists(self.db_file):
+            conn = sqlite3.connect(self.db_file)
+            try:
+                dicts = dict(conn.execute("SELECT dict_id, data FROM text_dictionaries"))
+            except sqlite3.OperationalError:
+                pass  # Not migrated yet: no dictionaries
+            finally:
+                conn.close()
+        return dicts
+
+    def _dictionaries(self, need: int | None = None) -> Dict[int, bytes]:
+        with self._lock:
+            if self._dicts is None or (need is not None and need not in self._dicts):
+                self._dicts = self._load()
+            return self._dicts
+
+    def refresh(self, conn: sqlite3.Connection) -> None:
+        """
+        Load, over the caller's conn, any dictionary stored since this codec
+        last looked, so the next encode() uses the newest. One indexed
+        max() lookup when there is none.
+        """
+        try:
+            newest = conn.execute("SELECT max(dict_id) FROM text_dictionaries").fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            return  # Not migrated yet: no dictionaries
+        known = self._dictionaries()
+        if newest > max(known, default=0):
+            added = dict(conn.execute("SELECT dict_id, data FROM text_dictionaries WHERE dict_id > ?",
+                                      (max(known, default=0),)))
+            with self._lock:
+                self._dicts = {**(self._dicts or {}), **added}
+
+    def add_dictionary(self, dict_id: int, data: bytes) -> None:
+        """Make a dictionary just stored in text_dictionaries the one new values use."""
+        with self._lock:
+            if self._dicts is None:
+                self._dicts = self._load()
+            self._dicts[dict_id] = data
+
+    @property
+    def current_id(self) -> int:
+        """Id of the newest dictionary, which encode() uses; 0 means none (plain deflate)."""
+        return max(self._dictionaries(), default=0)
+
+    def _zdict(self, dict_id: int) -> bytes | None:
+        if dict_id == 0:
+            return None
+        data = self._dictionaries(need=dict_id).get(dict_id)
+        if data is None:
+            raise ValueError(f"Text dictionary {dict_id} is missing from {self.db_file}")
+        return data
+
+    def _compressor(self, dict_id: int) -> Any:
+        if dict_id not in self._compressors:
+            zdict = self._zdict(dict_id)
+            args = (COMPRESS_LEVEL, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY)
+            self._compressors[dict_id] = zlib.compressobj(*args, zdict) if zdict else zlib.compressobj(*args)
+        return self._compressors[dict_id].copy()
+
+    def _decompressor(self, dict_id: int) -> Any:
+        if dict_id not in self._decompressors:
+            zdict = self._zdict(dict_id)
+            self._decompressors[dict_id] = zlib.decompressobj(-15, zdict) if zdict else zlib.decompressobj(-15)
+        return self._decompressors[dict_id].copy()
+
+    def encode(self, value: Any) -> Any:
+        """value compressed with the current dictionary, or unchanged if it is not worth it."""
+        if not TEXT_COMPRESSION or not isinstance(value, str) or len(value) < COMPRESS_MIN_BYTES:
+            return value
+        raw = value.encode("utf-8")
+        dict_id = self.current_id
+        stream = self._compressor(dict_id)
+        body = stream.compress(raw) + stream.flush()
+        if len(body) + 3 >= len(raw):
+            return value
+        return bytes((_FORMAT,)) + dict_id.to_bytes(2, "big") + body
+
+    def decode(self, value: Any) -> Any:
+        """The text behind a compressed value; anything else is returned as it is."""
+        if not isinstance(value, bytes) or value[:1] != bytes((_FORMAT,)):
+            return value
+        stream = self._decompressor(int.from_bytes(value[1:3], "big"))
+        return (stream.decompress(value[3:]) + stream.flush()).decode("utf-8")
+
+    def encode_row(self, row: Sequence[Any], positions: Sequence[int]) -> tuple:
+        """row with the values at positions encoded."""
+        values = list(row)
+        for i in positions:
+            values[i] = self.encode(values[i])
+        return tuple(values)
+
+    def decode_row(self, row: Sequence[Any], positions: Sequence[int]) -> tuple:
+        """row with the values at positions decoded."""
+        values = list(row)
+        for i in positions:
+            values[i] = self.decode(values[i])
+        return tuple(values)
+
+    def decode_dict(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """A column -> value row (SELECT *) with every compressed value decoded."""
+        return {column: self.decode(value) for column, value in row.items()}
+
+
+# abspath(db_file) -> its codec
+_codecs: Dict[str, TextCodec] = {}
+_codecs_lock = threading.Lock()
+
+
+def codec(db_file: str) -> TextCodec:
+    """The shared TextCodec for db_file."""
+    key = os.path.abspath(db_file)
+    with _codecs_lock:
+        if key not in _codecs:
+            _codecs[key] = TextCodec(key)
+        return _codecs[key]
+
+
+def register(conn: sqlite3.Connection, db_file: str) -> None:
+    """Register ttms_text(value), the SQL-side decode, on conn."""
+    conn.create_function(SQL_FUNCTION, 1, codec(db_file).decode, deterministic=True)
+
+
+def column_positions(columns: Sequence[str], table: str) -> List[int]:
+    """Indexes into columns of table's compressed columns."""
+    return [i for i, column in enumerate(columns) if column in COMPRESSED_COLUMNS[table]]
+
+
+def train_dictionary(samples: Sequence[bytes], size: int = DICT_SIZE) -> bytes:
+    """
+    A preset dictionary of up to size bytes for texts like samples.
+
+    A simplified COVER: every DMER_BYTES-long substring is scored by the
+    number of samples it occurs in; candidate SEGMENT_BYTES-long segments
+    are scored by the summed frequency of the repeated substrings they hold
+    that no chosen segment holds yet, and picked greedily (lazily re-scored
+    from a heap). The best segments go last, where deflate reaches them
+    with the shortest distances.
+    """
+    freq: Counter = Counter()
+    for sample in samples:
+        freq.update({sample[i:i + DMER_BYTES] for i in range(len(sample) - DMER_BYTES + 1)})
+
+    def dmers(segment: bytes) -> set:
+        return {segment[i:i + DMER_BYTES] for i in range(len(segment) - DMER_BYTES + 1)}
+
+    heap = []
+    step = SEGMENT_BYTES // 4
+    for n, sample in enumerate(samples):
+        for start in range(0, max(len(sample) - SEGMENT_BYTES, 0) + 1, step):
+            score = sum(freq[d] for d in dmers(sample[start:start + SEGMENT_BYTES]) if freq[d] > 1)
+            if score:
+                heap.append((-score, n, start))
+    heapq.heapify(heap)
+
+    covered: set = set()
+    chosen: List[bytes] = []
+    total = 0
+    while heap and total < size:
+        _, n, start = heapq.heappop(heap)
+        segment = samples[n][start:start + SEGMENT_BYTES]
+        fresh = dmers(segment) - covered
+        score = sum(freq[d] for d in fresh if freq[d] > 1)
+        if not score:
+            continue
+        if heap and score < -heap[0][0]:
+            heapq.heappush(heap, (-score, n, start))
+            continue
+        chosen.append(segment)
+        covered |= fresh
+        total += len(segment)
+    return b"".join(reversed(chosen))[-size:]
+
+
+def _training_samples(conn: sqlite3.Connection, text_codec: TextCodec) -> List[bytes]:
+    """Newest compressed-column text, up to TRAIN_SAMPLE_BYTES, split evenly between the tables."""
+    samples: List[bytes] = []
+    budget = TRAIN_SAMPLE_BYTES // len(COMPRESSED_COLUMNS)
+    for table, columns in COMPRESSED_COLUMNS.items():
+        used = 0
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid DESC"):
+            for value in row:
+                text = text_codec.decode(value)
+                if isinstance(text, str) and len(text) >= COMPRESS_MIN_BYTES:
+                    samples.append(text.encode("utf-8"))
+                    used += len(samples[-1])
+            if used >= budget:
+                break
+    return samples
+
+
+def _stored_bytes(conn: sqlite3.Connection) -> int:
+    """Bytes held by the compressed columns, as stored (TEXT or BLOB)."""
+    total = 0
+    for table, columns in COMPRESSED_COLUMNS.items():
+        sums = " + ".join(f"COALESCE(SUM(length(CAST({c} AS BLOB))), 0)" for c in columns)
+        total += conn.execute(f"SELECT {sums} FROM {table}").fetchone()[0]
+    return total
+
+
+def compress_existing(db_file: str, retrain: bool = False, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Re-encode every stored value of the compressed columns with the current
+    dictionary, one transaction per batch_size rows, training and storing a
+    dictionary first if there is none yet (or retrain is set) and at least
+    MIN_TRAIN_SAMPLES values to learn from. Rows already encoded that way
+    are not rewritten, so an interrupted run just carries on next time.
+    Returns {"dictionary", "dictionary_bytes", "rows", "updated",
+    "bytes_before", "bytes_after", "file_bytes"}: the byte counts are what
+    the compressed columns store, before and after. The file does not shrink
+    here: rewritten rows leave room inside their pages and whole pages on
+    the free list, which run_scrapers.py compact releases; file_bytes is the
+    size of the database file (not counting the WAL) afterwards.
+    """
+    # Imported here: storage imports textcodec itself
+    import storage
+
+    text_codec = codec(db_file)
+    result = {"dictionary": 0, "dictionary_bytes": 0, "rows": 0, "updated": 0}
+    conn = storage.acquire(db_file)
+    try:
+        result["bytes_before"] = _stored_bytes(conn)
+        text_codec.refresh(conn)
+        if TEXT_COMPRESSION and (retrain or text_codec.current_id == 0):
+            samples = _training_samples(conn, text_codec)
+            if len(samples) >= MIN_TRAIN_SAMPLES:
+                data = train_dictionary(samples)
+                with conn:
+                    dict_id = conn.execute(
+                        "INSERT INTO text_dictionaries (created_at, sample_rows, data) VALUES (?, ?, ?)",
+                        (datetime.now(timezone.utc).isoformat(), len(samples), data),
+                    ).lastrowid
+                text_codec.add_dictionary(dict_id, data)
+        result["dictionary"] = text_codec.current_id if TEXT_COMPRESSION else 0
+        result["dictionary_bytes"] = len(text_codec._zdict(result["dictionary"]) or b"")
+
+        for table, columns in COMPRESSED_COLUMNS.items():
+            assignments = ", ".join(f"{c} = ?" for c in columns)
+            last = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for row in rows:
+                    values = tuple(text_codec.encode(text_codec.decode(v)) for v in row[1:])
+                    if values != row[1:]:
+                        updates.append(values + (row[0],))
+                if updates:
+                    with conn:
+                        conn.executemany(f"UPDATE {table} SET {assignments} WHERE rowid = ?", updates)
+                result["rows"] += len(rows)
+                result["updated"] += len(updates)
+                last = rows[-1][0]
+        result["bytes_after"] = _stored_bytes(conn)
+        result["file_bytes"] = os.path.getsize(db_file)
+        return result
+    finally:
+        storage.release(conn)
@@ -1,272 +1,377 @@
+import functools
+import io
 import os
+import re
 import requests
 import sqlite3
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
-import time
-import schedule
+
+import storage
+from archive import iter_payloads, store_payload
+from metrics import PhaseTimer
+from resilience import check_circuit, record_outcome, with_retries
+from search import index_alerts
+from storage import WRITE_BATCH_SIZE, batched
+from textcodec import codec, column_positions
+from http_cache import (
+    conditional_headers, is_unchanged, load_validators,
+    response_validators, save_validators,
+)
 
 # --- Configuration ---
-RSS_FEED_URL = "https://metproducts.gov.tt/ttms/public/api/feed?type=rss"
-DB_PATH = os.path.join(os.path.dirname(__file__), "database")
-if not os.path.exists(DB_PATH):
-    os.makedirs(DB_PATH)
-    
-DB_FILE = os.path.join(DB_PATH, "weather_forecasts.db")
+# Overridable so benchmarks can point the scraper at a local stand-in server
+RSS_FEED_URL = os.environ.get("TTMS_RSS_FEED_URL", "https://metproducts.gov.tt/ttms/public/api/feed?type=rss")
+DB_FILE = storage.DB_FILE
 
 def setup_database():
     """
-    Sets up the SQLite database and creates the necessary tables if they don't exist.
+    Sets up the SQLite database, creating or upgrading tables only when the
+    schema version has changed (see storage.MIGRATIONS).
     """
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-
-        # Create table for weather alerts from RSS feed
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_alerts (
-                alert_id TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                description TEXT,
-                link TEXT,
-                pub_date TEXT,
-                alert_level TEXT,
-                alert_type TEXT,
-                issued_by TEXT,
-                insertion_date TEXT
-            )
-        ''')
-
-        # Create table for scraper analytics and run tracking
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scraper_analytics (
-                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_timestamp TEXT NOT NULL,
-                run_type TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT,
-                duration_seconds REAL,
-                records_fetched INTEGER,
-                records_inserted INTEGER,
-                success BOOLEAN,
-                error_message TEXT,
-                api_response_time REAL,
-                total_records_in_db INTEGER
-            )
-        ''')
-
-        print(f"Database '{DB_FILE}' is set up with all tables ready.")
-        conn.commit()
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
-    finally:
-        if conn:
-            conn.close()
+    storage.ensure_schema(DB_FILE)
+
+# Declarative keyword table for classify_alert(). Keywords match whole words
+# (case-insensitive, any run of whitespace between words) anywhere in the
+# title; when several labels of one field match, the one listed first wins.
+ALERT_KEYWORDS = {
+    'alert_level': [
+        ('YELLOW', ['yellow']),
+        ('ORANGE', ['orange']),
+        ('RED', ['red']),
+        ('GREEN', ['green']),
+    ],
+    'alert_type': [
+        ('ADVERSE_WEATHER', ['adverse weather']),
+        ('HIGH_WIND', ['high wind', 'high winds']),
+        ('FLOOD', ['flood', 'floods', 'flooding']),
+        ('HAZARDOUS_SEAS', ['hazardous seas']),
+        ('DISCONTINUATION', ['discontinuation', 'cancellation']),
+    ],
+}
+ALERT_DEFAULTS = {'alert_level': 'UNKNOWN', 'alert_type': 'OTHER'}
 
-def fetch_rss_alerts():
+def _compile_classifier(table):
+    """
+    Builds one regex with a named group per keyword, plus a map from group
+    name to the (field, priority, label) entries that keyword stands for.
+    """
+    entries = {}
+    for field, labels in table.items():
+        for priority, (label, keywords) in enumerate(labels):
+            for keyword in keywords:
+                entries.setdefault(tuple(keyword.lower().split()), []).append((field, priority, label))
+    groups = {}
+    alternatives = []
+    # Longest first so 'high winds' is tried before 'high wind'
+    for i, words in enumerate(sorted(entries, key=lambda w: len(' '.join(w)), reverse=True)):
+        groups[f'k{i}'] = entries[words]
+        alternatives.append(f'(?P<k{i}>' + r'\s+'.join(re.escape(word) for word in words) + ')')
+    return re.compile(r'\b(?:%s)\b' % '|'.join(alternatives)), groups
+
+_KEYWORD_RE, _KEYWORD_GROUPS = _compile_classifier(ALERT_KEYWORDS)
+
+@functools.lru_cache(maxsize=4096)
+def classify_alert(title):
+    """
+    Returns (alert_level, alert_type) for an alert title in a single regex
+    pass over it, using ALERT_KEYWORDS. Results are cached per title.
+    """
+    best = {}
+    for match in _KEYWORD_RE.finditer((title or '').lower()):
+        for field, priority, label in _KEYWORD_GROUPS[match.lastgroup]:
+            if field not in best or priority < best[field][0]:
+                best[field] = (priority, label)
+    level = best['alert_level'][1] if 'alert_level' in best else ALERT_DEFAULTS['alert_level']
+    alert_type = best['alert_type'][1] if 'alert_type' in best else ALERT_DEFAULTS['alert_type']
+    return level, alert_type
+
+# Item child elements copied onto the alert, by tag
+_ITEM_FIELDS = {'title': 'title', 'description': 'description', 'link': 'link', 'pubDate': 'pub_date'}
+
+def _root_tag(content, chunk_size=1024):
+    """Returns the document element's tag, parsing only as far as its start tag."""
+    parser = ET.XMLPullParser(events=('start',))
+    for offset in range(0, len(content), chunk_size):
+        parser.feed(content[offset:offset + chunk_size])
+        for _, elem in parser.read_events():
+            return elem.tag
+    return ''
+
+def iter_rss_alerts(content, insertion_date=None):
+    """
+    Yields one alert dictionary per RSS <item>, parsing incrementally with
+    iterparse: each item is read in one pass over its children and cleared
+    as soon as it has been handled, so the whole tree is never held in memory.
+    Raises ET.ParseError on malformed XML.
+    """
+    if insertion_date is None:
+        insertion_date = datetime.now(timezone.utc).isoformat()
+
+    # Only RSS documents carry alerts. Checked up front, as 'end' events
+    # reach the root last; listening for 'start' too would double the events.
+    if not _root_tag(content).endswith('rss'):
+        return
+
+    for _, elem in ET.iterparse(io.BytesIO(content), events=('end',)):
+        if elem.tag != 'item':
+            continue
+
+        alert = {}
+        for child in elem:
+            field = _ITEM_FIELDS.get(child.tag)
+            if field and field not in alert:
+                alert[field] = child.text or ''
+        for field in _ITEM_FIELDS.values():
+            alert.setdefault(field, '')
+        alert['alert_level'], alert['alert_type'] = classify_alert(alert['title'])
+        alert['issued_by'] = 'Trinidad and Tobago Meteorological Service'
+        alert['insertion_date'] = insertion_date
+
+        # Generate unique alert ID from title and date
+        alert['alert_id'] = f"{alert['title'][:50]}_{alert['pub_date'][:20]}".replace(' ', '_').replace(':', '_')
+
+        elem.clear()
+        yield alert
+
+def parse_rss_alerts(content, insertion_date=None):
+    """
+    Parses an RSS document into a list of alert dictionaries.
+    Raises ET.ParseError on malformed XML.
+    """
+    return list(iter_rss_alerts(content, insertion_date))
+
+def fetch_rss_alerts(fetch_info=None, session=None, timer=None, lease_lost=None):
     """
     Fetches weather alerts from the RSS feed.
     Returns a list of alert dictionaries.
+
+    The request is conditional on the validators stored for the feed. If the
+    feed is unchanged (304, or an identical body) nothing is parsed, an empty
+    list is returned and fetch_info['unchanged'] is set. Otherwise
+    fetch_info['validators'] holds the new validators; pass fetch_info to
+    commit_rss_validators() once the alerts are saved.
+
+    Transient failures (including a truncated feed that does not parse) are
+    retried with backoff. While the feed's circuit breaker is open nothing is
+    requested and fetch_info['circuit_open'] is set to when it reopens.
+
+    Pass a requests.Session to reuse its keep-alive connection, and a
+    metrics.PhaseTimer to record connect / transfer / parse times.
+
+    lease_lost is the lost event of the rss_alerts lease (see leases.py). If
+    it is set by the time the feed is in, nothing is recorded or returned
+    and fetch_info['lease_lost'] is set, so the caller saves nothing.
     """
-    alerts = []
+    if fetch_info is None:
+        fetch_info = {}
+    fetch_info['unchanged'] = False
+    fetch_info['lease_lost'] = False
+    fetch_info['validators'] = {}
+    if timer is None:
+        timer = PhaseTimer()
+
+    open_until = check_circuit(DB_FILE, RSS_FEED_URL)
+    if open_until:
+        print(f"Circuit breaker open for {RSS_FEED_URL} until {open_until}; not fetching.")
+        fetch_info['circuit_open'] = open_until
+        return []
     
     headers = {
         "Accept": "application/xml, text/xml",
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
+    stored = load_validators(DB_FILE, RSS_FEED_URL)
+    headers.update(conditional_headers(stored))
     
+    def attempt():
+        with timer.phase('connect'):
+            response = (session or requests).get(RSS_FEED_URL, headers=headers, timeout=10, stream=True)
+        with timer.phase('transfer'):
+            response.content
+        response.raise_for_status()
+        if stored and is_unchanged(response, stored):
+            return response, None
+        # Parsed inside the retry so a truncated feed is fetched again
+        with timer.phase('parse'):
+            return response, parse_rss_alerts(response.content)
+
     try:
         print(f"Fetching RSS alerts from: {RSS_FEED_URL}")
-        response = requests.get(RSS_FEED_URL, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Parse XML content
-        root = ET.fromstring(response.content)
-        
-        # Handle RSS format
-        if root.tag.endswith('rss'):
-            # RSS format
-            for item in root.findall('.//item'):
-                alert = {}
-                alert['title'] = item.find('title').text if item.find('title') is not None else ''
-                alert['description'] = item.find('description').text if item.find('description') is not None else ''
-                alert['link'] = item.find('link').text if item.find('link') is not None else ''
-                alert['pub_date'] = item.find('pubDate').text if item.find('pubDate') is not None else ''
-                
-                # Extract alert level and type from title
-                title = alert['title'].lower()
-                if 'yellow' in title:
-                    alert['alert_level'] = 'YELLOW'
-                elif 'orange' in title:
-                    alert['alert_level'] = 'ORANGE'
-                elif 'red' in title:
-                    alert['alert_level'] = 'RED'
-                elif 'green' in title:
-                    alert['alert_level'] = 'GREEN'
-                else:
-                    alert['alert_level'] = 'UNKNOWN'
-                
-                # Extract alert type
-                if 'adverse weather' in title:
-                    alert['alert_type'] = 'ADVERSE_WEATHER'
-                elif 'high wind' in title:
-                    alert['alert_type'] = 'HIGH_WIND'
-                elif 'flood' in title:
-                    alert['alert_type'] = 'FLOOD'
-                elif 'hazardous seas' in title:
-                    alert['alert_type'] = 'HAZARDOUS_SEAS'
-                elif 'discontinuation' in title or 'cancellation' in title:
-                    alert['alert_type'] = 'DISCONTINUATION'
-                else:
-                    alert['alert_type'] = 'OTHER'
-                
-                alert['issued_by'] = 'Trinidad and Tobago Meteorological Service'
-                alert['insertion_date'] = datetime.now(timezone.utc).isoformat()
-                
-                # Generate unique alert ID from title and date
-                alert['alert_id'] = f"{alert['title'][:50]}_{alert['pub_date'][:20]}".replace(' ', '_').replace(':', '_')
-                
-                alerts.append(alert)
+        response, alerts = with_retries(attempt, "RSS feed")
+        if lease_lost is not None and lease_lost.is_set():
+            print("Lost the rss_alerts lease; not saving the feed")
+            fetch_info['lease_lost'] = True
+            return []
+        record_outcome(DB_FILE, RSS_FEED_URL)
+
+        if alerts is None:
+            print(f"RSS feed unchanged ({response.status_code}); skipping parse.")
+            fetch_info['unchanged'] = True
+            return []
+        fetch_info['validators'] = response_validators(response)
         
+        # Keep the raw feed for debugging and offline replay
+        store_payload(DB_FILE, 'rss', RSS_FEED_URL, response.content)
+
         print(f"Successfully parsed {len(alerts)} alerts from RSS feed")
         return alerts
         
     except requests.exceptions.RequestException as e:
         print(f"Error fetching RSS alerts: {e}")
+        record_outcome(DB_FILE, RSS_FEED_URL, str(e))
         return []
     except ET.ParseError as e:
         print(f"Error parsing RSS XML: {e}")
+        record_outcome(DB_FILE, RSS_FEED_URL, f"RSS parse error: {e}")
         return []
 
+def commit_rss_validators(fetch_info):
+    """
+    Stores the feed validators captured by fetch_rss_alerts(). Call only after
+    the alerts from that response have been saved.
+    """
+    save_validators(DB_FILE, RSS_FEED_URL, fetch_info.get('validators') or {})
+
+ALERT_COLUMNS = [
+    'alert_id', 'title', 'description', 'link', 'pub_date',
+    'alert_level', 'alert_type', 'issued_by', 'insertion_date'
+]
+# Rows are only rewritten when their content differs, which bulk_save_alerts
+# checks in Python (description may be compressed, see textcodec.py);
+# insertion_date moves with the content so it records when the current
+# version was first seen.
+_ALERT_UPSERT_SQL = '''
+    INSERT INTO weather_alerts (
+        alert_id, title, description, link, pub_date,
+        alert_level, alert_type, issued_by, insertion_date
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(alert_id) DO UPDATE SET
+        title = excluded.title,
+        description = excluded.description,
+        link = excluded.link,
+        pub_date = excluded.pub_date,
+        alert_level = excluded.alert_level,
+        alert_type = excluded.alert_type,
+        issued_by = excluded.issued_by,
+        insertion_date = excluded.insertion_date
+'''
+# Every column but insertion_date: what makes an alert a new version
+_CONTENT_COLUMNS = ALERT_COLUMNS[:-1]
+_COMPRESSED_POSITIONS = column_positions(_CONTENT_COLUMNS, 'weather_alerts')
+
+def bulk_save_alerts(alerts, batch_size=WRITE_BATCH_SIZE):
+    """
+    Upserts alerts with one executemany and one transaction per batch,
+    writing only those whose content changed, and indexes them for search.
+    Returns a dict with accurate 'new', 'updated' and 'unchanged' counts.
+    Raises sqlite3.Error; batches committed before the error are kept.
+    """
+    counts = {'new': 0, 'updated': 0, 'unchanged': 0}
+    if not alerts:
+        return counts
+
+    text_codec = codec(DB_FILE)
+    conn = storage.acquire(DB_FILE)
+    try:
+        for batch in batched(alerts, batch_size):
+            rows = [tuple(alert.get(c) for c in ALERT_COLUMNS) for alert in batch]
+            ids = list({row[0] for row in rows})
+            with conn:
+                text_codec.refresh(conn)
+                current = {
+                    row[0]: text_codec.decode_row(row, _COMPRESSED_POSITIONS) for row in conn.execute(
+                        f"SELECT {', '.join(_CONTENT_COLUMNS)} FROM weather_alerts "
+                        f"WHERE alert_id IN ({','.join(['?'] * len(ids))})",
+                        ids,
+                    )
+                }
+                existing = set(current)
+                # Compared in order, so a repeated id is checked against the copy before it
+                writes = []
+                for row in rows:
+                    if current.get(row[0]) == row[:-1]:
+                        counts['unchanged'] += 1
+                        continue
+                    current[row[0]] = row[:-1]
+                    writes.append(row)
+                if writes:
+                    conn.executemany(_ALERT_UPSERT_SQL, [
+                        text_codec.encode_row(row, _COMPRESSED_POSITIONS) for row in writes
+                    ])
+                    latest = {row[0]: row for row in writes}
+                    index_alerts(conn, [row[:3] for row in latest.values()])
+            new = len(set(current) - existing)
+            counts['new'] += new
+            counts['updated'] += len(writes) - new
+        return counts
+    finally:
+        storage.release(conn)
+
 def save_alerts_to_db(alerts):
     """
     Saves weather alerts to the database.
+    Returns the number of alerts that were not stored before.
     """
     if not alerts:
         print("No alerts to save.")
         return 0
 
-    conn = None
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-
-        insert_count = 0
-        for alert in alerts:
-            cursor.execute('''
-                INSERT OR REPLACE INTO weather_alerts (
-                    alert_id, title, description, link, pub_date, 
-                    alert_level, alert_type, issued_by, insertion_date
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                alert['alert_id'], alert['title'], alert['description'], 
-                alert['link'], alert['pub_date'], alert['alert_level'], 
-                alert['alert_type'], alert['issued_by'], alert['insertion_date']
-            ))
-            if cursor.rowcount > 0:
-                insert_count += 1
-
-        conn.commit()
-        print(f"Successfully saved {insert_count} alert(s) to the 'weather_alerts' table.")
-        return insert_count
-
+        counts = bulk_save_alerts(alerts)
+        print(f"Saved alerts to the 'weather_alerts' table: {counts['new']} new, "
+              f"{counts['updated']} updated, {counts['unchanged']} unchanged.")
+        return counts['new']
     except sqlite3.Error as e:
         print(f"Database error during alert insert: {e}")
         return 0
-    finally:
-        if conn:
-            conn.close()
 
-def log_scraper_run(run_type, start_time, end_time, records_fetched, records_inserted, 
-                    success, error_message=None, api_response_time=None):
+def replay_alerts_from_archive():
     """
-    Logs scraper run analytics to the database.
+    Re-derives weather_alerts from every archived RSS document, oldest first,
+    without touching the network. Returns payloads/fetched/new/updated counts.
     """
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        
-        duration = (end_time - start_time).total_seconds()
-        
-        # Get total records count
-        cursor.execute("SELECT COUNT(*) FROM weather_alerts")
-        total_records = cursor.fetchone()[0]
-        
-        cursor.execute('''
-            INSERT INTO scraper_analytics (
-                run_timestamp, run_type, start_time, end_time, duration_seconds,
-                records_fetched, records_inserted, success, error_message,
-                api_response_time, total_records_in_db
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now(timezone.utc).isoformat(),
-            run_type,
-            start_time.isoformat(),
-            end_time.isoformat(),
-            duration,
-            records_fetched,
-            records_inserted,
-            success,
-            error_message,
-            api_response_time,
-            total_records
-        ))
-        
-        conn.commit()
-        print(f"Logged scraper run analytics for {run_type}")
-        
-    except sqlite3.Error as e:
-        print(f"Error logging scraper run: {e}")
-    finally:
-        if conn:
-            conn.close()
+    totals = {'payloads': 0, 'fetched': 0, 'new': 0, 'updated': 0}
+    for entry, body in iter_payloads(DB_FILE, 'rss'):
+        try:
+            alerts = parse_rss_alerts(body, insertion_date=entry.get('fetched_at'))
+        except ET.ParseError as e:
+            print(f"Skipping archived feed {entry['hash'][:12]}: {e}")
+            continue
+        counts = bulk_save_alerts(alerts)
+        totals['payloads'] += 1
+        totals['fetched'] += len(alerts)
+        totals['new'] += counts['new']
+        totals['updated'] += counts['updated']
+    print(f"Replayed {totals['payloads']} archived RSS feed(s): {totals['fetched']} alert(s), "
+          f"{totals['new']} new, {totals['updated']} updated.")
+    return totals
 
-def get_database_stats():
+def reclassify_alerts(batch_size=WRITE_BATCH_SIZE):
     """
-    Returns statistics about the database contents.
+    Re-runs classify_alert() over every stored alert and rewrites
+    alert_level / alert_type where they changed, one transaction per batch.
+    Returns {'checked', 'changed'}. Raises sqlite3.Error.
     """
-    conn = None
+    conn = storage.acquire(DB_FILE)
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        
-        # Get alerts count
-        cursor.execute("SELECT COUNT(*) FROM weather_alerts")
-        alerts_count = cursor.fetchone()[0]
-        
-        # Get latest alert date
-        cursor.execute("SELECT MAX(pub_date) FROM weather_alerts")
-        latest_alert = cursor.fetchone()[0]
-        
-        # Get run count
-        cursor.execute("SELECT COUNT(*) FROM scraper_analytics")
-        run_count = cursor.fetchone()[0]
-        
-        # Get last run info
-        cursor.execute("SELECT run_type, run_timestamp, success FROM scraper_analytics ORDER BY run_id DESC LIMIT 1")
-        last_run = cursor.fetchone()
-        
-        stats = {
-            'total_alerts': alerts_count,
-            'latest_alert_date': latest_alert,
-            'total_runs': run_count,
-            'last_run': {
-                'type': last_run[0] if last_run else None,
-                'timestamp': last_run[1] if last_run else None,
-                'success': last_run[2] if last_run else None
-            }
-        }
-        
-        return stats
-        
-    except sqlite3.Error as e:
-        print(f"Error getting database stats: {e}")
-        return {}
+        changes = []
+        checked = 0
+        for alert_id, title, level, alert_type in conn.execute(
+                "SELECT alert_id, title, alert_level, alert_type FROM weather_alerts"):
+            checked += 1
+            new_level, new_type = classify_alert(title)
+            if (new_level, new_type) != (level, alert_type):
+                changes.append((new_level, new_type, alert_id))
+
+        for batch in batched(changes, batch_size):
+            with conn:
+                conn.executemany(
+                    "UPDATE weather_alerts SET alert_level = ?, alert_type = ? WHERE alert_id = ?", batch)
+        print(f"Reclassified alerts: {checked} checked, {len(changes)} changed.")
+        return {'checked': checked, 'changed': len(changes)}
     finally:
-        if conn:
-            conn.close()
+        storage.release(conn)
 
 def run_rss_scraper():
     """
@@ -279,21 +384,29 @@ def run_rss_scraper():
     
     try:
         # Fetch and save alerts
-        alert_data = fetch_rss_alerts()
+        fetch_info = {}
+        timer = PhaseTimer()
+        alert_data = fetch_rss_alerts(fetch_info, timer=timer)
         
-        if alert_data:
+        if fetch_info.get('unchanged'):
+            print("RSS feed unchanged since last run.")
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc),
+                           0, 0, True, status='unchanged', phases=timer.seconds)
+        elif alert_data:
             print(f"Total alerts fetched: {len(alert_data)}")
-            inserted_count = save_alerts_to_db(alert_data)
-            log_scraper_run('rss_alerts', start_time, datetime.now(timezone.utc), 
-                           len(alert_data), inserted_count, True)
+            with timer.phase('db_write'):
+                inserted_count = save_alerts_to_db(alert_data)
+            commit_rss_validators(fetch_info)
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc), 
+                           len(alert_data), inserted_count, True, phases=timer.seconds)
         else:
             print("Could not fetch any alert data.")
-            log_scraper_run('rss_alerts', start_time, datetime.now(timezone.utc), 
-                           0, 0, False, "No alert data fetched")
+            storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc), 
+                           0, 0, False, "No alert data fetched", phases=timer.seconds)
             
     except Exception as e:
         print(f"Error during RSS scraping: {e}")
-        log_scraper_run('rss_alerts', start_time, datetime.now(timezone.utc), 
+        storage.log_scraper_run(DB_FILE, 'rss_alerts', start_time, datetime.now(timezone.utc), 
                        0, 0, False, str(e))
     
     print("--- RSS Scraper finished. ---")
@@ -301,38 +414,27 @@ def run_rss_scraper():
 def main():
     """
     Main function to run the RSS scraper on schedule.
+    Runs the run_scrapers daemon with only the RSS job enabled.
     """
     print("--- Starting Scheduled RSS Weather Alerts Scraper ---")
-    
-    # Setup database
-    setup_database()
-    
-    # Run immediately once
-    run_rss_scraper()
-    
-    # Schedule to run every 10 minutes
-    schedule.every(10).minutes.do(run_rss_scraper)
-    
-    print("RSS scraper scheduled to run every 10 minutes...")
     print("Press Ctrl+C to stop")
-    
-    try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-    except KeyboardInterrupt:
-        print("\nStopping RSS scraper...")
-        
-        # Display final statistics
-        print("\n--- Final Statistics ---")
-        stats = get_database_stats()
-        print(f"Total alerts in database: {stats.get('total_alerts', 0)}")
-        print(f"Total scraper runs: {stats.get('total_runs', 0)}")
-        
-        if stats.get('last_run', {}).get('type'):
-            print(f"Last run type: {stats['last_run']['type']}")
-            print(f"Last run time: {stats['last_run']['timestamp']}")
-            print(f"Last run success: {stats['last_run']['success']}")
+
+    # Imported here: run_scrapers imports this module itself
+    from run_scrapers import run_daemon
+    run_daemon(jobs=('rss',))
+
+    print("\nStopping RSS scraper...")
+
+    # Display final statistics
+    print("\n--- Final Statistics ---")
+    stats = storage.get_database_stats(DB_FILE)
+    print(f"Total alerts in database: {stats.get('total_alerts', 0)}")
+    print(f"Total scraper runs: {stats.get('total_runs', 0)}")
+
+    if stats.get('last_run', {}).get('type'):
+        print(f"Last run type: {stats['last_run']['type']}")
+        print(f"Last run time: {stats['last_run']['timestamp']}")
+        print(f"Last run success: {stats['last_run']['success']}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,369 +1,763 @@
 import os
+import sys
 import json
+import time
 import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import Any, Callable, Deque, Dict, Iterator, List, Tuple
 import requests
 
+import storage
+from archive import iter_payloads, store_payload
+from conditions import save_conditions
+from leases import hold_lease
+from metrics import PhaseTimer
+from observations import save_observations
+from resilience import check_circuit, load_checkpoint, record_outcome, save_checkpoint, with_retries
+from revisions import content_hash, diff_fields, record_revisions
+from rollups import refresh_daily_rollups
+from search import index_forecasts
+from storage import WRITE_BATCH_SIZE, batched
+from textcodec import TextCodec, codec, column_positions
+from http_cache import (
+    conditional_headers, is_unchanged, load_validators,
+    response_validators, save_validators,
+)
+
 
 # --- Configuration ---
-API_BASE_URL = "https://metproducts.gov.tt/api/forecasts"
-DB_PATH = os.path.join(os.path.dirname(__file__), "database")
-if not os.path.exists(DB_PATH):
-    os.makedirs(DB_PATH)
-DB_FILE = os.path.join(DB_PATH, "weather_forecasts.db")
+# Overridable so benchmarks can point the scraper at a local stand-in server
+API_BASE_URL = os.environ.get("TTMS_API_BASE_URL", "https://metproducts.gov.tt/api/forecasts")
+# Upper bound on simultaneous page requests; keep it small to stay polite
+FETCH_CONCURRENCY = int(os.environ.get("TTMS_FETCH_CONCURRENCY", "4"))
+REQUEST_HEADERS = {
+    "Accept": "application/json",
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/115.0 Safari/537.36"
+    ),
+}
+DB_FILE = storage.DB_FILE
+# sync_state entry holding where an interrupted sync should resume
+RESUME_CHECKPOINT = "forecast_resume_checkpoint"
+
+# Single source-of-truth column list for detailed_forecasts inserts
+FORECAST_COLUMNS = [
+    'forecastid', 'amended', 'IssuedAt', 'forecastTime', 'forecaster', 'forecastPeriod',
+    'forecastArea1', 'forecastArea2', 'forecastArea3', 'textArea1', 'textArea2', 'textArea3',
+    'addMarine', 'imageTrin', 'imagebago', 'seas', 'waves1', 'waves2',
+    'PiarcoMnTemp', 'CrownMnTemp', 'TmPiarcoMnTemp', 'TmCrownMnTemp',
+    'TmWeatherPiarcoMn', 'TmWeatherCpMn', 'TmPiarcoMxTemp', 'TmCrownMxTemp',
+    'TmWeatherPiarcoMx', 'TmWeatherCpMx', 'outlook1',
+    'minTrin24look', 'maxTrin24look', 'minTob24look', 'maxTob24look',
+    'outlook2', 'minTrin48look', 'maxTrin48look', 'minTob48look', 'maxTob48look',
+    'outlook24WeatherPiarco', 'outlook48WeatherPiarco', 'outlook24WeatherCrown', 'outlook48WeatherCrown',
+    'PiarcoFcstMxTemp', 'CrownFcstMxTemp', 'PiarcoActMxTemp', 'CrownActMxTemp',
+    'PiarcoFcstMnTemp', 'CrownFcstMnTemp', 'PiarcoRainfall', 'CrownPointRinfall',
+    'cumlativeRain', 'cumlativeCpRain', 'PiarcoheatIndex', 'CPointheatIndex',
+    'sunrise', 'sunset', 'gustywinds', 'gustywinds2',
+    'tideDate', 'tideTime', 'tideTime2',
+    'trinAmHigh', 'trinPmHigh', 'trinAmLow', 'trinPmLow',
+    'tobAmHigh', 'tobPmHigh', 'tobAmLow', 'tobPmLow',
+    'precipitation', 'timePeriod', 'probrainfall', 'uvrate',
+    'jsonObject', 'wx24', 'wx24cp', 'wx48', 'wx48cp',
+    'synopsis', 'TmPiarco', 'TmCrown', 'insertionDate',
+]
+_FORECAST_INSERT_SQL = (
+    f"INSERT OR IGNORE INTO detailed_forecasts ({', '.join(FORECAST_COLUMNS)}, content_hash) "
+    f"VALUES ({','.join(['?'] * (len(FORECAST_COLUMNS) + 1))})"
+)
+# Where the compressed text columns sit in FORECAST_COLUMNS (see textcodec.py)
+_COMPRESSED_POSITIONS = column_positions(FORECAST_COLUMNS, "detailed_forecasts")
+_FORECAST_UPDATE_SQL = (
+    f"UPDATE detailed_forecasts SET {', '.join(f'{c} = ?' for c in FORECAST_COLUMNS[1:])}, content_hash = ? "
+    f"WHERE forecastid = ?"
+)
 
 
 def setup_database() -> None:
     """
-    Ensure SQLite database and required tables exist with the expected schema.
-    Drops legacy 'forecasts' table if present to avoid confusion.
+    Ensure the SQLite database exists with the current schema. Cheap when it
+    is already up to date; see storage.MIGRATIONS.
+    """
+    storage.ensure_schema(DB_FILE)
+
+
+def get_high_water_mark() -> int | None:
+    """
+    Return the highest forecastid covered by the last complete sync, or None.
     """
     conn = None
     try:
-        conn = sqlite3.connect(DB_FILE)
+        conn = storage.acquire(DB_FILE)
         cursor = conn.cursor()
+        cursor.execute("SELECT value FROM sync_state WHERE name = 'forecast_high_water_mark'")
+        row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error reading forecast high-water mark: {e}")
+        return None
+    finally:
+        if conn:
+            storage.release(conn)
 
-        # Drop legacy table if it ever existed
-        cursor.execute("DROP TABLE IF EXISTS forecasts")
-
-        # Create the detailed_forecasts table with fields aligned to the API
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS detailed_forecasts (
-                forecastid INTEGER PRIMARY KEY,
-                amended TEXT,
-                IssuedAt TEXT,
-                forecastTime TEXT,
-                forecaster TEXT,
-                forecastPeriod TEXT,
-                forecastArea1 TEXT,
-                forecastArea2 TEXT,
-                forecastArea3 TEXT,
-                textArea1 TEXT,
-                textArea2 TEXT,
-                textArea3 TEXT,
-                addMarine TEXT,
-                imageTrin TEXT,
-                imagebago TEXT,
-                seas TEXT,
-                waves1 TEXT,
-                waves2 TEXT,
-                PiarcoMnTemp TEXT,
-                CrownMnTemp TEXT,
-                TmPiarcoMnTemp TEXT,
-                TmCrownMnTemp TEXT,
-                TmWeatherPiarcoMn TEXT,
-                TmWeatherCpMn TEXT,
-                TmPiarcoMxTemp TEXT,
-                TmCrownMxTemp TEXT,
-                TmWeatherPiarcoMx TEXT,
-                TmWeatherCpMx TEXT,
-                outlook1 TEXT,
-                minTrin24look TEXT,
-                maxTrin24look TEXT,
-                minTob24look TEXT,
-                maxTob24look TEXT,
-                outlook2 TEXT,
-                minTrin48look TEXT,
-                maxTrin48look TEXT,
-                minTob48look TEXT,
-                maxTob48look TEXT,
-                outlook24WeatherPiarco TEXT,
-                outlook48WeatherPiarco TEXT,
-                outlook24WeatherCrown TEXT,
-                outlook48WeatherCrown TEXT,
-                PiarcoFcstMxTemp TEXT,
-                CrownFcstMxTemp TEXT,
-                PiarcoActMxTemp TEXT,
-                CrownActMxTemp TEXT,
-                PiarcoFcstMnTemp TEXT,
-                CrownFcstMnTemp TEXT,
-                PiarcoRainfall TEXT,
-                CrownPointRinfall TEXT,
-                cumlativeRain TEXT,
-                cumlativeCpRain TEXT,
-                PiarcoheatIndex TEXT,
-                CPointheatIndex TEXT,
-                sunrise TEXT,
-                sunset TEXT,
-                gustywinds TEXT,
-                gustywinds2 TEXT,
-                tideDate TEXT,
-                tideTime TEXT,
-                tideTime2 TEXT,
-                trinAmHigh TEXT,
-                trinPmHigh TEXT,
-                trinAmLow TEXT,
-                trinPmLow TEXT,
-                tobAmHigh TEXT,
-                tobPmHigh TEXT,
-                tobAmLow TEXT,
-                tobPmLow TEXT,
-                precipitation TEXT,
-                timePeriod TEXT,
-                probrainfall TEXT,
-                uvrate TEXT,
-                jsonObject TEXT,
-                wx24 TEXT,
-                wx24cp TEXT,
-                wx48 TEXT,
-                wx48cp TEXT,
-                synopsis TEXT,
-                TmPiarco TEXT,
-                TmCrown TEXT,
-                insertionDate TEXT
-            )
-        ''')
-
-        # Ensure RSS alerts table exists for run_scrapers orchestration
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_alerts (
-                alert_id TEXT PRIMARY KEY,
-                title TEXT NOT NULL,
-                description TEXT,
-                link TEXT,
-                pub_date TEXT,
-                alert_level TEXT,
-                alert_type TEXT,
-                issued_by TEXT,
-                insertion_date TEXT
-            )
-        ''')
 
-        # Analytics table for run logging (shared by scrapers)
+def set_high_water_mark(forecastid: int) -> None:
+    """
+    Record forecastid as the high-water mark. Never moves the mark backwards.
+    Only call this after a sync that walked every page it needed to.
+    """
+    conn = None
+    try:
+        conn = storage.acquire(DB_FILE)
+        cursor = conn.cursor()
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scraper_analytics (
-                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_timestamp TEXT NOT NULL,
-                run_type TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT,
-                duration_seconds REAL,
-                records_fetched INTEGER,
-                records_inserted INTEGER,
-                success BOOLEAN,
-                error_message TEXT,
-                api_response_time REAL,
-                total_records_in_db INTEGER
-            )
-        ''')
-
+            INSERT INTO sync_state (name, value, updated_at)
+            VALUES ('forecast_high_water_mark', ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                value = excluded.value,
+                updated_at = excluded.updated_at
+            WHERE CAST(sync_state.value AS INTEGER) < CAST(excluded.value AS INTEGER)
+        ''', (str(forecastid), datetime.now(timezone.utc).isoformat()))
         conn.commit()
-        print(f"Database '{DB_FILE}' is set up and ready.")
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        print(f"Error saving forecast high-water mark: {e}")
     finally:
         if conn:
-            conn.close()
+            storage.release(conn)
+
 
+def _page_is_known(items: List[Dict[str, Any]], since_id: int) -> bool:
+    """True when every forecast on the page is at or below the high-water mark."""
+    ids = [item.get("forecastid") for item in items]
+    return all(isinstance(i, int) and i <= since_id for i in ids)
 
-def fetch_all_forecasts() -> List[Dict[str, Any]]:
+
+def _is_newest_first(items: List[Dict[str, Any]]) -> bool:
     """
-    Fetch all forecast pages using API pagination and return a flat list of items.
-    Also writes each page to forecast_page_{n}.json for inspection.
+    Guess the API's page ordering from the forecastids on a single page.
+    A page with fewer than two ids is treated as newest-first.
     """
-    all_items: List[Dict[str, Any]] = []
-    page = 1
-
-    headers = {
-        "Accept": "application/json",
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/115.0 Safari/537.36"
-        ),
-    }
+    ids = [item.get("forecastid") for item in items if isinstance(item.get("forecastid"), int)]
+    return len(ids) < 2 or ids[0] >= ids[-1]
 
-    while True:
-        url = f"{API_BASE_URL}?page={page}"
-        print(f"Fetching: {url}")
-        try:
-            resp = requests.get(url, headers=headers, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-
-            # Persist raw page for debugging
-            with open(f"forecast_page_{page}.json", "w", encoding="utf-8") as fh:
-                json.dump(data, fh, indent=4, ensure_ascii=False)
 
-            items = data.get("items", []) or []
-            all_items.extend(items)
+def make_http_session(pool_size: int = FETCH_CONCURRENCY) -> requests.Session:
+    """
+    Build a keep-alive session whose connection pool fits pool_size workers,
+    so every page after the first reuses an open TCP/TLS connection.
+    """
+    session = requests.Session()
+    session.headers.update(REQUEST_HEADERS)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-            meta = data.get("_meta", {})
-            current_page = int(meta.get("currentPage", page))
-            page_count = int(meta.get("pageCount", page))
-            if current_page < page_count:
-                page += 1
-                continue
-            print("Reached last page.")
-            break
-        except requests.RequestException as e:
-            print(f"HTTP error while fetching forecasts: {e}")
-            break
-        except ValueError as e:
-            print(f"JSON parse error: {e}")
-            break
 
-    return all_items
+def _page_url(page: int) -> str:
+    return f"{API_BASE_URL}?page={page}"
 
 
-def save_forecasts_to_db(forecasts: List[Dict[str, Any]]) -> int:
+def _get_page(
+    session: requests.Session,
+    page: int,
+    headers: Dict[str, str] | None = None,
+) -> Tuple[requests.Response, Dict[str, float]]:
     """
-    Insert or ignore forecasts into detailed_forecasts. Returns number of new rows.
+    GET one forecast page without decoding it.
+    Returns (response, {"connect": s, "transfer": s}).
     """
-    if not forecasts:
-        print("No forecasts to save.")
-        return 0
+    started = time.perf_counter()
+    resp = session.get(_page_url(page), headers=headers, timeout=15, stream=True)
+    headers_at = time.perf_counter()
+    resp.content  # read the body now so transfer is timed on its own
+    timings = {"connect": headers_at - started, "transfer": time.perf_counter() - headers_at}
+    resp.raise_for_status()
+    return resp, timings
 
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
 
-        # Build INSERT dynamically from a single source-of-truth columns list
-        columns = [
-            'forecastid', 'amended', 'IssuedAt', 'forecastTime', 'forecaster', 'forecastPeriod',
-            'forecastArea1', 'forecastArea2', 'forecastArea3', 'textArea1', 'textArea2', 'textArea3',
-            'addMarine', 'imageTrin', 'imagebago', 'seas', 'waves1', 'waves2',
-            'PiarcoMnTemp', 'CrownMnTemp', 'TmPiarcoMnTemp', 'TmCrownMnTemp',
-            'TmWeatherPiarcoMn', 'TmWeatherCpMn', 'TmPiarcoMxTemp', 'TmCrownMxTemp',
-            'TmWeatherPiarcoMx', 'TmWeatherCpMx', 'outlook1',
-            'minTrin24look', 'maxTrin24look', 'minTob24look', 'maxTob24look',
-            'outlook2', 'minTrin48look', 'maxTrin48look', 'minTob48look', 'maxTob48look',
-            'outlook24WeatherPiarco', 'outlook48WeatherPiarco', 'outlook24WeatherCrown', 'outlook48WeatherCrown',
-            'PiarcoFcstMxTemp', 'CrownFcstMxTemp', 'PiarcoActMxTemp', 'CrownActMxTemp',
-            'PiarcoFcstMnTemp', 'CrownFcstMnTemp', 'PiarcoRainfall', 'CrownPointRinfall',
-            'cumlativeRain', 'cumlativeCpRain', 'PiarcoheatIndex', 'CPointheatIndex',
-            'sunrise', 'sunset', 'gustywinds', 'gustywinds2',
-            'tideDate', 'tideTime', 'tideTime2',
-            'trinAmHigh', 'trinPmHigh', 'trinAmLow', 'trinPmLow',
-            'tobAmHigh', 'tobPmHigh', 'tobAmLow', 'tobPmLow',
-            'precipitation', 'timePeriod', 'probrainfall', 'uvrate',
-            'jsonObject', 'wx24', 'wx24cp', 'wx48', 'wx48cp',
-            'synopsis', 'TmPiarco', 'TmCrown', 'insertionDate',
-        ]
+def _fetch_page(session: requests.Session, page: int) -> Tuple[Dict[str, Any], bytes, Dict[str, float]]:
+    """
+    Fetch and decode one forecast page, retrying transient failures (see
+    resilience.with_retries). Returns (data, raw_body, phase_timings).
+    """
+    def attempt() -> Tuple[Dict[str, Any], bytes, Dict[str, float]]:
+        resp, timings = _get_page(session, page)
+        started = time.perf_counter()
+        data = resp.json()
+        timings["parse"] = time.perf_counter() - started
+        return data, resp.content, timings
 
-        placeholders = ','.join(['?'] * len(columns))
-        column_list_sql = ', '.join(columns)
+    return with_retries(attempt, f"Page {page}")
 
-        insert_count = 0
-        for f in forecasts:
-            values = tuple(f.get(c) for c in columns)
-            cursor.execute(
-                f"INSERT OR IGNORE INTO detailed_forecasts ({column_list_sql}) VALUES ({placeholders})",
-                values,
-            )
-            if cursor.rowcount > 0:
-                insert_count += 1
 
-        conn.commit()
-        print(f"Successfully saved {insert_count} new forecast(s).")
-        return insert_count
-    except sqlite3.Error as e:
-        print(f"Database error during insert: {e}")
-        return 0
-    finally:
-        if conn:
-            conn.close()
-
-
-def log_scraper_run(
-    run_type: str,
-    start_time: datetime,
-    end_time: datetime,
-    records_fetched: int,
-    records_inserted: int,
-    success: bool,
-    error_message: str | None = None,
-    api_response_time: float | None = None,
-) -> None:
-    """Log a scraper run to the analytics table."""
-    conn = None
+def _iter_pages(
+    session: requests.Session,
+    pages: List[int],
+    max_workers: int,
+) -> Iterator[Tuple[int, Dict[str, Any], bytes, Dict[str, float]]]:
+    """
+    Fetch pages concurrently with at most max_workers requests in flight and
+    yield (page, data, raw_body, phase_timings) strictly in the order given.
+
+    Errors are raised at the page that failed. Closing the generator early
+    cancels every request that has not started yet.
+    """
+    if not pages:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(max_workers, 1))
+    in_flight: Deque[Tuple[int, Future]] = deque()
+    queue = iter(pages)
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+        for page in queue:
+            in_flight.append((page, executor.submit(_fetch_page, session, page)))
+            if len(in_flight) >= max_workers:
+                break
+        while in_flight:
+            page, future = in_flight.popleft()
+            data, body, timings = future.result()
+            next_page = next(queue, None)
+            if next_page is not None:
+                in_flight.append((next_page, executor.submit(_fetch_page, session, next_page)))
+            yield page, data, body, timings
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
 
-        duration = (end_time - start_time).total_seconds()
 
-        # Count total records
-        cursor.execute("SELECT COUNT(*) FROM detailed_forecasts")
-        total_records = cursor.fetchone()[0]
+def _resume_pages(
+    remaining: List[int],
+    checkpoint: Dict[str, Any],
+    total_count: Any,
+    per_page: Any,
+) -> Tuple[List[int], int]:
+    """
+    Narrow a newest-first walk to the pages an interrupted sync did not save.
+    Returns (pages, skipped).
+
+    checkpoint is {"page", "total_count", "per_page"} as record_sync_progress()
+    stored it: every page before "page" was saved. Forecasts published since
+    push that content further down the listing, so the first pages after
+    page 1 are fetched again to cover them. If the listing shrank or changed
+    page size the checkpoint is ignored.
+    """
+    page = checkpoint.get("page")
+    then = checkpoint.get("total_count")
+    if not (isinstance(page, int) and isinstance(then, int) and isinstance(total_count, int)
+            and isinstance(per_page, int) and per_page > 0
+            and checkpoint.get("per_page") == per_page and total_count >= then):
+        return remaining, 0
+    head_end = 1 + -(-(total_count - then) // per_page)
+    pages = [p for p in remaining if p <= head_end or p >= page]
+    return pages, len(remaining) - len(pages)
+
+
+def _validate_items(page: int, items: Any) -> List[Dict[str, Any]]:
+    """Keep only well-formed forecast items (dicts with an integer forecastid)."""
+    if not isinstance(items, list):
+        print(f"Page {page}: 'items' is not a list; ignoring page contents.")
+        return []
+    valid = [i for i in items if isinstance(i, dict) and isinstance(i.get("forecastid"), int)]
+    if len(valid) != len(items):
+        print(f"Page {page}: dropped {len(items) - len(valid)} malformed item(s).")
+    return valid
+
+
+def iter_forecast_pages(
+    since_id: int | None = None,
+    sync_info: Dict[str, Any] | None = None,
+    max_workers: int = FETCH_CONCURRENCY,
+    session: requests.Session | None = None,
+    timer: PhaseTimer | None = None,
+    resume: Dict[str, Any] | None = None,
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Yield (page, items) for each forecast page as soon as it arrives, in page
+    order, with malformed items removed. Each raw page body is also stored
+    in the payload archive (see archive.py).
+
+    Page 1 is fetched on its own to learn pageCount; the remaining pages are
+    fetched with up to max_workers concurrent requests over one pooled
+    session. Only one page of items is held at a time, so memory stays flat
+    however long the history is.
+
+    When since_id (a forecastid high-water mark) is given, pagination stops at
+    the first page whose forecasts are all at or below it. Pages are walked
+    from the newest end of the listing, whichever way round the API sorts.
+    Page 1 is also requested conditionally; if it is unchanged since the last
+    complete sync nothing is yielded. Each request is retried with backoff
+    before a page counts as failed.
+
+    resume is the checkpoint an interrupted sync left (see
+    record_sync_progress); in a newest-first listing the pages it already
+    saved are skipped (see _resume_pages).
+
+    If sync_info is a dict it is kept up to date with page_count,
+    pages_fetched, pages_skipped, max_forecastid, unchanged, validators (for
+    page 1), complete (False until the walk finishes; stays False if a page
+    failed or the consumer stopped early), fetch_error (why a page failed),
+    resume_page (the first page not yet saved), newest_first, total_count
+    and per_page. Pass it to record_sync_progress() once the items are saved.
+
+    If timer is given, each page's connect / transfer / parse time is added
+    to it (summed across pages, so concurrent pages can exceed wall time).
+    """
+    pages_fetched = 0
+    page_count = 1
+    max_forecastid: int | None = None
+    complete = False
+    stopped_early = False
+    unchanged = False
+    validators: Dict[str, Any] = {}
+    meta: Dict[str, Any] = {}
+    newest_first = True
+    resume_page: int | None = None
+    resume_skipped = 0
+    fetch_error: str | None = None
+
+    own_session = session is None
+    if own_session:
+        session = make_http_session(max_workers)
+
+    def publish() -> None:
+        if sync_info is not None:
+            sync_info.update({
+                "page_count": page_count,
+                "pages_fetched": pages_fetched,
+                "pages_skipped": resume_skipped + (
+                    max(page_count - pages_fetched - resume_skipped, 0) if stopped_early else 0),
+                "max_forecastid": max_forecastid,
+                "unchanged": unchanged,
+                "validators": validators,
+                "complete": complete,
+                "newest_first": newest_first,
+                "total_count": meta.get("totalCount"),
+                "per_page": meta.get("perPage"),
+                "resume_page": resume_page,
+                "fetch_error": fetch_error,
+            })
+
+    def handle_page(page: int, data: Dict[str, Any], body: bytes, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        nonlocal pages_fetched, max_forecastid
+        # Keep the raw page for debugging and offline replay
+        store_payload(DB_FILE, "forecast_page", _page_url(page), body, page=page)
+
+        items = _validate_items(page, data.get("items", []) or [])
+        pages_fetched += 1
+        if items:
+            page_max = max(i["forecastid"] for i in items)
+            max_forecastid = page_max if max_forecastid is None else max(max_forecastid, page_max)
+        if timer is not None:
+            for phase, seconds in timings.items():
+                timer.add(phase, seconds)
+        print(
+            f"Fetched page {page} in {sum(timings.values()) * 1000:.0f} ms "
+            f"(connect {timings['connect'] * 1000:.0f}, transfer {timings['transfer'] * 1000:.0f}, "
+            f"parse {timings['parse'] * 1000:.0f}; {len(items)} items)"
+        )
+        return items
 
-        cursor.execute('''
-            INSERT INTO scraper_analytics (
-                run_timestamp, run_type, start_time, end_time, duration_seconds,
-                records_fetched, records_inserted, success, error_message,
-                api_response_time, total_records_in_db
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now(timezone.utc).isoformat(),
-            run_type,
-            start_time.isoformat(),
-            end_time.isoformat(),
-            duration,
-            records_fetched,
-            records_inserted,
-            success,
-            error_message,
-            api_response_time,
-            total_records,
-        ))
+    pages = None
+    try:
+        # Page 1 is always fetched first; it tells us pageCount and the sort order.
+        # Its _meta.totalCount changes with every new forecast, so an unchanged
+        # page 1 means an incremental sync has nothing to do.
+        print(f"Fetching: {_page_url(1)}")
+        stored = load_validators(DB_FILE, _page_url(1)) if since_id is not None else {}
+
+        def first_page() -> Tuple[requests.Response, Dict[str, float], Dict[str, Any] | None]:
+            resp, timings = _get_page(session, 1, conditional_headers(stored))
+            if stored and is_unchanged(resp, stored):
+                return resp, timings, None
+            started = time.perf_counter()
+            data = resp.json()
+            timings["parse"] = time.perf_counter() - started
+            return resp, timings, data
+
+        resp, timings, data = with_retries(first_page, "Page 1")
+        unchanged = data is None
+        if unchanged:
+            if timer is not None:
+                for phase, seconds in timings.items():
+                    timer.add(phase, seconds)
+            print(f"Page 1 unchanged since last sync ({resp.status_code}); nothing to do.")
+        else:
+            validators = response_validators(resp)
+            items = handle_page(1, data, resp.content, timings)
 
-        conn.commit()
-        print(f"Logged scraper run analytics for {run_type}")
+            meta = data.get("_meta", {})
+            page_count = int(meta.get("pageCount", 1))
+            remaining = list(range(2, page_count + 1))
+            newest_first = _is_newest_first(items)
+            if not newest_first:
+                # Forecasts are added at this walk's starting end, so there is
+                # no stable point to resume from; walk it all again
+                remaining.reverse()
+            elif resume:
+                remaining, resume_skipped = _resume_pages(
+                    remaining, resume, meta.get("totalCount"), meta.get("perPage"))
+                if resume_skipped:
+                    print(f"Resuming interrupted sync at page {resume['page']}; "
+                          f"skipping {resume_skipped} page(s) it already saved.")
+            publish()
+            yield 1, items
+            resume_page = remaining[0] if remaining else None
+
+            # In an oldest-first listing page 1 holds the oldest forecasts, so
+            # it says nothing about whether the later pages are new.
+            if since_id is not None and items and (newest_first or not remaining) and _page_is_known(items, since_id):
+                if remaining:
+                    print(f"Page 1 is already stored; skipping {len(remaining)} older page(s).")
+                stopped_early = True
+            else:
+                if remaining:
+                    print(f"Fetching {len(remaining)} more page(s) with up to {max_workers} concurrent request(s)")
+                pages = _iter_pages(session, remaining, max_workers)
+                for done, (page, data, body, timings) in enumerate(pages, start=1):
+                    items = handle_page(page, data, body, timings)
+                    # Not saved until the consumer asks for the next page
+                    resume_page = page
+                    publish()
+                    yield page, items
+                    resume_page = remaining[done] if done < len(remaining) else None
+                    if since_id is not None and items and _page_is_known(items, since_id):
+                        left = len(remaining) - done
+                        if left:
+                            print(f"Page {page} is already stored; skipping {left} older page(s).")
+                        stopped_early = True
+                        break
+                else:
+                    print("Reached last page.")
+                    complete = True
+    except requests.RequestException as e:
+        fetch_error = f"HTTP error while fetching forecasts: {e}"
+        print(fetch_error)
+    except ValueError as e:
+        fetch_error = f"JSON parse error: {e}"
+        print(fetch_error)
+    finally:
+        if pages is not None:
+            pages.close()
+        if own_session:
+            session.close()
+
+        if stopped_early or unchanged:
+            complete = True
+        publish()
+
+
+def fetch_all_forecasts(
+    since_id: int | None = None,
+    sync_info: Dict[str, Any] | None = None,
+    max_workers: int = FETCH_CONCURRENCY,
+    session: requests.Session | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch forecast pages and return a flat list of items.
+    See iter_forecast_pages() for the arguments; prefer sync_forecasts()
+    for large syncs, which saves each page as it arrives.
+    """
+    all_items: List[Dict[str, Any]] = []
+    for _, items in iter_forecast_pages(since_id, sync_info, max_workers, session):
+        all_items.extend(items)
+    return all_items
+
+
+def sync_forecasts(
+    full: bool = False,
+    on_page: Callable[[Dict[str, Any]], None] | None = None,
+    max_workers: int = FETCH_CONCURRENCY,
+    session: requests.Session | None = None,
+    timer: PhaseTimer | None = None,
+    lease_lost: threading.Event | None = None,
+) -> Dict[str, Any]:
+    """
+    Stream forecast pages into detailed_forecasts, committing each page as
+    it arrives, so a failure part-way keeps every page already saved.
+
+    Runs incrementally from the stored high-water mark, resuming at the page
+    an interrupted sync stopped on, unless full is True.
+    Nothing is fetched while the endpoint's circuit breaker is open (see
+    resilience.py); circuit_open is then set to when it reopens.
+    on_page, if given, is called after each page is committed with a dict of
+    page, page_count, items, new, total_fetched and total_new.
+    lease_lost is the lost event of the forecasts lease (see leases.py):
+    once it is set the sync stops before writing another page and leaves
+    the checkpoint, high-water mark and breaker to the run that took over.
+
+    Returns the sync_info dict (see iter_forecast_pages) plus fetched, new,
+    updated (amended forecasts), already_stored and error (set if a save failed). Phase timings, including
+    db_write, are added to timer when one is given.
+    """
+    totals = {"fetched": 0, "new": 0, "updated": 0, "already_stored": 0}
+    open_until = check_circuit(DB_FILE, API_BASE_URL)
+    if open_until:
+        print(f"Circuit breaker open for {API_BASE_URL} until {open_until}; not fetching.")
+        return {"complete": False, "circuit_open": open_until, "error": None, **totals}
+
+    since_id = None if full else get_high_water_mark()
+    print(f"Sync mode: {'full' if since_id is None else f'incremental (after forecastid {since_id})'}")
+    checkpoint = load_checkpoint(DB_FILE, RESUME_CHECKPOINT)
+
+    sync_info: Dict[str, Any] = {"checkpoint": checkpoint}
+    error = None
+    timer = timer if timer is not None else PhaseTimer()
+    pages = iter_forecast_pages(since_id, sync_info, max_workers, session, timer,
+                                resume=None if full else checkpoint)
+    try:
+        for page, items in pages:
+            if lease_lost is not None and lease_lost.is_set():
+                error = f"Lost the forecasts lease; stopped before saving page {page}"
+                print(error)
+                break
+            with timer.phase("db_write"):
+                counts = bulk_save_forecasts(items)
+            totals["fetched"] += len(items)
+            totals["new"] += counts["new"]
+            totals["updated"] += counts["updated"]
+            totals["already_stored"] += counts["unchanged"]
+            if on_page is not None:
+                on_page({
+                    "page": page,
+                    "page_count": sync_info.get("page_count"),
+                    "items": len(items),
+                    "new": counts["new"],
+                    "total_fetched": totals["fetched"],
+                    "total_new": totals["new"],
+                })
     except sqlite3.Error as e:
-        print(f"Error logging scraper run: {e}")
+        error = f"Database error during insert: {e}"
+        print(error)
     finally:
-        if conn:
-            conn.close()
+        pages.close()
 
+    if error:
+        sync_info["complete"] = False
+    if lease_lost is None or not lease_lost.is_set():
+        record_outcome(DB_FILE, API_BASE_URL, sync_info.get("fetch_error"))
+        record_sync_progress(sync_info)
+    sync_info.update(totals)
+    sync_info["error"] = error
+    return sync_info
 
-def get_database_stats() -> Dict[str, Any]:
-    """Return high-level stats about the database contents."""
-    conn = None
+
+def record_sync_progress(sync_info: Dict[str, Any]) -> None:
+    """
+    After the fetched items are saved, advance the high-water mark and store
+    page 1's validators. A sync that did not complete leaves both alone and
+    instead checkpoints the first page it did not save, so the next run
+    fetches page 1 and then resumes there (newest-first listings only).
+    """
+    if not sync_info.get("complete"):
+        page = sync_info.get("resume_page")
+        # With the failure on page 2 there is nothing to skip; keep any older checkpoint
+        if sync_info.get("newest_first") and page and page > 2:
+            save_checkpoint(DB_FILE, RESUME_CHECKPOINT, {
+                "page": page,
+                "total_count": sync_info.get("total_count"),
+                "per_page": sync_info.get("per_page"),
+            })
+        return
+    if sync_info.get("checkpoint"):
+        save_checkpoint(DB_FILE, RESUME_CHECKPOINT, None)
+    if sync_info.get("unchanged"):
+        return
+    if sync_info.get("max_forecastid") is not None:
+        set_high_water_mark(sync_info["max_forecastid"])
+    save_validators(DB_FILE, _page_url(1), sync_info.get("validators") or {})
+
+
+def bulk_save_forecasts(
+    forecasts: List[Dict[str, Any]],
+    batch_size: int = WRITE_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Save forecasts with one transaction per batch, writing only what changed.
+
+    Each forecast is hashed (see revisions.py) and compared with the stored
+    content_hash: new forecasts are inserted with one executemany, identical
+    ones cost that comparison and no write, and amended ones are updated in
+    place with a forecast_revisions row listing the changed fields. Rows
+    stored before hashing existed are compared field by field once and then
+    just get their hash. forecast_observations and forecast_conditions
+    follow new and amended forecasts in the same transaction. Hashes and
+    diffs are of the plain text; the long text columns are compressed only
+    as they are written.
+
+    Returns {"new", "updated", "unchanged"}. Raises sqlite3.Error; batches
+    committed before the error are kept.
+    """
+    counts = {"new": 0, "updated": 0, "unchanged": 0}
+    if not forecasts:
+        return counts
+
+    text_codec = codec(DB_FILE)
+    conn = storage.acquire(DB_FILE)
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
+        for batch in batched(forecasts, batch_size):
+            seen_at = datetime.now(timezone.utc).isoformat()
+            rows = [tuple(f.get(c) for c in FORECAST_COLUMNS) for f in batch]
+            hashes = [content_hash(row) for row in rows]
+            ids = list({row[0] for row in rows})
+            with conn:
+                text_codec.refresh(conn)
+                stored = dict(conn.execute(
+                    f"SELECT forecastid, content_hash FROM detailed_forecasts "
+                    f"WHERE forecastid IN ({','.join(['?'] * len(ids))})",
+                    ids,
+                ))
+                fresh, amended, handled = [], [], set()
+                for forecast, row, digest in zip(batch, rows, hashes):
+                    fid = row[0]
+                    # As with INSERT OR IGNORE, the first copy of a repeated id wins
+                    if fid in handled or stored.get(fid) == digest:
+                        counts["unchanged"] += 1
+                    elif fid in stored:
+                        amended.append((forecast, row, digest))
+                    else:
+                        fresh.append((forecast, row, digest))
+                    handled.add(fid)
+
+                if fresh:
+                    # rowcount, unlike total_changes, leaves out trigger writes
+                    counts["new"] += conn.executemany(
+                        _FORECAST_INSERT_SQL,
+                        [text_codec.encode_row(row, _COMPRESSED_POSITIONS) + (digest,) for _, row, digest in fresh],
+                    ).rowcount
+                    save_observations(conn, [forecast for forecast, _, _ in fresh])
+                    save_conditions(conn, [forecast for forecast, _, _ in fresh])
+                    index_forecasts(conn, [forecast for forecast, _, _ in fresh])
+                if amended:
+                    _save_amendments(conn, amended, stored, seen_at, counts, text_codec)
+        return counts
+    finally:
+        storage.release(conn)
+
 
-        cursor.execute("SELECT COUNT(*) FROM detailed_forecasts")
-        forecasts_count = cursor.fetchone()[0]
+def _save_amendments(
+    conn: sqlite3.Connection,
+    amended: List[Tuple[Dict[str, Any], Tuple, str]],
+    stored: Dict[int, str | None],
+    seen_at: str,
+    counts: Dict[str, int],
+    text_codec: TextCodec,
+) -> None:
+    """Update forecasts whose hash changed and record their revisions (caller's transaction)."""
+    ids = [row[0] for _, row, _ in amended]
+    current = {
+        row[0]: text_codec.decode_row(row, _COMPRESSED_POSITIONS) for row in conn.execute(
+            f"SELECT {', '.join(FORECAST_COLUMNS)} FROM detailed_forecasts "
+            f"WHERE forecastid IN ({','.join(['?'] * len(ids))})",
+            ids,
+        )
+    }
+    hash_only, updates, revisions, changed = [], [], [], []
+    for forecast, row, digest in amended:
+        fid = row[0]
+        changes = diff_fields(FORECAST_COLUMNS, current[fid], row)
+        if not changes:
+            # Stored before content hashing, and identical: just remember the hash
+            hash_only.append((digest, fid))
+            counts["unchanged"] += 1
+            continue
+        updates.append(text_codec.encode_row(row, _COMPRESSED_POSITIONS)[1:] + (digest, fid))
+        revisions.append((fid, digest, stored[fid], seen_at, changes))
+        changed.append(forecast)
+    if hash_only:
+        conn.executemany("UPDATE detailed_forecasts SET content_hash = ? WHERE forecastid = ?", hash_only)
+    if updates:
+        conn.executemany(_FORECAST_UPDATE_SQL, updates)
+        record_revisions(conn, revisions)
+        # Figures dropped by the amendment must not linger as observations,
+        # nor in the rollup of a day the forecast no longer falls on
+        changed_ids = [f["forecastid"] for f in changed]
+        old_days = [
+            row[0] for row in conn.execute(
+                f"SELECT DISTINCT issued_at FROM forecast_observations "
+                f"WHERE forecastid IN ({','.join(['?'] * len(changed_ids))})",
+                changed_ids,
+            )
+        ]
+        conn.executemany("DELETE FROM forecast_observations WHERE forecastid = ?", [(i,) for i in changed_ids])
+        save_observations(conn, changed)
+        save_conditions(conn, changed)
+        index_forecasts(conn, changed)
+        refresh_daily_rollups(conn, old_days)
+        counts["updated"] += len(updates)
 
-        cursor.execute("SELECT MAX(insertionDate) FROM detailed_forecasts")
-        latest_forecast = cursor.fetchone()[0]
 
-        cursor.execute("SELECT COUNT(*) FROM scraper_analytics")
-        run_count = cursor.fetchone()[0]
+def save_forecasts_to_db(forecasts: List[Dict[str, Any]]) -> int:
+    """
+    Save forecasts into detailed_forecasts, updating amended ones.
+    Returns number of new rows.
+    """
+    if not forecasts:
+        print("No forecasts to save.")
+        return 0
 
-        cursor.execute(
-            "SELECT run_type, run_timestamp, success FROM scraper_analytics ORDER BY run_id DESC LIMIT 1"
+    try:
+        counts = bulk_save_forecasts(forecasts)
+        print(
+            f"Successfully saved {counts['new']} new forecast(s), {counts['updated']} amended "
+            f"({counts['unchanged']} unchanged)."
         )
-        last_run = cursor.fetchone()
-
-        return {
-            "total_forecasts": forecasts_count,
-            "latest_forecast_date": latest_forecast,
-            "total_runs": run_count,
-            "last_run": {
-                "type": last_run[0] if last_run else None,
-                "timestamp": last_run[1] if last_run else None,
-                "success": last_run[2] if last_run else None,
-            },
-        }
+        return counts["new"]
     except sqlite3.Error as e:
-        print(f"Error getting database stats: {e}")
-        return {}
-    finally:
-        if conn:
-            conn.close()
+        print(f"Database error during insert: {e}")
+        return 0
+
+
+def replay_forecasts_from_archive() -> Dict[str, int]:
+    """
+    Re-derive detailed_forecasts from every archived forecast page, oldest
+    first, without touching the network. Older payloads of a forecast that
+    was later amended are recorded as revisions in archive order. Returns
+    payloads/fetched/new/updated counts.
+    """
+    totals = {"payloads": 0, "fetched": 0, "new": 0, "updated": 0}
+    for entry, body in iter_payloads(DB_FILE, "forecast_page"):
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            print(f"Skipping archived page {entry['hash'][:12]}: {e}")
+            continue
+        items = _validate_items(entry.get("page") or 0, data.get("items", []) or [])
+        counts = bulk_save_forecasts(items)
+        totals["payloads"] += 1
+        totals["fetched"] += len(items)
+        totals["new"] += counts["new"]
+        totals["updated"] += counts["updated"]
+    print(
+        f"Replayed {totals['payloads']} archived forecast page(s): "
+        f"{totals['fetched']} forecast(s), {totals['new']} new, {totals['updated']} amended."
+    )
+    return totals
 
 
 def main() -> None:
+    full = "--full" in sys.argv[1:]
     print("--- Starting Weather Forecast Scraper ---")
-    setup_database()
-    items = fetch_all_forecasts()
-    if items:
-        print(f"Total forecasts fetched: {len(items)}")
-        save_forecasts_to_db(items)
+    # One connection for the whole run
+    storage.open_shared(DB_FILE)
+    try:
+        setup_database()
+        # Shares the forecasts lease with run_scrapers.py, so the two never overlap
+        with hold_lease(DB_FILE, "forecasts") as lease:
+            result = sync_forecasts(full=full, lease_lost=lease["lost"]) if lease else None
+    finally:
+        storage.close_shared(DB_FILE)
+    if result is None:
+        print("Another forecast run holds the lease; skipping.")
+    elif result.get("unchanged"):
+        print("Forecasts unchanged since last sync.")
+    elif result.get("fetched"):
+        print(f"Total forecasts fetched: {result['fetched']} ({result['new']} new, {result['updated']} amended)")
     else:
         print("No forecast data fetched.")
     print("--- Scraper finished. ---")